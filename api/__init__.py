@@ -5,8 +5,39 @@
 """ API package """
 # -------------------------------------------------------
 # Nadège LEMPERIERE, @16th September 2024
-# Latest revision: 16th September 2024
+# Latest revision: 19th October 2026
 # -------------------------------------------------------
 
-from api.microsoft import MicrosoftAPI
-from api.google    import GoogleAPI
+# System includes
+from importlib import import_module
+
+# Providers are only imported when selected, so that the dependencies of the
+# other providers (googleapiclient, google.oauth2, ...) are never loaded
+s_Providers = {
+    'microsoft' : ('api.microsoft', 'MicrosoftAPI'),
+    'google'    : ('api.google',    'GoogleAPI')
+}
+
+def create(name):
+    """
+    Create the API client of a provider
+    Parameters    :
+        name (str) : Provider name, case insensitive
+    Returns (API) : The provider API client, None if the provider is unknown
+    """
+
+    result = None
+
+    if name.lower() in s_Providers :
+        module, cls = s_Providers[name.lower()]
+        result = getattr(import_module(module), cls)()
+
+    return result
+
+def __getattr__(name):
+    """ Resolve provider classes on first access """
+
+    for module, cls in s_Providers.values() :
+        if cls == name : return getattr(import_module(module), cls)
+
+    raise AttributeError(f"module 'api' has no attribute '{name}'")
@@ -5,7 +5,7 @@
 """ Virtual API class """
 # -------------------------------------------------------
 # Nadège LEMPERIERE, @16th September 2024
-# Latest revision: 16th September 2024
+# Latest revision: 19th October 2026
 # -------------------------------------------------------
 
 #pylint: disable=W0107, W0613
@@ -34,6 +34,22 @@ class API:
         """
         pass
 
+    def trace(self, tracer) :
+        """
+        Trace the http requests sent to the API
+        Parameters    :
+            tracer (Tracer) : The tracer recording the requests
+        """
+        pass
+
+    def cassette(self, cassette) :
+        """
+        Record the http requests sent to the API, or replay them instead of sending them
+        Parameters    :
+            cassette (Cassette) : The cassette recording or replaying the requests
+        """
+        pass
+
     def get_user(self) :
         """
         Retrieve the authorized user information
@@ -45,7 +61,7 @@ class API:
     def get_contacts(self):
         """
         Retrieve all the user contacts
-        Returns (array) : The list of all contacts
+        Returns (array) : The list of all contacts, as Contact records
         Throws          : Exception if the calendar list retrieval fails
         """
         return []
@@ -58,13 +74,23 @@ class API:
         """
         return []
 
+    def get_calendar(self, identifier):
+        """
+        Retrieve a calendar of the authorized user from its identifier
+        Parameters      :
+            identifier (str) : Identifier of the calendar
+        Returns (dict)  : The calendar name and id, None if the calendar does not exist
+        Throws          : Exception if the calendar retrieval fails
+        """
+        return None
+
     def get_events(self, identifier, days):
         """
         Retrieve all events from a calendar
         Parameters      :
             identifier (str) : Identifier of the calendar to search
             days (int)       : Number of days to search for from now
-        Returns (array) : list of the calendar events
+        Returns (array) : list of the calendar events, as Event records
         Throws          : Exception if the retrieval fails
         """
         return []
@@ -93,6 +119,27 @@ class API:
         """
         pass
 
+    def post_custom_properties_batch(self, name, updates):
+        """
+        Update the custom properties of several events
+        Parameters     :
+            name (str)      : Extension name to use
+            updates (list)  : Updates to post, as dictionaries with identifier, data and calendar
+        Returns (list) : Identifiers of the events whose update failed
+        Throws         : Exception if the whole batch fails
+        """
+
+        result = []
+
+        for update in updates :
+            try :
+                self.post_custom_properties(
+                    update['identifier'], name, update['data'], update['calendar'])
+            except Exception :
+                result.append(update['identifier'])
+
+        return result
+
 
     def post_mail(self, subject, content, recipient) :
         """
@@ -5,7 +5,7 @@
 """ Google API class """
 # -------------------------------------------------------
 # Nadège LEMPERIERE, @17th September 2024
-# Latest revision: 17th September 2024
+# Latest revision: 19th October 2026
 # -------------------------------------------------------
 
 # System includes
@@ -14,6 +14,8 @@ from os                         import path
 from datetime                   import datetime, timedelta, timezone
 from zoneinfo                   import ZoneInfo
 from base64                     import urlsafe_b64encode
+from time                       import perf_counter
+from threading                  import local as thread_local
 
 # System includes
 from email.mime.text            import MIMEText
@@ -21,9 +23,13 @@ from email.mime.text            import MIMEText
 # Google includes
 from google.oauth2.credentials  import Credentials
 from googleapiclient.discovery  import build
+from googleapiclient.errors     import HttpError
+from google_auth_httplib2       import AuthorizedHttp
+from httplib2                   import Http, Response
 
 # Local includes
 from api.api                    import API
+from engine                     import Contact, Event, Attendee, RetryPolicy
 
 #pylint: disable=W0719, R0902
 class GoogleAPI(API):
@@ -38,6 +44,8 @@ class GoogleAPI(API):
         'https://www.googleapis.com/auth/userinfo.profile'
     ]
 
+    s_BatchSize = 50
+
     def __init__(self):
         """ Constructor"""
 
@@ -50,6 +58,13 @@ class GoogleAPI(API):
         self.__token = ""
         self.__build = build
         self.__authent = Credentials.from_authorized_user_file
+        self.__retry = RetryPolicy('google')
+        self.__tracer = None
+        self.__cassette = None
+
+        # Http transports and services built once and reused, for each thread since httplib2
+        # connections can not be shared between threads
+        self.__services = thread_local()
 
     def mock(self, functions) :
         """
@@ -63,6 +78,25 @@ class GoogleAPI(API):
 
         if 'build' in functions  : self.__build = functions['build']
         if 'authent' in functions : self.__authent = functions['authent']
+        self.__services = thread_local()
+
+    def trace(self, tracer) :
+        """
+        Trace the http requests sent to the API
+        Parameters    :
+            tracer (Tracer) : The tracer recording the requests
+        """
+        self.__tracer = tracer
+        self.__services = thread_local()
+
+    def cassette(self, cassette) :
+        """
+        Record the http requests sent to the API, or replay them instead of sending them
+        Parameters    :
+            cassette (Cassette) : The cassette recording or replaying the requests
+        """
+        self.__cassette = cassette
+        self.__services = thread_local()
 
     def login(self, credentials):
         """
@@ -79,6 +113,7 @@ class GoogleAPI(API):
         self.__token = self.__authent(
             credentials_path, scopes=GoogleAPI.s_scopes
         )
+        self.__services = thread_local()
 
         self.__logger.info("---> Logged in Google API")
 
@@ -94,14 +129,14 @@ class GoogleAPI(API):
         self.__logger.info("---> Retrieving authorized user info")
 
         # Define the service for the user info request
-        service = self.__build('people', 'v1', credentials=self.__token, cache_discovery=False)
+        service = self.__service('people', 'v1')
         if not service: raise Exception("Failed to initialize People API service")
 
         # Send the request to get the contacts
-        profile = service.people().get(
+        profile = self.__execute(service.people().get(
             resourceName='people/me',
             personFields='names,emailAddresses,photos'
-        ).execute()
+        ), 'people.get')
 
         result['mail'] = profile['emailAddresses'][0]['value']
 
@@ -112,7 +147,7 @@ class GoogleAPI(API):
     def get_contacts(self):
         """
         Retrieve all the contacts of the authorized user
-        Returns (array) : The list of all contacts
+        Returns (array) : The list of all contacts, as Contact records
         Throws          : Exception if the calendar list retrieval fails
         """
 
@@ -121,32 +156,29 @@ class GoogleAPI(API):
         self.__logger.info("---> Retrieving contacts")
 
         # Define the service for the contacts request
-        service = self.__build('people', 'v1', credentials=self.__token, cache_discovery=False)
+        service = self.__service('people', 'v1')
         if not service: raise Exception("Failed to initialize People API service")
 
         # Send the request to get the contacts
-        contacts = service.people().connections().list(
+        contacts = self.__execute(service.people().connections().list(
             resourceName='people/me', pageSize=100,
             personFields='names,emailAddresses,memberships'
-        ).execute()
+        ), 'people.connections.list')
 
-        # Format the contacts to match the API standard
+        # Build the contacts records, with their groups labels as categories
         connections = contacts.get('connections', [])
         for contact in connections:
-            local = {
-                'emailAddresses' : [],
-                'displayName' : contact['names'][0]['displayName'],
-                'categories' : []
-            }
-
-            for address in contact['emailAddresses'] :
-                local['emailAddresses'].append({ 'address' : address['value'] })
+            categories = []
             for group in contact.get('memberships', []) :
                 resource = f'contactGroups/{group['contactGroupMembership']['contactGroupId']}'
-                label =  service.contactGroups().get(resourceName=resource).execute()
-                local['categories'].append(label['formattedName'])
+                label =  self.__execute(
+                    service.contactGroups().get(resourceName=resource), 'contactGroups.get')
+                categories.append(label['formattedName'])
 
-            result.append(local)
+            result.append(Contact(
+                contact['names'][0]['displayName'],
+                [address['value'] for address in contact['emailAddresses']],
+                categories))
 
         self.__logger.info("---> Found %d contacts",len(result))
 
@@ -164,11 +196,11 @@ class GoogleAPI(API):
         self.__logger.info("---> Retrieving calendars")
 
         # Define the service for the calendats request
-        service = self.__build('calendar', 'v3', credentials=self.__token, cache_discovery=False)
+        service = self.__service('calendar', 'v3')
         if not service: raise Exception("Failed to initialize Calendar API service")
 
         # Send the request to get the events
-        calendars = service.calendarList().list().execute()
+        calendars = self.__execute(service.calendarList().list(), 'calendarList.list')
         items = calendars.get('items', [])
 
         # Format the calendars to match the API standard
@@ -183,13 +215,40 @@ class GoogleAPI(API):
 
         return result
 
+    def get_calendar(self, identifier):
+        """
+        Retrieve a calendar of the authorized user from its identifier
+        Parameters      :
+            identifier (str) : Identifier of the calendar
+        Returns (dict)  : The calendar name and id, None if the calendar does not exist
+        Throws          : Exception if the calendar retrieval fails
+        """
+
+        result = None
+
+        self.__logger.info("---> Retrieving calendar %s", identifier)
+
+        # Define the service for the calendar request
+        service = self.__service('calendar', 'v3')
+        if not service: raise Exception("Failed to initialize Calendar API service")
+
+        # Send the request to get the calendar, a missing calendar being no error
+        try :
+            item = self.__execute(
+                service.calendarList().get(calendarId=identifier), 'calendarList.get')
+            result = {'name' : item.get('summary', ''), 'id' : identifier}
+        except HttpError as e :
+            if e.resp.status != 404 : raise
+
+        return result
+
     def get_events(self, identifier, days):
         """
         Retrieve all events from a calendar
         Parameters      :
             identifier (str) : Identifier of the calendar to search
             days (int)       : Number of days to search for from now
-        Returns (array) : list of the calendar events
+        Returns (array) : list of the calendar events, as Event records
         Throws          : Exception if the retrieval fails
         """
 
@@ -197,7 +256,7 @@ class GoogleAPI(API):
         self.__logger.info("---> Retrieving events")
 
         # Define the service for the events request
-        service = self.__build('calendar', 'v3', credentials=self.__token, cache_discovery=False)
+        service = self.__service('calendar', 'v3')
         if not service: raise Exception("Failed to initialize Calendar API service")
 
         # Define the parameters for the events request
@@ -205,51 +264,23 @@ class GoogleAPI(API):
         end = (datetime.now(timezone.utc) + timedelta(days=days)).isoformat()
 
         # Send the request to get the events
-        events = service.events().list(
+        events = self.__execute(service.events().list(
             calendarId=identifier,
             timeMin=now, timeMax=end,
             singleEvents=True, orderBy='startTime'
-        ).execute()
+        ), 'events.list')
         items = events.get('items', [])
 
-        # Format the events to match the API standard
+        # Build the events records, with their dates in UTC
         for item in items :
-            local = {
-                'id' : item['id'],
-                'isCancelled' : not(item['status'] == 'confirmed'),
-                'subject' : item['summary'],
-                'isAllDay' : 'date' in item['start'],
-                'attendees' : [],
-                'start' : {},
-                'end' : {}
-            }
-
-            for attendee in item['attendees'] :
-                local['attendees'].append({'emailAddress' :  {'address':  attendee['email']}})
-
-            utc = ZoneInfo('UTC')
-            if 'date' in item['start'] :
-                start = datetime.strptime(item['start']['date'], '%Y-%m-%d')
-                start = start.astimezone(utc)
-                local['start']['dateTime'] = start.strftime('%Y-%m-%dT%H:%M:%S.%f') + '0'
-                local['start']['timeZone'] = 'UTC'
-            elif 'dateTime' in item['start'] :
-                start = datetime.strptime(item['start']['dateTime'], '%Y-%m-%dT%H:%M:%S%z')
-                start = start.astimezone(utc)
-                local['start']['dateTime'] = start.strftime('%Y-%m-%dT%H:%M:%S.%f') + '0'
-                local['start']['timeZone'] = 'UTC'
-            if 'date' in item['end'] :
-                end = datetime.strptime(item['end']['date'], '%Y-%m-%d')
-                end = end.astimezone(utc)
-                local['end']['dateTime'] = end.strftime('%Y-%m-%dT%H:%M:%S.%f') + '0'
-                local['end']['timeZone'] = 'UTC'
-            elif 'dateTime' in item['end'] :
-                end = datetime.strptime(item['end']['dateTime'], '%Y-%m-%dT%H:%M:%S%z')
-                end = end.astimezone(utc)
-                local['end']['dateTime'] = end.strftime('%Y-%m-%dT%H:%M:%S.%f') + '0'
-                local['end']['timeZone'] = 'UTC'
-
-            result.append(local)
+            result.append(Event(
+                item['id'],
+                subject=item['summary'],
+                cancelled=not item['status'] == 'confirmed',
+                all_day='date' in item['start'],
+                start=GoogleAPI.__date(item['start']),
+                end=GoogleAPI.__date(item['end']),
+                attendees=[Attendee(attendee['email']) for attendee in item['attendees']]))
 
         self.__logger.info("---> Found %d events",len(result))
 
@@ -271,13 +302,13 @@ class GoogleAPI(API):
         self.__logger.info("---> Retrieving custom properties")
 
         # Define the service for the events request
-        service = self.__build('calendar', 'v3', credentials=self.__token, cache_discovery=False)
+        service = self.__service('calendar', 'v3')
         if not service: raise Exception("Failed to initialize Calendar API service")
 
         # Send the request to get the event
-        event = service.events().get(
+        event = self.__execute(service.events().get(
             calendarId=calendar, eventId=identifier
-        ).execute()
+        ), 'events.get')
 
         # Look for custom properties
         if 'extendedProperties' in event :
@@ -301,23 +332,81 @@ class GoogleAPI(API):
         self.__logger.info("---> Posting custom properties")
 
         # Define the service for the events request
-        service = self.__build('calendar', 'v3', credentials=self.__token, cache_discovery=False)
+        service = self.__service('calendar', 'v3')
         if not service: raise Exception("Failed to initialize Calendar API service")
 
         # Send the request to get the events
-        event = service.events().get(
+        event = self.__execute(service.events().get(
             calendarId=calendar, eventId=identifier
-        ).execute()
+        ), 'events.get')
 
         event['extendedProperties'] = { 'private' : data }
 
         # Send the request to update the event
-        service.events().update(
+        self.__execute(service.events().update(
             calendarId=calendar, eventId=identifier, body=event
-        ).execute()
+        ), 'events.update')
 
         self.__logger.info("---> Custom properties posted")
 
+    def post_custom_properties_batch(self, name, updates):
+        """
+        Update the custom properties of several events using batch http requests
+        Parameters     :
+            name (str)      : Extension name to use
+            updates (list)  : Updates to post, as dictionaries with identifier, data and calendar
+        Returns (list) : Identifiers of the events whose update failed
+        Throws         : Exception if the whole batch fails
+        """
+
+        result = []
+
+        self.__logger.info("---> Posting %d custom properties in batch", len(updates))
+
+        # Define the service for the events request
+        service = self.__service('calendar', 'v3')
+        if not service: raise Exception("Failed to initialize Calendar API service")
+
+        # Collect batch responses by request identifier
+        events = {}
+        failed = set()
+        def collect(request_id, response, exception) :
+            if exception is None : events[request_id] = response
+            else : failed.add(request_id)
+
+        # Google limits the number of requests in a single batch
+        for i_start in range(0, len(updates), GoogleAPI.s_BatchSize) :
+            chunk = updates[i_start:i_start + GoogleAPI.s_BatchSize]
+            events.clear()
+            failed.clear()
+
+            # Get all the events, since update requires the full event body
+            batch = service.new_batch_http_request(callback=collect)
+            for i_update, update in enumerate(chunk) :
+                batch.add(service.events().get(
+                    calendarId=update['calendar'], eventId=update['identifier']
+                ), request_id=str(i_update))
+            batch.execute()
+
+            # Update all the events that could be retrieved
+            batch = service.new_batch_http_request(callback=collect)
+            for i_update, update in enumerate(chunk) :
+                if str(i_update) in events :
+                    event = events[str(i_update)]
+                    event['extendedProperties'] = { 'private' : update['data'] }
+                    batch.add(service.events().update(
+                        calendarId=update['calendar'], eventId=update['identifier'], body=event
+                    ), request_id=f'{i_update}-update')
+            batch.execute()
+
+            for i_update, update in enumerate(chunk) :
+                if str(i_update) in failed or f'{i_update}-update' in failed :
+                    result.append(update['identifier'])
+
+        self.__logger.info("---> Custom properties posted with %d failures", len(result))
+
+        return result
+
 
     def post_mail(self, subject, content, recipient) :
         """
@@ -332,7 +421,7 @@ class GoogleAPI(API):
         self.__logger.info("---> Sending email")
 
         # Define the service for the mail sending
-        service = self.__build('gmail', 'v1', credentials=self.__token, cache_discovery=False)
+        service = self.__service('gmail', 'v1')
         if not service: raise Exception("Failed to initialize Gmail API service")
 
         # Format message
@@ -343,8 +432,151 @@ class GoogleAPI(API):
         message_body = {'raw': raw}
 
         # Post the request to send the mail
-        service.users().messages().send(userId='me', body=message_body).execute()
+        self.__execute(service.users().messages().send(userId='me', body=message_body),
+            'users.messages.send', False)
 
         self.__logger.info("---> Mail sent")
 
+    def __execute(self, request, description, idempotent=True):
+        """
+        Execute a request, retrying it as the retry policy says
+        Parameters     :
+            request (HttpRequest) : Request to execute
+            description (str)     : Resource and method of the request, for the logs
+            idempotent (bool)     : True if the request can be sent again once timed out
+        Returns (dict) : The request response
+        Throws         : HttpError if the request fails, TimeoutError if it keeps timing out
+        """
+        return self.__retry.send(description, request.execute, GoogleAPI.__status,
+            (TimeoutError, ConnectionError), idempotent)
+
+    @staticmethod
+    def __status(outcome):
+        """ Status code and Retry-After header of a request error, none for a response """
+
+        result = (None, None)
+        if isinstance(outcome, HttpError) :
+            result = (outcome.resp.status, outcome.resp.get('retry-after'))
+
+        return result
+
+    @staticmethod
+    def __date(value):
+        """ Format a Google event date or date time as an ISO UTC date, as Graph does """
+
+        result = ''
+
+        utc = ZoneInfo('UTC')
+        if 'date' in value :
+            result = datetime.strptime(value['date'], '%Y-%m-%d').astimezone(utc)
+            result = result.strftime('%Y-%m-%dT%H:%M:%S.%f') + '0'
+        elif 'dateTime' in value :
+            result = datetime.strptime(value['dateTime'], '%Y-%m-%dT%H:%M:%S%z').astimezone(utc)
+            result = result.strftime('%Y-%m-%dT%H:%M:%S.%f') + '0'
+
+        return result
+
+    def __service(self, name, version):
+        """
+        Get a Google API service, sending its requests through the cassette and the tracer if any.
+        The service and its authorized http transport are only built on the first call of each
+        thread, so that the following requests reuse their connections
+        Parameters    :
+            name (str)    : Name of the API
+            version (str) : Version of the API
+        Returns (Resource) : The API service
+        """
+
+        services = self.__services
+        if not hasattr(services, 'http') :
+            services.http = self.__http()
+            services.built = {}
+
+        if (name, version) not in services.built :
+            services.built[(name, version)] = \
+                self.__build(name, version, http=services.http, cache_discovery=False)
+
+        return services.built[(name, version)]
+
+    def __http(self):
+        """
+        Build the http transport of the services
+        Returns (Http) : Authorized transport, through the cassette and the tracer if any
+        """
+
+        # Requests time out as the retry policy says, whatever their transport
+        result = Http(timeout=RetryPolicy.s_Timeout)
+        if self.__cassette is not None :
+            result = CassetteHttp(self.__cassette, timeout=RetryPolicy.s_Timeout)
+        if self.__tracer is not None :
+            result = TracedHttp(self.__tracer, result, timeout=RetryPolicy.s_Timeout)
+
+        if self.__cassette is None or not self.__cassette.replaying :
+            result = AuthorizedHttp(self.__token, http=result)
+
+        return result
+
 #pylint: enable=W0719, R0902
+
+class TracedHttp(Http):
+    """ httplib2 transport recording its requests in a tracer """
+
+    def __init__(self, tracer, http=None, **kwargs):
+        """
+        Constructor
+        Parameters    :
+            tracer (Tracer) : The tracer recording the requests
+            http (Http)     : Transport to send the requests through, None to send them directly
+        """
+        super().__init__(**kwargs)
+        self.__tracer = tracer
+        self.__http = http
+
+    #pylint: disable=R0913
+    def request(self, uri, method='GET', body=None, headers=None, redirections=5,
+                connection_type=None):
+        """ Send a request, recording it in the tracer """
+
+        status = 0
+        received = 0
+        start = perf_counter()
+        send = super().request if self.__http is None else self.__http.request
+        try :
+            response, content = send(uri, method, body, headers, redirections, connection_type)
+            status = response.status
+            received = len(content or b'')
+        finally :
+            self.__tracer.record(
+                method, uri, status, len(body or ''), received, perf_counter() - start)
+
+        return response, content
+    #pylint: enable=R0913
+
+class CassetteHttp(Http):
+    """ httplib2 transport recording its requests in a cassette, or replaying them from it """
+
+    def __init__(self, cassette, **kwargs):
+        """
+        Constructor
+        Parameters    :
+            cassette (Cassette) : The cassette recording or replaying the requests
+        """
+        super().__init__(**kwargs)
+        self.__cassette = cassette
+
+    #pylint: disable=R0913
+    def request(self, uri, method='GET', body=None, headers=None, redirections=5,
+                connection_type=None):
+        """ Send a request and record it, or replay it without sending it """
+
+        if self.__cassette.replaying :
+            interaction = self.__cassette.replay(method, uri)
+            response = Response(dict(interaction['headers'], status=str(interaction['status'])))
+            content = interaction['content']
+        else :
+            response, content = super().request(
+                uri, method, body, headers, redirections, connection_type)
+            self.__cassette.record(method, uri, body, response.status, dict(response), content)
+
+        return response, content
+    #pylint: enable=R0913
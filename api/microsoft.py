@@ -5,26 +5,30 @@
 """ Microsoft API class """
 # -------------------------------------------------------
 # Nadège LEMPERIERE, @16th September 2024
-# Latest revision: 17th September 2024
+# Latest revision: 19th October 2026
 # -------------------------------------------------------
 
 # System includes
-from logging  import getLogger
-from os       import path
-from json     import load, loads
-from datetime import datetime, timedelta, timezone
-from copy     import deepcopy
+from logging     import getLogger
+from os          import path
+from json        import load, loads
+from datetime    import datetime, timedelta, timezone
+from copy        import deepcopy
 
 # Requests includes
-from requests import get, post
+from requests            import Session
+from requests.exceptions import Timeout, ConnectionError as ConnectionFailure
 
 # Local includes
-from api.api  import API
+from api.api     import API
+from engine      import Contact, Event, Attendee, RetryPolicy
 
 #pylint: disable=W0719, R0902
 class MicrosoftAPI(API):
     """ Microsoft Graph API class """
 
+    s_BatchSize = 20
+
     def __init__(self):
         """ Constructor"""
 
@@ -36,8 +40,14 @@ class MicrosoftAPI(API):
 
         # Initialize members
         self.__token = ""
-        self.__get  = get
-        self.__post = post
+
+        # Keep connections to the Graph API alive from one request to the next
+        self.__session = Session()
+        self.__get  = self.__session.get
+        self.__post = self.__session.post
+        self.__retry = RetryPolicy('microsoft')
+        self.__tracer = None
+        self.__cassette = None
 
     def mock(self, functions) :
         """
@@ -51,6 +61,30 @@ class MicrosoftAPI(API):
 
         if 'get' in functions  : self.__get = functions['get']
         if 'post' in functions : self.__post = functions['post']
+        if self.__cassette is not None : self.cassette(self.__cassette)
+        if self.__tracer is not None : self.trace(self.__tracer)
+
+    def trace(self, tracer) :
+        """
+        Trace the http requests sent to the API
+        Parameters    :
+            tracer (Tracer) : The tracer recording the requests
+        """
+
+        self.__tracer = tracer
+        self.__get = tracer.wrap('GET', self.__get)
+        self.__post = tracer.wrap('POST', self.__post)
+
+    def cassette(self, cassette) :
+        """
+        Record the http requests sent to the API, or replay them instead of sending them
+        Parameters    :
+            cassette (Cassette) : The cassette recording or replaying the requests
+        """
+
+        self.__cassette = cassette
+        self.__get = cassette.wrap('GET', self.__get)
+        self.__post = cassette.wrap('POST', self.__post)
 
     def login(self, credentials):
         """
@@ -84,7 +118,7 @@ class MicrosoftAPI(API):
         # Make the POST request to acquire a new access token using the refresh token
         # USING THE COMMON ENDPOINT TO ACCESS PERSONAL ACCOUNTS IS KEY
         endpoint = 'https://login.microsoftonline.com/common/oauth2/v2.0/token'
-        response = self.__post(endpoint, data=data)
+        response = self.__send('POST', endpoint, data=data)
 
         # Check if the request was successful
         if response.status_code != 200:
@@ -118,7 +152,7 @@ class MicrosoftAPI(API):
         headers = { 'Authorization': f'Bearer {self.__token}','Content-Type': 'application/json'}
 
         # Send the request to get user
-        response = self.__get(endpoint, headers=headers)
+        response = self.__send('GET', endpoint, headers=headers)
         if response.status_code == 200: result = response.json()
         else : raise Exception(f"Failed retrieving user with error : {response.text}")
 
@@ -129,7 +163,7 @@ class MicrosoftAPI(API):
     def get_contacts(self):
         """
         Retrieve all the contacts of the authorized user
-        Returns (array) : The list of all contacts
+        Returns (array) : The list of all contacts, as Contact records
         Throws          : Exception if the calendar list retrieval fails
         """
 
@@ -142,9 +176,13 @@ class MicrosoftAPI(API):
         headers = { 'Authorization': f'Bearer {self.__token}', 'Content-Type': 'application/json' }
 
         # Send the request to get contacts
-        response = self.__get(endpoint, headers=headers,
+        response = self.__send('GET', endpoint, headers=headers,
             params={'$top': 100, '$select': 'displayName,emailAddresses,jobTitle,categories'})
-        if response.status_code == 200: result = response.json().get('value', [])
+        if response.status_code == 200:
+            result = [Contact(
+                contact.get('displayName', ''),
+                [address['address'] for address in contact.get('emailAddresses', [])],
+                contact.get('categories', [])) for contact in response.json().get('value', [])]
         else : raise Exception(f"Failed retrieving contacts with error : {response.content}")
 
         self.__logger.info("---> Found %d contacts",len(result))
@@ -167,7 +205,7 @@ class MicrosoftAPI(API):
         headers = { 'Authorization': f'Bearer {self.__token}', 'Content-Type': 'application/json'}
 
         # Send the request to get calendars
-        response = self.__get(endpoint, headers=headers)
+        response = self.__send('GET', endpoint, headers=headers)
         if response.status_code == 200: result = response.json().get('value', [])
         else : raise Exception(f"Failed retrieving calendars list with error : {response.content}")
 
@@ -175,13 +213,39 @@ class MicrosoftAPI(API):
 
         return result
 
+    def get_calendar(self, identifier):
+        """
+        Retrieve a calendar of the authorized user from its identifier
+        Parameters      :
+            identifier (str) : Identifier of the calendar
+        Returns (dict)  : The calendar name and id, None if the calendar does not exist
+        Throws          : Exception if the calendar retrieval fails
+        """
+
+        result = None
+
+        self.__logger.info("---> Retrieving calendar %s", identifier)
+
+        # Define the endpoint and headers for the calendar request
+        endpoint = f"https://graph.microsoft.com/v1.0/me/calendars/{identifier}"
+        headers = { 'Authorization': f'Bearer {self.__token}', 'Content-Type': 'application/json'}
+
+        # Send the request to get the calendar name only
+        response = self.__send('GET', endpoint, headers=headers, params={'$select': 'id,name'})
+        if response.status_code == 200:
+            result = {'name' : response.json().get('name', ''), 'id' : identifier}
+        elif response.status_code != 404 :
+            raise Exception(f"Failed retrieving calendar with error : {response.content}")
+
+        return result
+
     def get_events(self, identifier, days):
         """
         Retrieve all events from a calendar
         Parameters      :
             identifier (str) : Identifier of the calendar to search
             days (int)       : Number of days to search for from now
-        Returns (array) : list of the calendar events
+        Returns (array) : list of the calendar events, as Event records
         Throws          : Exception if the retrieval fails
         """
 
@@ -202,8 +266,9 @@ class MicrosoftAPI(API):
         }
 
         # Send the request to get calendar events
-        response = self.__get(endpoint, headers=headers, params=params)
-        if response.status_code == 200: result = response.json().get('value', [])
+        response = self.__send('GET', endpoint, headers=headers, params=params)
+        if response.status_code == 200:
+            result = [MicrosoftAPI.__event(item) for item in response.json().get('value', [])]
         else : raise Exception(f"Failed retrieving events with error : {response.content}")
 
         self.__logger.info("---> Found %d events",len(result))
@@ -228,7 +293,7 @@ class MicrosoftAPI(API):
         # Define the endpoint and headers for the properties retrieval
         headers = { 'Authorization': f'Bearer {self.__token}', 'Content-Type': 'application/json'}
         endpoint = f"https://graph.microsoft.com/v1.0/me/events/{identifier}/extensions/{name}"
-        response = self.__get(endpoint, headers=headers, params={})
+        response = self.__send('GET', endpoint, headers=headers, params={})
 
         # Get the custom properties
         if response.status_code == 200: result = loads(response.content.decode('utf-8'))
@@ -259,13 +324,60 @@ class MicrosoftAPI(API):
         local_data["extensionName"] = name
 
         # Post the custom properties
-        response = self.__post(endpoint, headers=headers, json=local_data)
+        response = self.__send('POST', endpoint, headers=headers, json=local_data)
         if response.status_code != 201:
 
             raise Exception(f"Failed to update extensions with error : {response.text}")
 
         self.__logger.info("---> Custom properties posted")
 
+    def post_custom_properties_batch(self, name, updates):
+        """
+        Update the custom properties of several events using Graph JSON batching
+        Parameters     :
+            name (str)      : Extension name to use
+            updates (list)  : Updates to post, as dictionaries with identifier, data and calendar
+        Returns (list) : Identifiers of the events whose update failed
+        Throws         : Exception if the whole batch fails
+        """
+
+        result = []
+
+        self.__logger.info("---> Posting %d custom properties in batch", len(updates))
+
+        # Define the endpoint and headers for the batch request
+        headers = { 'Authorization': f'Bearer {self.__token}', 'Content-Type': 'application/json'}
+        endpoint = "https://graph.microsoft.com/v1.0/$batch"
+
+        # Graph limits the number of requests in a single batch
+        for i_start in range(0, len(updates), MicrosoftAPI.s_BatchSize) :
+            chunk = updates[i_start:i_start + MicrosoftAPI.s_BatchSize]
+
+            requests = []
+            for i_update, update in enumerate(chunk) :
+                local_data = deepcopy(update['data'])
+                local_data["@odata.type"] = "microsoft.graph.openTypeExtension"
+                local_data["extensionName"] = name
+                requests.append({
+                    'id' : str(i_update),
+                    'method' : 'POST',
+                    'url' : f"/me/events/{update['identifier']}/extensions",
+                    'headers' : { 'Content-Type': 'application/json' },
+                    'body' : local_data
+                })
+
+            # Post the batch, and collect the individual requests failures
+            response = self.__send('POST', endpoint, headers=headers, json={'requests' : requests})
+            if response.status_code != 200:
+                raise Exception(f"Failed to update extensions in batch : {response.text}")
+
+            for item in response.json().get('responses', []) :
+                if item['status'] != 201 : result.append(chunk[int(item['id'])]['identifier'])
+
+        self.__logger.info("---> Custom properties posted with %d failures", len(result))
+
+        return result
+
 
     def post_mail(self, subject, content, recipient) :
         """
@@ -296,8 +408,55 @@ class MicrosoftAPI(API):
         }
 
         # Send email
-        response  = self.__post(endpoint, headers=headers, json=email_message)
+        response  = self.__send('POST', endpoint, headers=headers, json=email_message)
         if response.status_code != 202: raise Exception(f"Failed to send email : {response.text}")
 
         self.__logger.info("---> Mail sent")
+
+    def __send(self, method, endpoint, **kwargs):
+        """
+        Send a request, retrying it as the retry policy says
+        Parameters     :
+            method (str)   : Http method, GET or POST
+            endpoint (str) : Request url
+            kwargs (dict)  : Request headers, parameters and body
+        Returns (Response) : The last response received
+        Throws         : Exception if the request keeps timing out
+        """
+
+        function = self.__get if method == 'GET' else self.__post
+
+        return self.__retry.send(
+            f'{method} {endpoint}',
+            lambda : function(endpoint, timeout=RetryPolicy.s_Timeout, **kwargs),
+            MicrosoftAPI.__status, (Timeout, ConnectionFailure), method == 'GET')
+
+    @staticmethod
+    def __event(item):
+        """ Build an event record from a Graph event """
+
+        start = item.get('start', {})
+        end = item.get('end', {})
+
+        return Event(
+            item['id'],
+            subject=item.get('subject', ''),
+            cancelled=item.get('isCancelled', True),
+            all_day=item.get('isAllDay', False),
+            start=start.get('dateTime', ''),
+            end=end.get('dateTime', ''),
+            start_zone=start.get('timeZone', 'UTC'),
+            end_zone=end.get('timeZone', 'UTC'),
+            attendees=[Attendee(attendee['emailAddress']['address']) \
+                for attendee in item.get('attendees', [])])
+
+    @staticmethod
+    def __status(response):
+        """ Status code and Retry-After header of a response, none for a request exception """
+
+        result = (None, None)
+        if hasattr(response, 'status_code') :
+            result = (response.status_code, response.headers.get('Retry-After'))
+
+        return result
 #pylint: enable=W0719, R0902
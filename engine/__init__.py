@@ -0,0 +1,25 @@
+# -------------------------------------------------------
+# Copyright (c) [2024] FASNY
+# All rights reserved
+# -------------------------------------------------------
+""" Registration engine package """
+# -------------------------------------------------------
+# Nadège LEMPERIERE, @19th October 2026
+# Latest revision: 19th October 2026
+# -------------------------------------------------------
+
+from engine.timeslot import Timeslot
+from engine.models   import Attendee, Contact, Event, RegistrationStatus
+from engine.buffer   import StatusBuffer
+from engine.store    import RegistrationStore
+from engine.calendars import CalendarCache
+from engine.status   import StatusCodec
+from engine.outbox   import Outbox
+from engine.daemon   import Schedule, Daemon
+from engine.metrics  import Metrics, Instrumented, stage
+from engine.tracer   import Tracer
+from engine.cassette import Cassette, CassetteResponse
+from engine.logs     import Logs, JsonFormatter
+from engine.spool    import MailSpool
+from engine.profiler import Profiler, MemoryProfiler
+from engine.retry    import RetryPolicy
@@ -0,0 +1,104 @@
+# -------------------------------------------------------
+# Copyright (c) [2024] FASNY
+# All rights reserved
+# -------------------------------------------------------
+""" Write-behind buffer for registration status updates """
+# -------------------------------------------------------
+# Nadège LEMPERIERE, @19th October 2026
+# Latest revision: 19th October 2026
+# -------------------------------------------------------
+
+# System includes
+from logging    import getLogger
+
+class StatusBuffer:
+    """ Gather registration status updates and post them in bulk """
+
+    def __init__(self, api, name, size=20, listener=None):
+        """
+        Constructor
+        Parameters :
+            api (API)           : API to use to post the custom properties
+            name (str)          : Extension name to use
+            size (int)          : Number of pending updates triggering a flush
+            listener (function) : Called with the updates successfully posted at each flush
+        """
+
+        self.__logger = getLogger('registration')
+
+        self.__api = api
+        self.__name = name
+        self.__size = max(1, int(size))
+        self.__pending = []
+        self.__listener = listener
+        self.__failed = []
+
+    @property
+    def failed(self):
+        """ Identifiers of the events whose update could not be posted, since the last reset """
+        return list(self.__failed)
+
+    def reset(self):
+        """ Forget the updates that could not be posted """
+        self.__failed = []
+
+    def __enter__(self):
+        """ Context manager entry """
+        return self
+
+    def __exit__(self, kind, value, traceback):
+        """ Context manager exit, flushing pending updates whatever happened """
+        self.flush()
+
+    def add(self, identifier, data, calendar=None):
+        """
+        Queue an event custom properties update, flushing if the buffer is full
+        Parameters     :
+            identifier (str) : Identifier of the event to update
+            data (dict)      : Data to use as custom properties
+            calendar (str)   : Identifier of the calendar containing the event
+        """
+
+        # A newer status replaces a pending one for the same event
+        self.__pending = [update for update in self.__pending if update['identifier'] != identifier]
+        self.__pending.append({'identifier' : identifier, 'data' : data, 'calendar' : calendar})
+
+        if len(self.__pending) >= self.__size : self.flush()
+
+    def flush(self):
+        """
+        Post all pending updates in bulk, retrying failed ones one by one
+        Returns (list) : Identifiers of the events whose update could not be posted
+        """
+
+        result = []
+
+        if len(self.__pending) != 0 :
+
+            pending = self.__pending
+            self.__pending = []
+            self.__logger.info('---> Flushing %d registration status updates', len(pending))
+
+            try :
+                failed = self.__api.post_custom_properties_batch(self.__name, pending)
+            except Exception as e :
+                self.__logger.error('Failed to post status updates in bulk with error %s', str(e))
+                failed = [update['identifier'] for update in pending]
+
+            # Retry updates individually so that a single failure does not lose the others
+            for update in pending :
+                if update['identifier'] in failed :
+                    try :
+                        self.__api.post_custom_properties(
+                            update['identifier'], self.__name, update['data'], update['calendar'])
+                    except Exception as e :
+                        self.__logger.error('Failed to update event %s status with error %s',
+                            update['identifier'], str(e))
+                        result.append(update['identifier'])
+            self.__failed.extend(result)
+
+            if self.__listener is not None :
+                self.__listener(
+                    [update for update in pending if update['identifier'] not in result])
+
+        return result
@@ -0,0 +1,110 @@
+# -------------------------------------------------------
+# Copyright (c) [2024] FASNY
+# All rights reserved
+# -------------------------------------------------------
+""" Calendar identifiers cache, persisted across runs """
+# -------------------------------------------------------
+# Nadège LEMPERIERE, @19th October 2026
+# Latest revision: 19th October 2026
+# -------------------------------------------------------
+
+# System includes
+from logging    import getLogger
+from threading  import Lock
+from json       import dumps, loads
+from os         import replace, path
+
+class CalendarCache:
+    """ Calendar identifiers by name for each account, validated before use """
+
+    s_Version = 1
+
+    # Registrations configured with the same file save it in turn
+    s_Lock = Lock()
+
+    def __init__(self, filename):
+        """
+        Constructor
+        Parameters :
+            filename (str) : Path to the json cache file, created on first save
+        """
+
+        self.__logger = getLogger('registration')
+
+        self.__filename = filename
+
+    def get(self, account, name):
+        """
+        Get the cached identifier of a calendar
+        Parameters     :
+            account (str) : Account owning the calendar
+            name (str)    : Name of the calendar
+        Returns (str)  : The calendar identifier, None if not cached
+        """
+        return self.__load().get(account, {}).get(name)
+
+    def resolve(self, account, names, listing, validate):
+        """
+        Resolve calendars names into identifiers. Cached identifiers are validated, and the
+        calendars missing from the cache or no longer valid are all looked for in a single listing
+        Parameters     :
+            account (str)        : Account owning the calendars
+            names (list)         : Names of the calendars to resolve
+            listing (function)   : Function listing all the account calendars, as name and id
+            validate (function)  : Function checking that an identifier still belongs to a name
+        Returns (dict) : Identifiers by name, the calendars not found being left out
+        Throws         : Exception if the listing or the validation fails
+        """
+
+        result = {}
+        cached = self.__load().get(account, {})
+
+        missing = []
+        for name in dict.fromkeys(names) :
+            if name in cached and validate(cached[name], name) : result[name] = cached[name]
+            else : missing.append(name)
+
+        if len(missing) > 0 :
+            self.__logger.info('---> %d calendars not cached, listing calendars', len(missing))
+            for calendar in listing() :
+                if calendar['name'] in missing : result[calendar['name']] = calendar['id']
+            self.__save(account, {name : result.get(name) for name in missing})
+        else : self.__logger.info('---> %d calendars found in cache', len(result))
+
+        return result
+
+    def __load(self):
+        """ Read the cache file, an unreadable or outdated cache being considered empty """
+
+        result = {}
+
+        if path.exists(self.__filename) :
+            try :
+                with open(self.__filename, encoding='utf-8') as file : content = loads(file.read())
+                if content.get('version') == CalendarCache.s_Version :
+                    result = content.get('accounts', {})
+            except (OSError, ValueError) as e :
+                self.__logger.warning('Ignoring calendar cache %s : %s', self.__filename, str(e))
+
+        return result
+
+    def __save(self, account, identifiers):
+        """
+        Update the cache file with the identifiers of an account, replacing it atomically
+        Parameters     :
+            account (str)      : Account owning the calendars
+            identifiers (dict) : Identifiers by name, None to forget a calendar
+        """
+
+        with CalendarCache.s_Lock :
+            accounts = self.__load()
+            calendars = accounts.setdefault(account, {})
+            for name, identifier in identifiers.items() :
+                if identifier is None : calendars.pop(name, None)
+                else : calendars[name] = identifier
+
+            temporary = self.__filename + '.tmp'
+            with open(temporary, 'w', encoding='utf-8') as file :
+                file.write(dumps({'version' : CalendarCache.s_Version, 'accounts' : accounts},
+                    indent=4))
+            replace(temporary, self.__filename)
@@ -0,0 +1,252 @@
+# -------------------------------------------------------
+# Copyright (c) [2024] FASNY
+# All rights reserved
+# -------------------------------------------------------
+""" Record and replay of the providers http traffic """
+# -------------------------------------------------------
+# Nadège LEMPERIERE, @19th October 2026
+# Latest revision: 19th October 2026
+# -------------------------------------------------------
+
+# System includes
+from logging        import getLogger
+from threading      import Lock
+from json           import dumps, loads
+from gzip           import open as gzopen
+from base64         import b64encode, b64decode
+from urllib.parse   import urlsplit, urlencode, parse_qsl
+from os             import replace
+
+#pylint: disable=W0719
+class Cassette:
+    """ Compressed http interactions, recorded from a run or replayed instead of sending them """
+
+    s_Version = 1
+    s_Redacted = 'REDACTED'
+
+    # Json fields holding credentials, never written into the cassette. Generic names such as code
+    # are left out, since they also carry the error codes of the replayed responses
+    s_Secrets = ['access_token', 'refresh_token', 'id_token', 'client_secret', 'password']
+
+    # Url query and oauth form parameters holding secrets, never written into the cassette
+    s_Parameters = s_Secrets + ['client_id', 'code', 'key', 'token']
+
+    # Response headers worth replaying
+    s_Headers = ['content-type', 'retry-after', 'location']
+
+    def __init__(self, filename, mode):
+        """
+        Constructor
+        Parameters :
+            filename (str) : Path to the gzip compressed cassette file
+            mode (str)     : 'record' to capture the run traffic, 'replay' to serve it from the file
+        Throws     : Exception if the mode is unknown or the cassette can not be read
+        """
+
+        self.__logger = getLogger('registration')
+
+        if mode not in ['record', 'replay'] : raise Exception(f'Unknown cassette mode {mode}')
+
+        self.__filename = filename
+        self.__mode = mode
+        self.__lock = Lock()
+        self.__interactions = []
+        self.__queues = {}
+
+        if mode == 'replay' :
+            with gzopen(filename, 'rt', encoding='utf-8') as file : content = loads(file.read())
+            if content.get('version') != Cassette.s_Version :
+                raise Exception(f'Unsupported cassette version {content.get("version")}')
+            for interaction in content['interactions'] :
+                key = Cassette.__key(interaction['method'], interaction['url'])
+                self.__queues.setdefault(key, []).append(interaction)
+            self.__logger.info('---> Replaying %d http interactions from %s',
+                len(content['interactions']), filename)
+        else :
+            self.__logger.info('---> Recording http interactions in %s', filename)
+
+    @property
+    def replaying(self):
+        """ True if requests are served from the cassette instead of the network """
+        return self.__mode == 'replay'
+
+    def record(self, method, url, body, status, headers, content):    #pylint: disable=R0913
+        """
+        Record an interaction, redacting its secrets
+        Parameters :
+            method (str)   : Http method
+            url (str)      : Request url
+            body (object)  : Request body, as a dictionary, a string or bytes
+            status (int)   : Response status code
+            headers (dict) : Response headers
+            content (bytes): Response body
+        """
+
+        interaction = {
+            'method'  : method.upper(),
+            'url'     : Cassette.__redact_url(url),
+            'body'    : Cassette.__redact_body(body),
+            'status'  : status,
+            'headers' : {key.lower() : value for key, value in (headers or {}).items() \
+                if key.lower() in Cassette.s_Headers},
+        }
+        interaction.update(Cassette.__encode(Cassette.__redact_content(content)))
+
+        with self.__lock : self.__interactions.append(interaction)
+
+    def replay(self, method, url):
+        """
+        Serve the next recorded interaction matching a request
+        Parameters :
+            method (str) : Http method
+            url (str)    : Request url
+        Returns (dict) : Response status, headers and content (bytes)
+        Throws     : Exception if no recorded interaction is left for the request
+        """
+
+        key = Cassette.__key(method, url)
+
+        with self.__lock :
+            queue = self.__queues.get(key, [])
+            if len(queue) == 0 : raise Exception(f'No recorded interaction for {key[0]} {key[1]}')
+            interaction = queue.pop(0)
+
+        return {
+            'status'  : interaction['status'],
+            'headers' : interaction['headers'],
+            'content' : Cassette.__decode(interaction)
+        }
+
+    def wrap(self, method, function):
+        """
+        Record or replay a requests like function, such as requests.get or requests.post
+        Parameters :
+            method (str)        : Http method the function sends
+            function (function) : Function taking the url first and returning a response
+        Returns (function) : The recording or replaying function
+        """
+
+        def recorded(url, *args, **kwargs) :
+
+            if self.replaying : return CassetteResponse(self.replay(method, url))
+
+            response = function(url, *args, **kwargs)
+            body = dumps(kwargs['json']) if 'json' in kwargs else kwargs.get('data')
+            self.record(method, url, body, response.status_code,
+                dict(getattr(response, 'headers', None) or {}), response.content)
+
+            return response
+
+        return recorded
+
+    def save(self):
+        """ Write the recorded interactions into the cassette, replacing it atomically """
+
+        if not self.replaying :
+            with self.__lock :
+                content = {
+                    'version' : Cassette.s_Version, 'interactions' : list(self.__interactions)}
+            temporary = self.__filename + '.tmp'
+            with gzopen(temporary, 'wt', encoding='utf-8') as file : file.write(dumps(content))
+            replace(temporary, self.__filename)
+            self.__logger.info('---> %d http interactions recorded', len(content['interactions']))
+
+    @staticmethod
+    def __key(method, url):
+        """ Replay key of a request : its method and its url without query """
+        parts = urlsplit(url)
+        return method.upper(), parts.netloc + parts.path
+
+    @staticmethod
+    def __redact(value, secrets):
+        """ Replace the secrets of a json value, whatever their depth """
+
+        result = value
+        if isinstance(value, dict) :
+            result = {key : Cassette.s_Redacted if key.lower() in secrets \
+                else Cassette.__redact(item, secrets) for key, item in value.items()}
+        elif isinstance(value, list) :
+            result = [Cassette.__redact(item, secrets) for item in value]
+
+        return result
+
+    @staticmethod
+    def __redact_url(url):
+        """ Replace the secrets of an url query """
+
+        parts = urlsplit(url)
+        query = [(key, Cassette.s_Redacted if key.lower() in Cassette.s_Parameters else value) \
+            for key, value in parse_qsl(parts.query, keep_blank_values=True)]
+
+        return parts._replace(query=urlencode(query)).geturl()
+
+    @staticmethod
+    def __redact_body(body):
+        """
+        Replace the secrets of a request body : the credentials of a json body, and the secret
+        parameters of a form body, given as a dictionary or form encoded
+        """
+
+        result = body
+        if isinstance(body, bytes) : body = body.decode('utf-8', errors='replace')
+        if isinstance(body, str) :
+            try :
+                result = Cassette.__redact(loads(body), Cassette.s_Secrets)
+            except ValueError :
+                if '=' in body and '\n' not in body :
+                    result = Cassette.__redact(
+                        dict(parse_qsl(body, keep_blank_values=True)), Cassette.s_Parameters)
+        elif isinstance(body, (dict, list)) :
+            result = Cassette.__redact(body, Cassette.s_Parameters)
+
+        return result
+
+    @staticmethod
+    def __redact_content(content):
+        """ Replace the secrets of a json response body """
+
+        result = content or b''
+        try :
+            result = dumps(Cassette.__redact(loads(result), Cassette.s_Secrets)).encode('utf-8')
+        except ValueError :
+            pass
+
+        return result
+
+    @staticmethod
+    def __encode(content):
+        """ Store a response body as text when possible, as base64 otherwise """
+
+        try :
+            result = {'content' : content.decode('utf-8')}
+        except UnicodeDecodeError :
+            result = {'content64' : b64encode(content).decode('ascii')}
+
+        return result
+
+    @staticmethod
+    def __decode(interaction):
+        """ Restore a recorded response body """
+
+        if 'content64' in interaction : return b64decode(interaction['content64'])
+        return interaction['content'].encode('utf-8')
+
+class CassetteResponse:
+    """ requests like response replayed from a cassette """
+
+    def __init__(self, interaction):
+        """
+        Constructor
+        Parameters :
+            interaction (dict) : Replayed status, headers and content
+        """
+
+        self.status_code = interaction['status']
+        self.headers = interaction['headers']
+        self.content = interaction['content']
+        self.text = self.content.decode('utf-8', errors='replace')
+
+    def json(self):
+        """ Decode the json response body """
+        return loads(self.content.decode('utf-8'))
+#pylint: enable=W0719
@@ -0,0 +1,228 @@
+# -------------------------------------------------------
+# Copyright (c) [2024] FASNY
+# All rights reserved
+# -------------------------------------------------------
+""" Resident scheduler running registrations periodically or on demand """
+# -------------------------------------------------------
+# Nadège LEMPERIERE, @19th October 2026
+# Latest revision: 19th October 2026
+# -------------------------------------------------------
+
+# System includes
+from logging        import getLogger
+from datetime       import datetime, timedelta, timezone
+from threading      import Event, Lock, Thread
+from random         import uniform
+from json           import dumps
+from time           import perf_counter
+from http.server    import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+#pylint: disable=W0719
+class Schedule:
+    """ Cron like schedule : minute, hour, day of month, month and day of week (UTC) """
+
+    s_Ranges = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+
+    def __init__(self, expression):
+        """
+        Constructor
+        Parameters :
+            expression (str) : Cron expression, such as '0 4 * * *'
+        Throws     : Exception if the expression is invalid
+        """
+
+        fields = expression.split()
+        if len(fields) != 5 : raise Exception(f'Invalid schedule {expression}')
+
+        self.__values = []
+        for field, (low, high) in zip(fields, Schedule.s_Ranges) :
+            self.__values.append(Schedule.__parse(field, low, high))
+
+        # Sunday may be written 7
+        if 7 in self.__values[4] : self.__values[4].add(0)
+
+        # As in cron, days match on either day of month or day of week when both are restricted
+        self.__any_day = fields[2] == '*' or fields[4] == '*'
+
+    def next(self, after):
+        """
+        Compute the next time the schedule fires
+        Parameters :
+            after (datetime) : Time after which to look for
+        Returns (datetime) : Next firing time (UTC)
+        Throws     : Exception if the schedule never fires
+        """
+
+        minutes, hours, months = self.__values[0], self.__values[1], self.__values[3]
+
+        result = after.astimezone(timezone.utc).replace(second=0, microsecond=0)
+        result = result + timedelta(minutes=1)
+        limit = result + timedelta(days=366 * 4)
+
+        while result < limit :
+            if result.month not in months :
+                result = result.replace(day=1, hour=0, minute=0) + timedelta(days=32)
+                result = result.replace(day=1)
+            elif not self.__match_day(result) :
+                result = result.replace(hour=0, minute=0) + timedelta(days=1)
+            elif result.hour not in hours :
+                result = result.replace(minute=0) + timedelta(hours=1)
+            elif result.minute not in minutes :
+                result = result + timedelta(minutes=1)
+            else :
+                return result
+
+        raise Exception('Schedule never fires')
+
+    def __match_day(self, date):
+        """ Check if a date matches the day of month and day of week fields """
+
+        by_month = date.day in self.__values[2]
+        by_week = (date.weekday() + 1) % 7 in self.__values[4]
+
+        result = by_month or by_week
+        if self.__any_day : result = by_month and by_week
+
+        return result
+
+    @staticmethod
+    def __parse(field, low, high):
+        """ Parse a cron field made of '*', values, ranges and steps into a set of values """
+
+        result = set()
+
+        for item in field.split(',') :
+            step = 1
+            if '/' in item :
+                item, step = item.split('/')
+                step = int(step)
+            if item == '*' : start, end = low, high
+            elif '-' in item : start, end = (int(value) for value in item.split('-'))
+            else :
+                start = int(item)
+                end = high if step != 1 else start
+            if start < low or end > high or step < 1 :
+                raise Exception(f'Invalid schedule field {field}')
+            result.update(range(start, end + 1, step))
+
+        return result
+
+#pylint: disable=R0902, R0913
+class Daemon:
+    """ Run a job on a schedule with jitter, and on demand through a local http endpoint """
+
+    def __init__(self, job, schedule, jitter=0, host='127.0.0.1', port=0):
+        """
+        Constructor
+        Parameters :
+            job (function)     : Function performing a run
+            schedule (Schedule): Schedule of the periodic runs
+            jitter (int)       : Maximum random delay in seconds added to the periodic runs
+            host (str)         : Address the trigger endpoint listens to
+            port (int)         : Port the trigger endpoint listens to, 0 for any free port
+        """
+
+        self.__logger = getLogger('registration')
+
+        self.__job = job
+        self.__schedule = schedule
+        self.__jitter = jitter
+        self.__lock = Lock()
+        self.__stop = Event()
+        self.__status = {'runs' : 0, 'failures' : 0, 'last' : None, 'next' : None}
+
+        daemon = self
+        logger = self.__logger
+        class Handler(BaseHTTPRequestHandler):
+            """ Trigger endpoint : POST /run runs the job, GET /status reports the runs """
+
+            def do_POST(self):    #pylint: disable=C0103
+                """ Run the job now, unless a run is already in progress """
+                if self.path != '/run' : self.__reply(404, {'error' : 'Unknown endpoint'})
+                else :
+                    code, body = daemon.run(blocking=False)
+                    self.__reply(code, body)
+
+            def do_GET(self):     #pylint: disable=C0103
+                """ Report the runs status """
+                if self.path != '/status' : self.__reply(404, {'error' : 'Unknown endpoint'})
+                else : self.__reply(200, daemon.status())
+
+            def log_message(self, format, *args):    #pylint: disable=W0622
+                """ Route http server logs to the registration logger """
+                logger.debug('---> Trigger endpoint : ' + format, *args)
+
+            def __reply(self, code, body):
+                """ Send a json response """
+                content = dumps(body, default=str).encode('utf-8')
+                self.send_response(code)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+        self.__server = ThreadingHTTPServer((host, port), Handler)
+#pylint: enable=R0913
+
+    @property
+    def address(self):
+        """ Address and port the trigger endpoint listens to """
+        return self.__server.server_address
+
+    def status(self):
+        """
+        Report the runs performed by the daemon
+        Returns (dict) : Number of runs and failures, last run result and next scheduled run
+        """
+        return dict(self.__status)
+
+    def run(self, blocking=True):
+        """
+        Run the job, one run at a time
+        Parameters :
+            blocking (bool) : Wait for a run in progress to end instead of giving up
+        Returns (tuple) : Http like status code and run result
+        """
+
+        if not self.__lock.acquire(blocking=blocking) :    #pylint: disable=R1732
+            return 409, {'error' : 'Run already in progress'}
+
+        try :
+            start = perf_counter()
+            self.__job()
+            result = (200, {'duration' : round(perf_counter() - start, 3)})
+        except Exception as e :
+            self.__logger.error('Registration run failed with error %s', str(e))
+            self.__status['failures'] = self.__status['failures'] + 1
+            result = (500, {'error' : str(e)})
+        finally :
+            self.__status['runs'] = self.__status['runs'] + 1
+            self.__lock.release()
+
+        self.__status['last'] = dict(result[1], time=datetime.now(timezone.utc).isoformat())
+        return result
+
+    def serve(self):
+        """ Listen to triggers and run the job on schedule until stopped """
+
+        listener = Thread(target=self.__server.serve_forever, daemon=True)
+        listener.start()
+        self.__logger.info('---> Listening to triggers on %s:%d', *self.address[:2])
+
+        try :
+            while not self.__stop.is_set() :
+                planned = self.__schedule.next(datetime.now(timezone.utc))
+                planned = planned + timedelta(seconds=uniform(0, self.__jitter))
+                self.__status['next'] = planned.isoformat()
+                self.__logger.info('---> Next registration run planned at %s', planned.isoformat())
+
+                delay = (planned - datetime.now(timezone.utc)).total_seconds()
+                if not self.__stop.wait(max(0, delay)) : self.run()
+        finally :
+            self.__server.shutdown()
+            self.__server.server_close()
+
+    def stop(self):
+        """ Stop serving, once the run in progress if any has ended """
+        self.__stop.set()
+#pylint: enable=W0719, R0902
@@ -0,0 +1,139 @@
+# -------------------------------------------------------
+# Copyright (c) [2024] FASNY
+# All rights reserved
+# -------------------------------------------------------
+""" Logging configuration, synchronous or drained by a background thread """
+# -------------------------------------------------------
+# Nadège LEMPERIERE, @19th October 2026
+# Latest revision: 19th October 2026
+# -------------------------------------------------------
+
+# System includes
+from logging            import Formatter, Logger, LogRecord, NullHandler, getLogger, root, config
+from logging.handlers   import QueueHandler, QueueListener
+from queue              import SimpleQueue
+from json               import dumps
+from datetime           import datetime, timezone
+from atexit             import register, unregister
+
+class JsonFormatter(Formatter):
+    """ Format log records as json lines, with the extra fields given to the logging call """
+
+    # Attributes of every log record, the others are extra fields
+    s_Standard = list(vars(LogRecord('', 0, '', 0, '', None, None)).keys()) + ['message', 'asctime']
+
+    def format(self, record):
+        """
+        Format a record
+        Parameters :
+            record (LogRecord) : Record to format
+        Returns (str) : Json line with the record time, level, logger, line and message
+        """
+
+        result = {
+            'time'    : datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level'   : record.levelname,
+            'logger'  : record.name,
+            'line'    : record.lineno,
+            'message' : record.getMessage()
+        }
+        for key, value in vars(record).items() :
+            if key not in JsonFormatter.s_Standard : result[key] = value
+        if record.exc_info : result['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text : result['exception'] = record.exc_text
+
+        return dumps(result, default=str)
+
+class LazyQueueHandler(QueueHandler):
+    """
+    Queue handler leaving the records untouched, their message and traceback being rendered by
+    the listener formatters in the background thread
+    """
+
+    def prepare(self, record):
+        """
+        Prepare a record for queuing. The queue is shared in process, so the record is enqueued
+        as is, keeping its arguments and exception information for the listener
+        Parameters :
+            record (LogRecord) : Record to enqueue
+        Returns (LogRecord) : The record itself
+        """
+        return record
+
+#pylint: disable=W0719
+class Logs:
+    """
+    Logging setup from a configuration file. In the queue and json modes, the configured loggers
+    only enqueue their records, and the configured handlers write them from a background thread
+    """
+
+    s_Modes = ['text', 'queue', 'json']
+
+    def __init__(self, filename, mode='text'):
+        """
+        Constructor
+        Parameters :
+            filename (str) : Path to the logging configuration file
+            mode (str)     : 'text' to write records synchronously as configured, 'queue' to write
+                             them from a background thread, 'json' to also format them as json
+        Throws     : Exception if the mode is unknown
+        """
+
+        if mode not in Logs.s_Modes : raise Exception(f'Unknown logging mode {mode}')
+
+        config.fileConfig(filename)
+
+        self.__listeners = []
+        self.__loggers = {}
+
+        if mode != 'text' :
+            self.__enqueue(JsonFormatter() if mode == 'json' else None)
+            register(self.stop)
+
+    @property
+    def handlers(self):
+        """ Handlers writing the records, in the background thread in the queue and json modes """
+
+        result = []
+        for handlers in self.__loggers.values() :
+            for handler in handlers :
+                if handler not in result : result.append(handler)
+
+        return result
+
+    def stop(self):
+        """ Write the queued records and give the configured handlers back to the loggers """
+
+        for listener in self.__listeners : listener.stop()
+        for logger, handlers in self.__loggers.items() :
+            for handler in list(logger.handlers) : logger.removeHandler(handler)
+            for handler in handlers : logger.addHandler(handler)
+
+        self.__listeners = []
+        self.__loggers = {}
+        unregister(self.stop)
+
+    def __enqueue(self, formatter):
+        """ Replace the loggers handlers by queues, each set of handlers draining its own queue """
+
+        queues = {}
+        loggers = [root] + [getLogger(name) for name, logger in Logger.manager.loggerDict.items() \
+            if isinstance(logger, Logger)]
+
+        for logger in loggers :
+            if all(isinstance(handler, NullHandler) for handler in logger.handlers) : continue
+
+            handlers = tuple(logger.handlers)
+            if handlers not in queues :
+                queue = SimpleQueue()
+                if formatter is not None :
+                    for handler in handlers : handler.setFormatter(formatter)
+                listener = QueueListener(queue, *handlers, respect_handler_level=True)
+                listener.start()
+                self.__listeners.append(listener)
+                queues[handlers] = LazyQueueHandler(queue)
+
+            self.__loggers[logger] = handlers
+            for handler in handlers : logger.removeHandler(handler)
+            logger.addHandler(queues[handlers])
+#pylint: enable=W0719
@@ -0,0 +1,208 @@
+# -------------------------------------------------------
+# Copyright (c) [2024] FASNY
+# All rights reserved
+# -------------------------------------------------------
+""" Timing metrics of the registration stages and API calls """
+# -------------------------------------------------------
+# Nadège LEMPERIERE, @19th October 2026
+# Latest revision: 19th October 2026
+# -------------------------------------------------------
+
+# System includes
+from logging    import getLogger
+from threading  import Lock
+from time       import perf_counter
+from contextlib import contextmanager
+from functools  import wraps
+from json       import dumps
+from os         import path, replace
+
+class Metrics:
+    """ Count, time and track failures of registration stages and API calls """
+
+    s_Prefix = 'registration'
+
+    def __init__(self):
+        """ Constructor """
+
+        self.__logger = getLogger('registration')
+
+        self.__lock = Lock()
+        self.__series = {}
+        self.__observers = []
+
+    @contextmanager
+    def timed(self, kind, **labels):
+        """
+        Time a block of code, counting it as failed if it raises
+        Parameters :
+            kind (str)    : Kind of the timed operation, such as 'stage' or 'api'
+            labels (dict) : Labels identifying the timed operation
+        """
+
+        failed = False
+        start = perf_counter()
+        try :
+            yield
+        except Exception :
+            failed = True
+            raise
+        finally :
+            self.record(kind, perf_counter() - start, failed, **labels)
+            for observer in self.__observers : observer(kind, labels)
+
+    def observe(self, observer):
+        """
+        Call a function at the end of each timed operation
+        Parameters :
+            observer (function) : Function taking the operation kind and labels
+        """
+        self.__observers.append(observer)
+
+    def record(self, kind, duration, failed=False, **labels):
+        """
+        Record an operation duration
+        Parameters :
+            kind (str)       : Kind of the operation, such as 'stage' or 'api'
+            duration (float) : Operation duration in seconds
+            failed (bool)    : True if the operation failed
+            labels (dict)    : Labels identifying the operation
+        """
+
+        key = (kind, tuple(sorted(labels.items())))
+        with self.__lock :
+            series = self.__series.setdefault(
+                key, {'count' : 0, 'failures' : 0, 'duration' : 0.0, 'max' : 0.0})
+            series['count'] = series['count'] + 1
+            series['duration'] = series['duration'] + duration
+            series['max'] = max(series['max'], duration)
+            if failed : series['failures'] = series['failures'] + 1
+
+    def instrument(self, target, kind='api', **labels):
+        """
+        Wrap an object so that all its public method calls are timed
+        Parameters :
+            target (object) : Object to instrument
+            kind (str)      : Kind of the timed calls
+            labels (dict)   : Labels added to the method name to identify the calls
+        Returns (Instrumented) : Proxy timing the target method calls
+        """
+        return Instrumented(target, self, kind, labels)
+
+    def snapshot(self):
+        """
+        Gather the recorded metrics
+        Returns (dict) : Metrics by kind, as a list of series with their labels
+        """
+
+        result = {}
+
+        with self.__lock :
+            for (kind, labels), series in sorted(self.__series.items()) :
+                item = dict(labels)
+                item.update(series)
+                item['duration'] = round(item['duration'], 6)
+                item['max'] = round(item['max'], 6)
+                result.setdefault(kind, []).append(item)
+
+        return result
+
+    def to_json(self):
+        """
+        Format the recorded metrics as json
+        Returns (str) : Metrics in json format
+        """
+        return dumps(self.snapshot(), indent=4)
+
+    def to_prometheus(self):
+        """
+        Format the recorded metrics in the prometheus text exposition format
+        Returns (str) : Metrics in prometheus format
+        """
+
+        result = []
+
+        for kind, items in self.snapshot().items() :
+            for field, suffix, kind_type in [
+                ('count', 'calls_total', 'counter'),
+                ('failures', 'failures_total', 'counter'),
+                ('duration', 'duration_seconds_total', 'counter'),
+                ('max', 'duration_seconds_max', 'gauge')] :
+
+                name = f'{Metrics.s_Prefix}_{kind}_{suffix}'
+                result.append(f'# TYPE {name} {kind_type}')
+                for item in items :
+                    labels = ','.join(f'{key}="{value}"' for key, value in item.items() \
+                        if key not in ['count', 'failures', 'duration', 'max'])
+                    result.append(f'{name}{{{labels}}} {item[field]}')
+
+        return '\n'.join(result) + '\n'
+
+    def export(self, json=None, prometheus=None):
+        """
+        Write the recorded metrics into files, replacing them atomically
+        Parameters :
+            json (str)       : Path to the json file, None to skip it
+            prometheus (str) : Path to the prometheus textfile, None to skip it
+        """
+
+        for filename, content in [(json, self.to_json), (prometheus, self.to_prometheus)] :
+            if filename is not None :
+                temporary = filename + '.tmp'
+                with open(temporary, 'w', encoding='utf-8') as file : file.write(content())
+                replace(temporary, filename)
+                self.__logger.info('---> Metrics exported in %s', path.basename(filename))
+
+class Instrumented:
+    """ Proxy timing the public method calls of an object """
+
+    def __init__(self, target, metrics, kind, labels):
+        """
+        Constructor
+        Parameters :
+            target (object)   : Object to instrument
+            metrics (Metrics) : Metrics to record the calls into
+            kind (str)        : Kind of the timed calls
+            labels (dict)     : Labels added to the method name to identify the calls
+        """
+
+        self.__target = target
+        self.__metrics = metrics
+        self.__kind = kind
+        self.__labels = labels
+
+    def __getattr__(self, name):
+        """ Retrieve a target attribute, wrapping public methods to time them """
+
+        result = getattr(self.__target, name)
+
+        if callable(result) and not name.startswith('_') :
+            method = result
+
+            @wraps(method)
+            def timed(*args, **kwargs) :
+                with self.__metrics.timed(self.__kind, method=name, **self.__labels) :
+                    return method(*args, **kwargs)
+
+            result = timed
+
+        return result
+
+def stage(name):
+    """
+    Decorate a method to time it as a stage, in the metrics of its object
+    Parameters :
+        name (str) : Stage name
+    Returns (function) : Decorator
+    """
+
+    def decorator(method) :
+
+        @wraps(method)
+        def timed(self, *args, **kwargs) :
+            with self.metrics.timed('stage', stage=name) :
+                return method(self, *args, **kwargs)
+
+        return timed
+
+    return decorator
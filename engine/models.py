@@ -0,0 +1,98 @@
+# -------------------------------------------------------
+# Copyright (c) [2024] FASNY
+# All rights reserved
+# -------------------------------------------------------
+""" Provider neutral records of calendar events, contacts and registrations """
+# -------------------------------------------------------
+# Nadège LEMPERIERE, @19th October 2026
+# Latest revision: 19th October 2026
+# -------------------------------------------------------
+
+# System includes
+from dataclasses    import dataclass, field
+from datetime       import datetime
+
+@dataclass(slots=True)
+class Attendee:
+    """
+    Person attending an event
+    Attributes :
+        mail (str) : Email address
+        name (str) : Display name from the contacts list, empty if unknown
+    """
+
+    mail : str
+    name : str = ''
+
+@dataclass(slots=True)
+class Contact:
+    """
+    Contact of the authorized user
+    Attributes :
+        name (str)         : Display name
+        mails (list)       : Email addresses
+        categories (list)  : Categories, or contact groups labels
+        roles (tuple)      : Registration roles given by the categories, 'students' or 'adults'
+    """
+
+    s_Roles = {'student' : 'students', 'adult' : 'adults'}
+
+    name : str
+    mails : list = field(default_factory=list)
+    categories : list = field(default_factory=list)
+    roles : tuple = field(init=False, default=())
+
+    def __post_init__(self):
+        self.roles = tuple(Contact.s_Roles[category.lower()] for category in self.categories \
+            if category.lower() in Contact.s_Roles)
+
+@dataclass(slots=True)
+class Event:    #pylint: disable=R0902
+    """
+    Calendar event
+    Attributes :
+        identifier (str)  : Event identifier in its calendar
+        subject (str)     : Event title
+        cancelled (bool)  : True if the event is cancelled, or if its status is unknown
+        all_day (bool)    : True if the event lasts whole days
+        start (str)       : Start date, ISO formatted without time zone
+        end (str)         : End date, ISO formatted without time zone
+        start_zone (str)  : Time zone of the start date
+        end_zone (str)    : Time zone of the end date
+        attendees (list)  : Attendees invited to the event
+    """
+
+    identifier : str
+    subject : str = ''
+    cancelled : bool = True
+    all_day : bool = False
+    start : str = ''
+    end : str = ''
+    start_zone : str = 'UTC'
+    end_zone : str = 'UTC'
+    attendees : list = field(default_factory=list)
+
+@dataclass(slots=True)
+class RegistrationStatus:
+    """
+    Registration status of an event, as last written in the calendar
+    Attributes :
+        start (datetime)   : Start date of the registration, None if the event was never registered
+        end (datetime)     : End date of the registration
+        students (list)    : Registered students
+        adults (list)      : Registered adults
+        digest (str)       : Content hash of the registered attendees, empty for legacy statuses
+        fingerprint (str)  : Fingerprint of the registered timeslot and attendees
+    """
+
+    start : datetime = None
+    end : datetime = None
+    students : list = field(default_factory=list)
+    adults : list = field(default_factory=list)
+    digest : str = ''
+    fingerprint : str = ''
+
+    @property
+    def registered(self):
+        """ True if the event has already been registered """
+        return self.start is not None
@@ -0,0 +1,165 @@
+# -------------------------------------------------------
+# Copyright (c) [2024] FASNY
+# All rights reserved
+# -------------------------------------------------------
+""" Durable outbox journaling emails and registration status writes """
+# -------------------------------------------------------
+# Nadège LEMPERIERE, @19th October 2026
+# Latest revision: 19th October 2026
+# -------------------------------------------------------
+
+# System includes
+from logging    import getLogger
+from sqlite3    import connect
+from json       import dumps, loads
+from time       import time
+
+# Local includes
+from engine.models import Event
+
+class Outbox:
+    """ SQLite journal of rendered emails and of their pending status writes """
+
+    s_Pending = 'pending'
+    s_Sent = 'sent'
+    s_Done = 'done'
+    s_Superseded = 'superseded'
+
+    def __init__(self, filename, retention=30):
+        """
+        Constructor
+        Parameters :
+            filename (str)  : Path to the SQLite database
+            retention (int) : Number of days completed entries are kept
+        """
+
+        self.__logger = getLogger('registration')
+
+        # Registrations may be configured in one thread and processed in another
+        self.__database = connect(filename, check_same_thread=False)
+        self.__database.execute('PRAGMA journal_mode=WAL')
+        self.__database.execute(
+            'CREATE TABLE IF NOT EXISTS outbox ('
+            'key TEXT PRIMARY KEY, calendar TEXT NOT NULL, event TEXT NOT NULL, '
+            'mail TEXT NOT NULL, status TEXT NOT NULL, state TEXT NOT NULL, '
+            'updated REAL NOT NULL)')
+
+        # Forget entries completed or superseded long ago
+        self.__database.execute(
+            'DELETE FROM outbox WHERE state IN (?, ?) AND updated < ?',
+            (Outbox.s_Done, Outbox.s_Superseded, time() - retention * 86400))
+        self.__database.commit()
+
+        self.__logger.info('---> Using outbox %s', filename)
+
+    @staticmethod
+    def key(calendar, identifier, status):
+        """
+        Build the key identifying an event version
+        Parameters     :
+            calendar (str)   : Identifier of the calendar containing the event
+            identifier (str) : Identifier of the event
+            status (dict)    : Registration status to write for the event
+        Returns (str)  : The event version key
+        """
+        return f"{calendar}/{identifier}/{status.get('fingerprint', '')}"
+
+    def add(self, event):
+        """
+        Journal a rendered email, unless this event version is already journaled. The older
+        versions of the event still pending or sent are superseded, so that resuming never sends
+        their stale email nor writes their stale status over the newer one
+        Parameters     :
+            event (dict) : Event with its calendar, rendered mail and status to write
+        Returns (str)  : State of the event version in the outbox
+        """
+
+        key = Outbox.key(event['calendar'], event['event'].identifier, event['status'])
+        cursor = self.__database.execute(
+            'INSERT OR IGNORE INTO outbox '
+            '(key, calendar, event, mail, status, state, updated) VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (key, event['calendar'], event['event'].identifier, event['mail'],
+             dumps(event['status']), Outbox.s_Pending, time()))
+        if cursor.rowcount > 0 :
+            superseded = self.__database.execute(
+                'UPDATE outbox SET state = ?, updated = ? '
+                'WHERE calendar = ? AND event = ? AND key != ? AND state IN (?, ?)',
+                (Outbox.s_Superseded, time(), event['calendar'], event['event'].identifier, key,
+                 Outbox.s_Pending, Outbox.s_Sent)).rowcount
+            if superseded > 0 :
+                self.__logger.info('---> %d older versions of event %s superseded',
+                    superseded, event['event'].identifier)
+        self.__database.commit()
+
+        return self.state(event)
+
+    def state(self, event):
+        """
+        Get the state of an event version
+        Parameters     :
+            event (dict) : Event with its calendar and status to write
+        Returns (str)  : State of the event version, None if not journaled
+        """
+
+        result = None
+
+        row = self.__database.execute(
+            'SELECT state FROM outbox WHERE key = ?',
+            (Outbox.key(event['calendar'], event['event'].identifier, event['status']),)).fetchone()
+        if row is not None : result = row[0]
+
+        return result
+
+    def mark_sent(self, event):
+        """
+        Record that the email of an event version has been sent
+        Parameters     :
+            event (dict) : Event with its calendar and status to write
+        """
+        self.__mark(Outbox.key(
+            event['calendar'], event['event'].identifier, event['status']), Outbox.s_Sent)
+
+    def mark_done(self, updates):
+        """
+        Record that the status of event versions has been written in the calendar
+        Parameters     :
+            updates (list) : Posted updates, as dictionaries with identifier, data and calendar
+        """
+
+        for update in updates :
+            self.__mark(
+                Outbox.key(update['calendar'], update['identifier'], update['data']),
+                Outbox.s_Done)
+
+    def unfinished(self):
+        """
+        List the event versions whose email or status write is still pending
+        Returns (list) : Events with their calendar, rendered mail and status to write
+        """
+
+        result = []
+
+        rows = self.__database.execute(
+            'SELECT calendar, event, mail, status FROM outbox '
+            'WHERE state IN (?, ?) ORDER BY updated',
+            (Outbox.s_Pending, Outbox.s_Sent)).fetchall()
+        for calendar, identifier, mail, status in rows :
+            result.append({
+                'event' : Event(identifier),
+                'calendar' : calendar,
+                'mail' : mail,
+                'status' : loads(status)
+            })
+
+        return result
+
+    def close(self):
+        """ Close the database """
+        self.__database.close()
+
+    def __mark(self, key, state):
+        """ Update the state of an event version """
+
+        self.__database.execute(
+            'UPDATE outbox SET state = ?, updated = ? WHERE key = ?', (state, time(), key))
+        self.__database.commit()
@@ -0,0 +1,198 @@
+# -------------------------------------------------------
+# Copyright (c) [2024] FASNY
+# All rights reserved
+# -------------------------------------------------------
+""" Cpu and memory profiling of registration runs """
+# -------------------------------------------------------
+# Nadège LEMPERIERE, @19th October 2026
+# Latest revision: 19th October 2026
+# -------------------------------------------------------
+
+# System includes
+from logging        import getLogger
+from threading      import Thread, Event, get_ident, enumerate as threads
+from cProfile       import Profile
+from sys            import _current_frames
+from os             import path
+from fnmatch        import fnmatch
+import tracemalloc
+
+#pylint: disable=W0719
+class Profiler:
+    """
+    Cpu profiler, writing a pstats file when using cProfile, and sampled call stacks in the
+    collapsed format flamegraph tools read in both modes
+    """
+
+    s_Modes = ['cprofile', 'sampling']
+
+    def __init__(self, filename, mode='cprofile', interval=0.005):
+        """
+        Constructor
+        Parameters :
+            filename (str)   : Path to the pstats file, the collapsed stacks being written in the
+                               same path with the .collapsed extension
+            mode (str)       : 'cprofile' to profile every call of the calling thread and sample
+                               stacks, 'sampling' to only sample stacks, with a lower overhead
+            interval (float) : Delay in seconds between two stacks samples
+        Throws     : Exception if the mode is unknown
+        """
+
+        self.__logger = getLogger('registration')
+
+        if mode not in Profiler.s_Modes : raise Exception(f'Unknown profiler mode {mode}')
+
+        self.__filename = filename
+        self.__interval = interval
+        self.__profile = Profile() if mode == 'cprofile' else None
+        self.__stacks = {}
+        self.__stop = Event()
+        self.__thread = Thread(target=self.__sample, daemon=True)
+
+    @property
+    def collapsed(self):
+        """ Path to the collapsed stacks file """
+        return path.splitext(self.__filename)[0] + '.collapsed'
+
+    def start(self):
+        """ Start profiling """
+
+        self.__logger.info('---> Profiling run into %s', self.__filename)
+        self.__thread.start()
+        if self.__profile is not None : self.__profile.enable()
+
+    def stop(self):
+        """ Stop profiling and write the profiles """
+
+        if self.__profile is not None :
+            self.__profile.disable()
+            self.__profile.dump_stats(self.__filename)
+        self.__stop.set()
+        self.__thread.join()
+
+        with open(self.collapsed, 'w', encoding='utf-8') as file :
+            for stack, count in sorted(self.__stacks.items()) : file.write(f'{stack} {count}\n')
+
+        self.__logger.info('---> %d stacks sampled', sum(self.__stacks.values()))
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, kind, value, traceback):
+        self.stop()
+
+    def __sample(self):
+        """ Sample the stacks of the other threads until stopped """
+
+        names = {}
+        while not self.__stop.wait(self.__interval) :
+            for thread in threads() : names[thread.ident] = thread.name
+            for ident, frame in _current_frames().items() :
+                if ident == get_ident() : continue
+                stack = []
+                while frame is not None :
+                    code = frame.f_code
+                    filename = path.basename(code.co_filename)
+                    stack.append(f'{code.co_qualname} ({filename}:{code.co_firstlineno})')
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                key = ';'.join(reversed(stack))
+                self.__stacks[key] = self.__stacks.get(key, 0) + 1
+
+class MemoryProfiler:
+    """ Memory profiler, reporting the top allocating lines of each registration stage """
+
+    # Files whose allocations are reported, including those they make through libraries
+    s_Files = ['*/manager.py', '*/api/*.py', '*/engine/*.py', '*/mail/*.py']
+    s_Excluded = ['*/engine/profiler.py']
+    s_Depth = 12
+
+    def __init__(self, filename, top=10):
+        """
+        Constructor
+        Parameters :
+            filename (str) : Path to the report file
+            top (int)      : Number of allocating lines reported for each stage
+        """
+
+        self.__logger = getLogger('registration')
+
+        self.__filename = filename
+        self.__top = top
+        self.__previous = None
+        self.__reports = []
+
+    def start(self):
+        """ Start tracing allocations """
+
+        self.__logger.info('---> Profiling memory into %s', self.__filename)
+        tracemalloc.start(MemoryProfiler.s_Depth)
+        self.__previous = self.__allocations()
+
+    def observe(self, kind, labels):
+        """
+        Take a snapshot at the end of a stage, and report the lines allocating the most during it
+        Parameters :
+            kind (str)    : Kind of the ended operation, only stages are reported
+            labels (dict) : Labels identifying the operation
+        """
+
+        if kind == 'stage' and tracemalloc.is_tracing() :
+            allocations = self.__allocations()
+            current, peak = tracemalloc.get_traced_memory()
+            lines = [
+                f"== {labels.get('stage', '')} : current {current / 1024:.1f} KiB, " + \
+                f"peak {peak / 1024:.1f} KiB"]
+
+            deltas = {key : size - self.__previous.get(key, 0) for key, size in allocations.items()}
+            for (filename, line), delta in \
+                sorted(deltas.items(), key=lambda item : -abs(item[1]))[:self.__top] :
+                lines.append(f'{filename}:{line}: {delta / 1024:+.1f} KiB')
+
+            self.__reports.append('\n'.join(lines))
+            self.__previous = allocations
+            tracemalloc.reset_peak()
+
+    def stop(self):
+        """ Stop tracing allocations and write the report """
+
+        tracemalloc.stop()
+        with open(self.__filename, 'w', encoding='utf-8') as file :
+            file.write('\n\n'.join(self.__reports) + '\n')
+
+        self.__logger.info('---> %d stages memory profiled', len(self.__reports))
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, kind, value, traceback):
+        self.stop()
+
+    def __allocations(self):
+        """
+        Measure the memory allocated by each line of the registration files, allocations made
+        by libraries being attributed to the registration line calling them
+        """
+
+        result = {}
+        files = {}
+
+        for trace in tracemalloc.take_snapshot().traces :
+            for frame in reversed(trace.traceback) :
+                if frame.filename not in files : files[frame.filename] = \
+                    MemoryProfiler.__match(frame.filename, MemoryProfiler.s_Files) and \
+                    not MemoryProfiler.__match(frame.filename, MemoryProfiler.s_Excluded)
+                if files[frame.filename] :
+                    key = (frame.filename, frame.lineno)
+                    result[key] = result.get(key, 0) + trace.size
+                    break
+
+        return result
+
+    @staticmethod
+    def __match(filename, patterns):
+        """ Check if a file matches one of the patterns """
+        return any(fnmatch(filename, pattern) for pattern in patterns)
+#pylint: enable=W0719
@@ -0,0 +1,102 @@
+# -------------------------------------------------------
+# Copyright (c) [2024] FASNY
+# All rights reserved
+# -------------------------------------------------------
+""" Retry policy of the providers http requests """
+# -------------------------------------------------------
+# Nadège LEMPERIERE, @19th October 2026
+# Latest revision: 19th October 2026
+# -------------------------------------------------------
+
+# System includes
+from logging        import getLogger
+from time           import sleep
+from datetime       import datetime, timezone
+from email.utils    import parsedate_to_datetime
+
+class RetryPolicy:
+    """
+    Throttled (429) and unavailable (503) requests are retried after the delay the server asks,
+    and timed out or disconnected reads are retried at once
+    """
+
+    s_Statuses = [429, 503]
+    s_Retries = 3
+    s_Backoff = 1
+    s_MaxDelay = 60
+    s_Timeout = 30
+
+    def __init__(self, logger):
+        """
+        Constructor
+        Parameters :
+            logger (str) : Name of the logger warning about the retried requests
+        """
+
+        self.__logger = getLogger(logger)
+
+    #pylint: disable=R0913
+    def send(self, description, function, status, errors=(), idempotent=True):
+        """
+        Send a request, retrying it while it is throttled, unavailable, or timed out
+        Parameters     :
+            description (str)   : Request method and url, for the logs
+            function (function) : Function sending the request and returning its response
+            status (function)   : Function giving the status code and the Retry-After header of
+                                  a response, or of an exception raised by the request, as a tuple
+                                  (None, None) if they have none
+            errors (tuple)      : Exceptions raised when the request times out or is disconnected
+            idempotent (bool)   : True if a timed out request can be sent again, which is not the
+                                  case of a post that may already have been processed
+        Returns (object) : The last response received
+        Throws         : The request exception if it can not be retried, or keeps being raised
+        """
+
+        attempt = 0
+        while True :
+            try :
+                response = function()
+                code, retry_after = status(response)
+                if code not in RetryPolicy.s_Statuses or attempt >= RetryPolicy.s_Retries :
+                    return response
+                delay = RetryPolicy.delay(retry_after, attempt)
+                reason = str(code)
+            except errors as e :
+                if not idempotent or attempt >= RetryPolicy.s_Retries : raise
+                delay = 0
+                reason = type(e).__name__
+            except Exception as e :
+                code, retry_after = status(e)
+                if code not in RetryPolicy.s_Statuses or attempt >= RetryPolicy.s_Retries : raise
+                delay = RetryPolicy.delay(retry_after, attempt)
+                reason = str(code)
+
+            self.__logger.warning('---> %s failed with %s, retrying in %.1f seconds',
+                description, reason, delay)
+            sleep(delay)
+            attempt = attempt + 1
+    #pylint: enable=R0913
+
+    @staticmethod
+    def delay(retry_after, attempt):
+        """
+        Compute the delay before retrying a request, from its Retry-After header if any
+        Parameters     :
+            retry_after (str) : Retry-After header value, in seconds or as an http date, or None
+            attempt (int)     : Number of attempts already retried
+        Returns (float) : Delay in seconds
+        """
+
+        result = RetryPolicy.s_Backoff * 2 ** attempt
+
+        if retry_after is not None :
+            try :
+                result = float(retry_after)
+            except ValueError :
+                try :
+                    result = parsedate_to_datetime(retry_after) - datetime.now(timezone.utc)
+                    result = result.total_seconds()
+                except (TypeError, ValueError) :
+                    pass
+
+        return min(max(result, 0), RetryPolicy.s_MaxDelay)
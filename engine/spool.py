@@ -0,0 +1,109 @@
+# -------------------------------------------------------
+# Copyright (c) [2024] FASNY
+# All rights reserved
+# -------------------------------------------------------
+""" Rendered emails storage with bounded memory """
+# -------------------------------------------------------
+# Nadège LEMPERIERE, @19th October 2026
+# Latest revision: 19th October 2026
+# -------------------------------------------------------
+
+# System includes
+from logging    import getLogger
+from tempfile   import TemporaryFile
+from os         import remove, path
+from array      import array
+
+class MailSpool:    #pylint: disable=R0902
+    """ Rendered emails, kept in memory up to a size and spilled into a file beyond it """
+
+    def __init__(self, size=None, filename=None):
+        """
+        Constructor
+        Parameters :
+            size (int)     : Maximum size in bytes of the emails kept in memory, None for no limit
+            filename (str) : Path to the spill file, None for an anonymous temporary file
+        """
+
+        self.__logger = getLogger('registration')
+
+        self.__size = size
+        self.__filename = filename
+        self.__file = None
+        self.__mails = {}
+        self.__offsets = array('q')
+        self.__sizes = array('q')
+        self.__held = 0
+        self.__spilled = 0
+
+    @property
+    def held(self):
+        """ Size in bytes of the emails kept in memory """
+        return self.__held
+
+    @property
+    def spilled(self):
+        """ Number of emails written into the spill file """
+        return self.__spilled
+
+    def add(self, mail):
+        """
+        Store a rendered email
+        Parameters :
+            mail (str) : Rendered email
+        Returns (int) : Handle to read the email back with
+        """
+
+        result = len(self.__offsets)
+
+        # Spilled emails only cost their offset and size in memory
+        content = mail.encode('utf-8')
+        if self.__size is None or self.__held + len(content) <= self.__size :
+            self.__mails[result] = mail
+            self.__offsets.append(-1)
+            self.__held = self.__held + len(content)
+        else :
+            if self.__file is None : self.__open()
+            self.__offsets.append(self.__file.seek(0, 2))
+            self.__file.write(content)
+            self.__spilled = self.__spilled + 1
+        self.__sizes.append(len(content))
+
+        return result
+
+    def get(self, handle):
+        """
+        Read a rendered email back
+        Parameters :
+            handle (int) : Handle returned when the email was stored
+        Returns (str) : The rendered email
+        """
+
+        if self.__offsets[handle] < 0 : result = self.__mails[handle]
+        else :
+            self.__file.seek(self.__offsets[handle])
+            result = self.__file.read(self.__sizes[handle]).decode('utf-8')
+
+        return result
+
+    def close(self):
+        """ Forget the stored emails and remove the spill file """
+
+        if self.__file is not None :
+            self.__logger.info('---> %d emails spilled out of memory', self.__spilled)
+            self.__file.close()
+            if self.__filename is not None and path.exists(self.__filename) :
+                remove(self.__filename)
+
+        self.__file = None
+        self.__mails = {}
+        self.__offsets = array('q')
+        self.__sizes = array('q')
+        self.__held = 0
+        self.__spilled = 0
+
+    def __open(self):
+        """ Create the spill file """
+
+        if self.__filename is None : self.__file = TemporaryFile()  #pylint: disable=R1732
+        else : self.__file = open(self.__filename, 'w+b')            #pylint: disable=R1732
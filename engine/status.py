@@ -0,0 +1,146 @@
+# -------------------------------------------------------
+# Copyright (c) [2024] FASNY
+# All rights reserved
+# -------------------------------------------------------
+""" Registration status encoding """
+# -------------------------------------------------------
+# Nadège LEMPERIERE, @19th October 2026
+# Latest revision: 19th October 2026
+# -------------------------------------------------------
+
+# System includes
+from datetime   import datetime, timezone
+from json       import dumps, loads, JSONDecoder
+from hashlib    import sha256
+
+# Local includes
+from engine.timeslot import Timeslot
+from engine.models   import Attendee, RegistrationStatus
+
+#pylint: disable=W0719
+class StatusCodec:
+    """ Encode and decode the registration status stored in calendar events """
+
+    s_Version = '2'
+    s_LegacyFormat = '%Y-%m-%dT%H:%M:%S.%f%z'
+
+    @staticmethod
+    def encode(dates, attendees):
+        """
+        Encode a registration status into event custom properties
+        Parameters     :
+            dates (dict)     : Start and end date of the registration
+            attendees (dict) : Lists of students and adults
+        Returns (dict) : Event custom properties
+        """
+
+        students = StatusCodec.__encode_list(attendees['students'])
+        adults = StatusCodec.__encode_list(attendees['adults'])
+
+        # Google private properties only accept strings, so every value is a string
+        return {
+            'version'  : StatusCodec.s_Version,
+            'sent'     : 'true',
+            'start'    : str(int(dates['start'].timestamp())),
+            'end'      : str(int(dates['end'].timestamp())),
+            'students' : students,
+            'adults'   : adults,
+            'hash'     : StatusCodec.hash(students, adults),
+            'fingerprint' : StatusCodec.fingerprint(dates, attendees)
+        }
+
+    @staticmethod
+    def decode(properties):
+        """
+        Decode event custom properties into a registration status, whatever their version
+        Parameters     :
+            properties (dict) : Event custom properties
+        Returns (RegistrationStatus) : Registration status, not registered if the event was
+                                       never registered
+        Throws         : Exception if the properties version is unknown, if their content hash
+                         does not match their attendees, or if they can not be decoded
+        """
+
+        result = RegistrationStatus()
+
+        # Legacy statuses were written without version, and with a boolean sent flag
+        version = properties.get('version')
+        if version is not None and version != StatusCodec.s_Version :
+            raise Exception(f'Unknown registration status version {version}')
+
+        if str(properties.get('sent', '')).lower() == 'true' :
+
+            if version == StatusCodec.s_Version :
+                if StatusCodec.hash(properties['students'], properties['adults']) != \
+                   properties['hash'] :
+                    raise Exception('Registration status attendees do not match their hash')
+                result.start = datetime.fromtimestamp(int(properties['start']), timezone.utc)
+                result.end = datetime.fromtimestamp(int(properties['end']), timezone.utc)
+                result.students = StatusCodec.__decode_list(properties['students'])
+                result.adults = StatusCodec.__decode_list(properties['adults'])
+                result.digest = properties['hash']
+                result.fingerprint = properties.get('fingerprint', '')
+            else :
+                result.start = Timeslot.parse(properties['start'], StatusCodec.s_LegacyFormat)
+                result.end = Timeslot.parse(properties['end'], StatusCodec.s_LegacyFormat)
+                result.students = StatusCodec.__decode_legacy_list(properties['students'])
+                result.adults = StatusCodec.__decode_legacy_list(properties['adults'])
+
+        return result
+
+    @staticmethod
+    def hash(students, adults):
+        """
+        Compute the content hash of encoded attendees lists
+        Parameters     :
+            students (str) : Encoded students list
+            adults (str)   : Encoded adults list
+        Returns (str)  : Short hexadecimal content hash
+        """
+        return sha256(f'{students}\n{adults}'.encode('utf-8')).hexdigest()[:16]
+
+    @staticmethod
+    def fingerprint(dates, attendees):
+        """
+        Compute a deterministic fingerprint of a registration timeslot and attendees
+        Parameters     :
+            dates (dict)     : Start and end date of the registration
+            attendees (dict) : Lists of students and adults
+        Returns (str)  : Short hexadecimal fingerprint
+        """
+
+        students = ','.join(sorted(attendee.mail for attendee in attendees['students']))
+        adults = ','.join(sorted(attendee.mail for attendee in attendees['adults']))
+        content = f"{int(dates['start'].timestamp())}|{int(dates['end'].timestamp())}|" + \
+                  f"{students}|{adults}"
+
+        return sha256(content.encode('utf-8')).hexdigest()[:16]
+
+    @staticmethod
+    def __encode_list(attendees):
+        """ Encode attendees as a compact list of [mail, name] pairs sorted by mail """
+        return dumps(
+            sorted([attendee.mail, attendee.name] for attendee in attendees),
+            separators=(',', ':'), ensure_ascii=False)
+
+    @staticmethod
+    def __decode_list(value):
+        """ Decode a compact list of [mail, name] pairs """
+        return [Attendee(mail, name) for mail, name in loads(value)]
+
+    @staticmethod
+    def __decode_legacy_list(value):
+        """ Decode legacy ';' separated json objects, even if names contain ';' """
+
+        result = []
+
+        decoder = JSONDecoder()
+        index = 0
+        while index < len(value) :
+            item, index = decoder.raw_decode(value, index)
+            result.append(Attendee(item['mail'], item.get('name', '')))
+            # Skip the separator
+            index = index + 1
+
+        return result
+#pylint: enable=W0719
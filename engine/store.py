@@ -0,0 +1,85 @@
+# -------------------------------------------------------
+# Copyright (c) [2024] FASNY
+# All rights reserved
+# -------------------------------------------------------
+""" Local registration state store """
+# -------------------------------------------------------
+# Nadège LEMPERIERE, @19th October 2026
+# Latest revision: 19th October 2026
+# -------------------------------------------------------
+
+# System includes
+from logging    import getLogger
+from sqlite3    import connect
+from json       import dumps, loads
+from time       import time
+
+class RegistrationStore:
+    """ SQLite mirror of the registration status stored in calendar events """
+
+    def __init__(self, filename, provider, reconcile=86400):
+        """
+        Constructor
+        Parameters :
+            filename (str)  : Path to the SQLite database
+            provider (str)  : Name of the API the events come from
+            reconcile (int) : Age in seconds after which a status is read again from the calendar
+        """
+
+        self.__logger = getLogger('registration')
+
+        self.__provider = provider.lower()
+        self.__reconcile = reconcile
+
+        # Registrations may be configured in one thread and processed in another
+        self.__database = connect(filename, check_same_thread=False)
+        self.__database.execute('PRAGMA journal_mode=WAL')
+        self.__database.execute('PRAGMA synchronous=NORMAL')
+        self.__database.execute(
+            'CREATE TABLE IF NOT EXISTS registrations ('
+            'provider TEXT NOT NULL, calendar TEXT NOT NULL, event TEXT NOT NULL, '
+            'properties TEXT NOT NULL, synced REAL NOT NULL, '
+            'PRIMARY KEY (provider, calendar, event))')
+        self.__database.commit()
+
+        self.__logger.info('---> Using registration store %s', filename)
+
+    def get(self, calendar, identifier):
+        """
+        Get the registration status of an event if it has been reconciled recently
+        Parameters     :
+            calendar (str)   : Identifier of the calendar containing the event
+            identifier (str) : Identifier of the event
+        Returns (dict) : Event custom properties, None if unknown or to be reconciled
+        """
+
+        result = None
+
+        row = self.__database.execute(
+            'SELECT properties, synced FROM registrations '
+            'WHERE provider = ? AND calendar = ? AND event = ?',
+            (self.__provider, calendar, identifier)).fetchone()
+
+        if row is not None and time() - row[1] < self.__reconcile :
+            result = loads(row[0])
+
+        return result
+
+    def put(self, calendar, identifier, properties):
+        """
+        Store the registration status of an event
+        Parameters     :
+            calendar (str)    : Identifier of the calendar containing the event
+            identifier (str)  : Identifier of the event
+            properties (dict) : Event custom properties
+        """
+
+        self.__database.execute(
+            'INSERT OR REPLACE INTO registrations '
+            '(provider, calendar, event, properties, synced) VALUES (?, ?, ?, ?, ?)',
+            (self.__provider, calendar, identifier, dumps(properties), time()))
+        self.__database.commit()
+
+    def close(self):
+        """ Close the database """
+        self.__database.close()
@@ -0,0 +1,118 @@
+# -------------------------------------------------------
+# Copyright (c) [2024] FASNY
+# All rights reserved
+# -------------------------------------------------------
+""" Registration timeslot computation engine """
+# -------------------------------------------------------
+# Nadège LEMPERIERE, @19th October 2026
+# Latest revision: 19th October 2026
+# -------------------------------------------------------
+
+# System includes
+from datetime   import datetime, timedelta
+from functools  import lru_cache
+from zoneinfo   import ZoneInfo
+
+class Timeslot:
+    """ Compute registration timeslots from calendar events """
+
+    s_DateFormat = '%Y-%m-%dT%H:%M:%S.%f'
+
+    def __init__(self, time_zone, is_full_day):
+        """
+        Constructor
+        Parameters :
+            time_zone (str)    : Time zone into which events shall be registered
+            is_full_day (bool) : True if registration shall cover the whole event days
+        """
+
+        self.__local = Timeslot.zone(time_zone)
+        self.__is_full_day = is_full_day
+
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def zone(name):
+        """
+        Retrieve a time zone from its name, building it only once
+        Parameters    :
+            name (str) : Time zone name
+        Returns (ZoneInfo) : The time zone
+        Throws        : Exception if the time zone is unknown
+        """
+        return ZoneInfo(name)
+
+    @staticmethod
+    def parse(value, pattern=s_DateFormat):
+        """
+        Parse an ISO formatted date, falling back to strptime for non ISO strings
+        Parameters    :
+            value (str)   : Date to parse
+            pattern (str) : strptime pattern to use if the ISO parsing fails
+        Returns (datetime) : The parsed date
+        Throws        : ValueError if the date can not be parsed
+        """
+
+        try :
+            result = datetime.fromisoformat(value)
+        except ValueError :
+            result = datetime.strptime(value, pattern)
+
+        return result
+
+    def localize(self, date):
+        """
+        Convert a date into the registration time zone
+        Parameters    :
+            date (datetime) : Date to convert
+        Returns (datetime) : The date in the registration time zone
+        """
+        return date.astimezone(self.__local)
+
+    def compute(self, event):
+        """
+        Compute registration timeslot for an event
+        Parameters     :
+            event (Event) : Event to analyze
+        Returns (dict) : datetimes corresponding to the registration dates (UTC)
+        Throws         : Exception if the event dates can not be parsed
+        """
+
+        result = {}
+        if len(event.start) > 0 :
+
+            zone = Timeslot.zone(event.start_zone)
+
+            # Graph returns 7 digits fractional seconds, keep only the 6 python handles
+            result['start'] = Timeslot.parse(event.start[:26])
+            result['start'] = result['start'].replace(tzinfo=zone)
+
+            utc = Timeslot.zone(event.end_zone)
+            result['end'] = Timeslot.parse(event.end[:26])
+            result['end'] = result['end'].replace(tzinfo=utc)
+
+            if event.all_day :
+                # Full days event appear to start at 00:00 UTC, even if created in another timezone
+                # Date data are not reliable, so we need to switch them to local timezone
+                result['start'] = result['start'].replace(tzinfo=self.__local).astimezone(utc)
+                result['end'] = result['end'].replace(tzinfo=self.__local)
+                result['end'] = (result['end'] + timedelta(seconds=-1)).astimezone(utc)
+
+            if self.__is_full_day :
+                result['start'] = result['start'].astimezone(self.__local)
+                result['start'] = result['start'].replace(hour=0, minute=0, second=0, microsecond=0)
+                result['start'] = result['start'].astimezone(utc)
+                result['end'] = result['end'].astimezone(self.__local)
+                result['end'] = result['end'].replace(hour=23, minute=59, second=59, microsecond=0)
+                result['end'] = result['end'].astimezone(utc)
+
+        return result
+
+    def compute_all(self, events):
+        """
+        Compute registration timeslots for a batch of events
+        Parameters      :
+            events (list) : Events to analyze
+        Returns (list)  : Registration dates for each event, in the events order
+        Throws          : Exception if an event dates can not be parsed
+        """
+        return [self.compute(event) for event in events]
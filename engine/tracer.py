@@ -0,0 +1,156 @@
+# -------------------------------------------------------
+# Copyright (c) [2024] FASNY
+# All rights reserved
+# -------------------------------------------------------
+""" Http requests tracer for the calendar and mail providers """
+# -------------------------------------------------------
+# Nadège LEMPERIERE, @19th October 2026
+# Latest revision: 19th October 2026
+# -------------------------------------------------------
+
+# System includes
+from logging        import getLogger
+from threading      import Lock
+from time           import perf_counter, time
+from json           import dumps
+from urllib.parse   import urlsplit, urlencode
+
+class Tracer:
+    """ Record every http request sent to the providers, and summarize them by endpoint """
+
+    # Path segments following these collections are resources identifiers
+    s_Collections = ['calendars', 'events', 'contacts', 'messages', 'contactGroups']
+
+    def __init__(self, filename=None):
+        """
+        Constructor
+        Parameters :
+            filename (str) : Path to the trace file, one json line per request, None for no file
+        """
+
+        self.__logger = getLogger('registration')
+
+        self.__lock = Lock()
+        self.__endpoints = {}
+        self.__file = None
+        if filename is not None :
+            self.__file = open(filename, 'a', encoding='utf-8')    #pylint: disable=R1732
+            self.__logger.info('---> Tracing http requests in %s', filename)
+
+    @staticmethod
+    def template(url):
+        """
+        Build the endpoint template of a request url, replacing resources identifiers
+        Parameters :
+            url (str) : Request url
+        Returns (str) : Host and path of the url, with resources identifiers replaced by {id}
+        """
+
+        parts = urlsplit(url)
+        segments = parts.path.split('/')
+        for i_segment in range(1, len(segments)) :
+            if segments[i_segment - 1] in Tracer.s_Collections and \
+               segments[i_segment] not in ['', 'me', 'primary'] :
+                segments[i_segment] = '{id}'
+
+        return parts.netloc + '/'.join(segments)
+
+    def record(self, method, url, status, sent, received, latency):    #pylint: disable=R0913
+        """
+        Record a request
+        Parameters :
+            method (str)     : Http method
+            url (str)        : Request url
+            status (int)     : Response status code, 0 if no response was received
+            sent (int)       : Number of bytes sent in the request body
+            received (int)   : Number of bytes received in the response body
+            latency (float)  : Request duration in seconds
+        """
+
+        endpoint = f'{method} {Tracer.template(url)}'
+
+        with self.__lock :
+            summary = self.__endpoints.setdefault(endpoint, {
+                'calls' : 0, 'errors' : 0, 'sent' : 0, 'received' : 0, 'latency' : 0.0})
+            summary['calls'] = summary['calls'] + 1
+            summary['sent'] = summary['sent'] + sent
+            summary['received'] = summary['received'] + received
+            summary['latency'] = summary['latency'] + latency
+            if status < 200 or status >= 300 : summary['errors'] = summary['errors'] + 1
+
+            if self.__file is not None :
+                self.__file.write(dumps({
+                    't' : round(time(), 3), 'e' : endpoint, 's' : status,
+                    'o' : sent, 'i' : received, 'l' : round(latency * 1000, 1)
+                }, separators=(',', ':')) + '\n')
+
+    def wrap(self, method, function):
+        """
+        Trace a requests like function, such as requests.get or requests.post
+        Parameters :
+            method (str)        : Http method the function sends
+            function (function) : Function taking the url first and returning a response
+        Returns (function) : The traced function
+        """
+
+        def traced(url, *args, **kwargs) :
+
+            sent = 0
+            if kwargs.get('json') : sent = len(dumps(kwargs['json']).encode('utf-8'))
+            elif isinstance(kwargs.get('data'), dict) : sent = len(urlencode(kwargs['data']))
+            elif kwargs.get('data') : sent = len(kwargs['data'])
+
+            status = 0
+            received = 0
+            start = perf_counter()
+            try :
+                response = function(url, *args, **kwargs)
+                status = response.status_code
+                received = len(response.content or b'')
+            finally :
+                self.record(method, url, status, sent, received, perf_counter() - start)
+
+            return response
+
+        return traced
+
+    def summary(self):
+        """
+        Summarize the recorded requests by endpoint
+        Returns (list) : Endpoints with their number of calls, errors, bytes and latency,
+                         the most called first
+        """
+
+        with self.__lock :
+            result = [dict(summary, endpoint=endpoint) \
+                for endpoint, summary in self.__endpoints.items()]
+
+        return sorted(result, key=lambda item : (-item['calls'], item['endpoint']))
+
+    def table(self):
+        """
+        Format the requests summary as a table
+        Returns (list) : Table lines
+        """
+
+        result = [
+            f"{'calls':>6} {'errors':>6} {'sent':>9} {'received':>9} {'ms/call':>8}  endpoint"]
+        for item in self.summary() :
+            result.append(
+                f"{item['calls']:>6} {item['errors']:>6} {item['sent']:>9} {item['received']:>9} "
+                f"{item['latency'] * 1000 / item['calls']:>8.1f}  {item['endpoint']}")
+
+        return result
+
+    def flush(self):
+        """ Write the pending trace lines into the trace file """
+
+        with self.__lock :
+            if self.__file is not None : self.__file.flush()
+
+    def close(self):
+        """ Close the trace file """
+
+        with self.__lock :
+            if self.__file is not None : self.__file.close()
+            self.__file = None
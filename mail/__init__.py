@@ -0,0 +1,14 @@
+# -------------------------------------------------------
+# Copyright (c) [2024] FASNY
+# All rights reserved
+# -------------------------------------------------------
+""" Mail servers package """
+# -------------------------------------------------------
+# Nadège LEMPERIERE, @19th October 2026
+# Latest revision: 19th October 2026
+# -------------------------------------------------------
+
+from mail.smtp import SmtpSession
+from mail.imap import ImapArchiver
+from mail.pool import MailPool
+from mail.null import NullConnection
@@ -0,0 +1,145 @@
+# -------------------------------------------------------
+# Copyright (c) [2024] FASNY
+# All rights reserved
+# -------------------------------------------------------
+""" Sent emails archiving using a single IMAP session """
+# -------------------------------------------------------
+# Nadège LEMPERIERE, @19th October 2026
+# Latest revision: 19th October 2026
+# -------------------------------------------------------
+
+# System includes
+from logging    import getLogger
+from imaplib    import IMAP4, IMAP4_SSL, Time2Internaldate
+from queue      import Queue, Empty
+from threading  import Thread
+from time       import time
+
+#pylint: disable=R0902
+class ImapArchiver:
+    """ Copy sent emails in the sent folder from a background thread """
+
+    s_Box = 'Sent'
+
+    def __init__(self, server, sender, password, connection=None):
+        """
+        Constructor
+        Parameters :
+            server (dict)          : IMAP server address and port
+            sender (str)           : Sender address
+            password (str)         : Sender password
+            connection (IMAP4_SSL) : Connection to use instead of connecting to the server (mock)
+        """
+
+        self.__logger = getLogger('mail')
+
+        self.__server = server
+        self.__sender = sender
+        self.__password = password
+        self.__mock = connection
+        self.__connection = None
+
+        self.__queue = Queue()
+        self.__worker = None
+        self.__archived = 0
+
+    def __enter__(self):
+        """ Context manager entry, the session is opened on first archive """
+        return self
+
+    def __exit__(self, kind, value, traceback):
+        """ Context manager exit, waiting for all the emails to be archived """
+        self.close()
+
+    def archive(self, message):
+        """
+        Queue an email to be copied in the sent folder
+        Parameters     :
+            message (bytes) : Formatted email
+        """
+
+        if self.__worker is None :
+            self.__worker = Thread(target=self.__run, name='imap-archiver', daemon=True)
+            self.__worker.start()
+
+        self.__queue.put(message)
+
+    def close(self):
+        """
+        Wait for all queued emails to be archived and close the session
+        Returns (int)  : The number of emails archived
+        """
+
+        if self.__worker is not None :
+            self.__queue.put(None)
+            self.__worker.join()
+            self.__worker = None
+
+        if self.__connection is not None :
+            try :
+                self.__connection.logout()
+            except (IMAP4.error, OSError) :
+                pass
+            self.__connection = None
+            self.__logger.info('---> Logged out imap server')
+
+        return self.__archived
+
+    def __run(self):
+        """ Archive queued emails by batch until close is requested """
+
+        running = True
+        while running :
+
+            # Wait for an email, then gather all the ones already queued
+            batch = [self.__queue.get()]
+            try :
+                while True : batch.append(self.__queue.get_nowait())
+            except Empty :
+                pass
+
+            if None in batch :
+                running = False
+                batch = [message for message in batch if message is not None]
+
+            if len(batch) != 0 : self.__append(batch)
+
+    def __append(self, batch):
+        """
+        Append a batch of emails in the sent folder, reconnecting once if needed
+        Parameters     :
+            batch (list) : Formatted emails
+        """
+
+        done = 0
+        try :
+            if self.__connection is None : self.__open()
+            for message in batch :
+                try :
+                    self.__connection.append(
+                        ImapArchiver.s_Box, '\\Seen', Time2Internaldate(time()), message)
+                except IMAP4.abort :
+                    self.__logger.warning('---> Imap server disconnected, reconnecting')
+                    self.__open()
+                    self.__connection.append(
+                        ImapArchiver.s_Box, '\\Seen', Time2Internaldate(time()), message)
+                done = done + 1
+        except Exception as e :
+            self.__logger.error(
+                'Failed to archive %d emails with error %s', len(batch) - done, str(e))
+
+        self.__archived = self.__archived + done
+        self.__logger.info('---> Archived %d emails in imap server', self.__archived)
+
+    def __open(self):
+        """
+        Connect and authenticate to the IMAP server
+        Throws         : Exception if the connection or the authentication fails
+        """
+
+        if self.__mock : self.__connection = self.__mock
+        else : self.__connection = IMAP4_SSL(self.__server['host'], self.__server['port'])
+
+        self.__connection.login(self.__sender, self.__password)
+        self.__logger.info('---> Logged in imap server')
+#pylint: enable=R0902
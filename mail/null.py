@@ -0,0 +1,42 @@
+# -------------------------------------------------------
+# Copyright (c) [2024] FASNY
+# All rights reserved
+# -------------------------------------------------------
+""" Mail connection discarding emails, for offline runs """
+# -------------------------------------------------------
+# Nadège LEMPERIERE, @19th October 2026
+# Latest revision: 19th October 2026
+# -------------------------------------------------------
+
+#pylint: disable=W0107, W0613
+class NullConnection:
+    """ SMTP and IMAP connection accepting everything and sending nothing """
+
+    def ehlo(self):
+        """ Identify to the server """
+        pass
+
+    def starttls(self):
+        """ Secure the connection """
+        pass
+
+    def login(self, address, password):
+        """ Authenticate to the server """
+        pass
+
+    def sendmail(self, from_addr, to_addr, message):
+        """ Send an email, discarding it """
+        pass
+
+    def append(self, box, flags, date_time, message):
+        """ Archive an email, discarding it """
+        pass
+
+    def quit(self):
+        """ Close the smtp connection """
+        pass
+
+    def logout(self):
+        """ Close the imap connection """
+        pass
+#pylint: enable=W0107, W0613
@@ -0,0 +1,114 @@
+# -------------------------------------------------------
+# Copyright (c) [2024] FASNY
+# All rights reserved
+# -------------------------------------------------------
+""" Concurrent emails delivery using a bounded pool of SMTP sessions """
+# -------------------------------------------------------
+# Nadège LEMPERIERE, @19th October 2026
+# Latest revision: 19th October 2026
+# -------------------------------------------------------
+
+# System includes
+from logging    import getLogger
+from asyncio    import Lock, Queue, gather, run, to_thread
+
+# Local includes
+from mail.smtp  import SmtpSession
+from mail.imap  import ImapArchiver
+
+#pylint: disable=R0902, R0913
+class MailPool:
+    """ Deliver and archive emails concurrently using asyncio """
+
+    def __init__(self, smtp, imap, sender, password, connections=4):
+        """
+        Constructor
+        Parameters :
+            smtp (dict)       : SMTP server address and port
+            imap (dict)       : IMAP server address and port
+            sender (str)      : Sender address
+            password (str)    : Sender password
+            connections (int) : Maximum number of simultaneous SMTP sessions
+        """
+
+        self.__logger = getLogger('mail')
+
+        self.__smtp = smtp
+        self.__imap = imap
+        self.__sender = sender
+        self.__password = password
+        self.__connections = max(1, int(connections))
+
+        self.__smtp_mock = None
+        self.__imap_mock = None
+
+    def mock(self, functions):
+        """
+        Use mock servers instead of connecting to the real ones
+        Parameters :
+            functions (dict) : The smtp and imap connections to use instead of real ones
+        """
+
+        if 'smtp' in functions : self.__smtp_mock = functions['smtp']
+        if 'imap' in functions : self.__imap_mock = functions['imap']
+
+    def deliver(self, messages, callback=None):
+        """
+        Send and archive emails concurrently
+        Parameters     :
+            messages (list)     : (recipient, MIMEMultipart message) pairs to deliver
+            callback (function) : Called with the message index as soon as it has been sent, from
+                                  a worker thread, one message at a time
+        Returns (list) : Sending status of each message, in the messages order
+        """
+        return run(self.__deliver(messages, callback))
+
+    async def __deliver(self, messages, callback):
+        """ Deliver messages through the sessions pool and wait for archiving """
+
+        # Sessions are only opened when first used, so idle ones cost nothing
+        pool = Queue()
+        sessions = []
+        for _ in range(min(self.__connections, len(messages))) :
+            session = SmtpSession(self.__smtp, self.__sender, self.__password, self.__smtp_mock)
+            sessions.append(session)
+            pool.put_nowait(session)
+
+        archiver = ImapArchiver(self.__imap, self.__sender, self.__password, self.__imap_mock)
+
+        # Callbacks may flush status updates over http : they run in a worker thread so that the
+        # other deliveries go on meanwhile, but one at a time since they share the status buffer
+        processing = Lock()
+
+        async def send(index, recipient, message) :
+            result = False
+            session = await pool.get()
+            try :
+                await to_thread(session.send, recipient, message.as_string())
+                archiver.archive(message.as_bytes())
+                result = True
+            except Exception as e :
+                self.__logger.error("Failed to send email : %s", str(e))
+            finally :
+                pool.put_nowait(session)
+
+            # The message is sent whatever the callback outcome, and the other sends still use
+            # their sessions, so a failing callback must not abort the gathering
+            if result and callback is not None :
+                try :
+                    async with processing : await to_thread(callback, index)
+                except Exception as e :
+                    self.__logger.error("Failed to process sent email : %s", str(e))
+            return result
+
+        try :
+            results = await gather(*(
+                send(index, recipient, message)
+                for index, (recipient, message) in enumerate(messages)))
+        finally :
+            for session in sessions : await to_thread(session.close)
+            archived = await to_thread(archiver.close)
+            self.__logger.info('---> %d emails archived', archived)
+
+        return list(results)
+#pylint: enable=R0902, R0913
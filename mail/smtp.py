@@ -0,0 +1,87 @@
+# -------------------------------------------------------
+# Copyright (c) [2024] FASNY
+# All rights reserved
+# -------------------------------------------------------
+""" Persistent SMTP session """
+# -------------------------------------------------------
+# Nadège LEMPERIERE, @19th October 2026
+# Latest revision: 19th October 2026
+# -------------------------------------------------------
+
+# System includes
+from logging    import getLogger
+from smtplib    import SMTP, SMTPServerDisconnected
+
+class SmtpSession:
+    """ Authenticated SMTP session shared by all the emails of a run """
+
+    def __init__(self, server, sender, password, connection=None):
+        """
+        Constructor
+        Parameters :
+            server (dict)     : SMTP server address and port
+            sender (str)      : Sender address
+            password (str)    : Sender password
+            connection (SMTP) : Connection to use instead of connecting to the server (mock)
+        """
+
+        self.__logger = getLogger('mail')
+
+        self.__server = server
+        self.__sender = sender
+        self.__password = password
+        self.__mock = connection
+        self.__connection = None
+
+    def __enter__(self):
+        """ Context manager entry, the session is opened on first send """
+        return self
+
+    def __exit__(self, kind, value, traceback):
+        """ Context manager exit, closing the session """
+        self.close()
+
+    def open(self):
+        """
+        Connect and authenticate to the SMTP server
+        Throws         : Exception if the connection or the authentication fails
+        """
+
+        if self.__mock : self.__connection = self.__mock
+        else : self.__connection = SMTP(self.__server['host'], self.__server['port'], timeout=10)
+
+        self.__connection.ehlo()  # Identify ourselves to the SMTP server
+        self.__connection.starttls()  # Secure the connection with TLS
+        self.__connection.ehlo()  # Re-identify ourselves as an encrypted connection
+        self.__connection.login(self.__sender, self.__password)
+        self.__logger.info('---> Logged in smtp server')
+
+    def send(self, recipient, message):
+        """
+        Send an email, opening the session if needed and reconnecting once if the
+        server dropped the connection
+        Parameters     :
+            recipient (str) : Recipient address
+            message (str)   : Formatted email
+        Throws         : Exception if the sending fails
+        """
+
+        if self.__connection is None : self.open()
+
+        try :
+            self.__connection.sendmail(self.__sender, recipient, message)
+        except SMTPServerDisconnected :
+            self.__logger.warning('---> Smtp server disconnected, reconnecting')
+            self.open()
+            self.__connection.sendmail(self.__sender, recipient, message)
+
+    def close(self):
+        """ Close the session if it is opened """
+
+        if self.__connection is not None :
+            try :
+                self.__connection.quit()
+            except SMTPServerDisconnected :
+                pass
+            self.__connection = None
+            self.__logger.info('---> Logged out smtp server')
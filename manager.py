@@ -5,29 +5,33 @@
 """ Session management script """
 # -------------------------------------------------------
 # Nadège LEMPERIERE, @6th September 2024
-# Latest revision: 17th September 2024
+# Latest revision: 19th October 2026
 # -------------------------------------------------------
+#pylint: disable=C0302
 
 # System includes
-from logging    import config, getLogger
-from datetime   import datetime, timedelta, timezone
+from logging    import getLogger
+from datetime   import timedelta
 from os         import path
-from json       import load, loads, dumps
-from time       import time
-from smtplib    import SMTP
-from imaplib    import IMAP4_SSL, Time2Internaldate
-from zoneinfo   import ZoneInfo
+from json       import load
+from threading  import Lock
+from time       import monotonic
+from concurrent.futures import ThreadPoolExecutor
 
 # Email includes
 from email.mime.text        import MIMEText
 from email.mime.multipart   import MIMEMultipart
 
 # Click includes
-from click import option, group
+from click import option, group, Choice
 
 # Local includes
-from api import MicrosoftAPI
-from api import GoogleAPI
+from api import create
+from engine import Timeslot, StatusBuffer, RegistrationStore, StatusCodec, Outbox, Attendee
+from engine import CalendarCache
+from engine import Schedule, Daemon, Metrics, stage, Tracer, Cassette, Logs, MailSpool, Event
+from engine import Profiler, MemoryProfiler
+from mail import SmtpSession, ImapArchiver, MailPool, NullConnection
 
 # Logger configuration settings
 logg_conf_path = path.normpath(path.join(path.dirname(__file__), 'conf/logging.conf'))
@@ -39,13 +43,17 @@ class Registration:
     s_ExtensionName = 'org.mantabots'
 
 #pylint: disable=R0913, C0301
-    def __init__(self, api, credentials, mail):
+    def __init__(self, api, credentials, mail, trace='', record='', replay=''):
         """
         Constructor
         Parameters :
             api (str)         : API to use for registration
             credentials (str) : Path to the API credentials file
             mail (str)        : Password for the smtp and imap servers
+            trace (str)       : Path to the file tracing the API http requests, empty for no trace
+            record (str)      : Path to the cassette recording the API http traffic, empty for none
+            replay (str)      : Path to the cassette to replay instead of sending API http requests,
+                                and emails, empty for none
         Returns    :
         Throws     :
         """
@@ -56,13 +64,30 @@ class Registration:
         self.__logger.info('INITIALIZING REGISTRATION')
 
         # Initialize API
-        self.__api = None
-        if api.lower() == 'microsoft' : self.__api = MicrosoftAPI()
-        if api.lower() == 'google' : self.__api = GoogleAPI()
-
-        # Mock external API if required
+        self.__provider = api.lower()
+        self.__metrics = Metrics()
+        self.__tracer = None
+        self.__cassette = None
+        self.__api = create(api)
+        if self.__api is not None :
+            if len(record) > 0 :
+                self.__cassette = Cassette(
+                    path.normpath(path.join(path.dirname(__file__), record)), 'record')
+            elif len(replay) > 0 :
+                self.__cassette = Cassette(
+                    path.normpath(path.join(path.dirname(__file__), replay)), 'replay')
+            if self.__cassette is not None : self.__api.cassette(self.__cassette)
+            if len(trace) > 0 :
+                self.__tracer = Tracer(path.normpath(path.join(path.dirname(__file__), trace)))
+                self.__api.trace(self.__tracer)
+            self.__api = self.__metrics.instrument(self.__api, 'api', provider=self.__provider)
+
+        # Mock external API if required, a replayed run sending no email
         self.__smtp = None
         self.__imap = None
+        if self.__cassette is not None and self.__cassette.replaying :
+            self.__smtp = NullConnection()
+            self.__imap = NullConnection()
 
         # Initialize credentials
         self.__credentials = credentials
@@ -72,13 +97,22 @@ class Registration:
         self.__conf = {}
         self.__user = {}
         self.__contacts = []
+        self.__index = {}
+        self.__calendars = {'lock' : Lock(), 'list' : None, 'ids' : {}}
+        self.__cache = None
         self.__events = []
+        self.__mails = MailSpool()
         self.__calendar = ''
+        self.__timeslot = None
+        self.__statuses = None
+        self.__store = None
+        self.__outbox = None
 
         self.__logger.info('---> Registration initialized')
 #pylint: enable=R0913
 
 #pylint: disable=R0915
+    @stage('configure')
     def configure(self, conf, receiver, sender):
         """
         Configure the registration workflow from a configuration file and command line parameters
@@ -131,6 +165,11 @@ class Registration:
             if 'host' not in self.__conf['mail']['from']['imap_server'] :
                 raise Exception('Missing smtp host for external address')
 
+            if 'backend' not in self.__conf['mail']['from'] :
+                self.__conf['mail']['from']['backend'] = 'sync'
+            if 'connections' not in self.__conf['mail']['from'] :
+                self.__conf['mail']['from']['connections'] = 4
+
         if 'to' not in self.__conf['mail'] :
             self.__conf['mail']['to'] = 'nadege.lemperiere@gmail.com'
 
@@ -154,6 +193,48 @@ class Registration:
             self.__conf['calendar']['full_day'] = True
         else :
             self.__conf['calendar']['full_day'] = self.__conf['calendar']['full_day'] != 'False'
+        if 'batch' not in self.__conf['calendar'] :
+            self.__conf['calendar']['batch'] = 20
+        if 'reconcile' not in self.__conf['calendar'] :
+            self.__conf['calendar']['reconcile'] = 86400
+
+        self.__timeslot = Timeslot(
+            self.__conf['calendar']['time_zone'],
+            self.__conf['calendar']['full_day'])
+
+        # Journal rendered emails and status writes if an outbox is configured
+        if 'outbox' in self.__conf :
+            outbox_path = path.normpath(path.join(path.dirname(__file__), self.__conf['outbox']))
+            self.__outbox = Outbox(outbox_path)
+
+        # Pending status writes only survive an interruption if the outbox journals them,
+        # without it each status is written as soon as its email is sent
+        batch = self.__conf['calendar']['batch']
+        if self.__outbox is None and int(batch) > 1 :
+            self.__logger.warning('No outbox configured, status updates will not be batched')
+            batch = 1
+        self.__statuses = StatusBuffer(
+            self.__api, Registration.s_ExtensionName, batch, self.__on_statuses_written)
+
+        # Spill rendered emails into a file beyond the configured memory size
+        if 'memory' in self.__conf :
+            spill_path = None
+            if 'spill' in self.__conf['memory'] :
+                spill_path = path.normpath(
+                    path.join(path.dirname(__file__), self.__conf['memory']['spill']))
+            self.__mails = MailSpool(self.__conf['memory'].get('mails', 1000000), spill_path)
+
+        # Keep calendar identifiers across runs if a cache is configured
+        if 'cache' in self.__conf['calendar'] :
+            self.__cache = CalendarCache(path.normpath(
+                path.join(path.dirname(__file__), self.__conf['calendar']['cache'])))
+
+        # Mirror registration status locally if a store is configured
+        if 'store' in self.__conf['calendar'] :
+            store_path = path.normpath(
+                path.join(path.dirname(__file__), self.__conf['calendar']['store']))
+            self.__store = RegistrationStore(
+                store_path, self.__provider, self.__conf['calendar']['reconcile'])
 
         self.__logger.info('---> Configuration loaded')
 #pylint: enable=R0915
@@ -171,10 +252,100 @@ class Registration:
         if 'imap' in functions : self.__imap = functions['imap']
         self.__api.mock(functions)
 
-    def initialize(self):
+    @property
+    def metrics(self):
+        """ Timing metrics of the registration stages and API calls """
+        return self.__metrics
+
+    def export_metrics(self):
+        """
+        Export the timing metrics in the files given by the configuration, if any,
+        summarize the traced API http requests and save the recorded ones
+        Parameters :
+        Returns    :
+        Throws     : Exception if the files can not be written
+        """
+
+        if 'metrics' in self.__conf :
+            files = {}
+            for kind in ['json', 'prometheus'] :
+                if kind in self.__conf['metrics'] :
+                    files[kind] = path.normpath(
+                        path.join(path.dirname(__file__), self.__conf['metrics'][kind]))
+            self.__metrics.export(**files)
+
+        if self.__tracer is not None :
+            self.__tracer.flush()
+            self.__logger.info('API HTTP REQUESTS')
+            for line in self.__tracer.table() : self.__logger.info(line)
+
+        if self.__cassette is not None : self.__cassette.save()
+
+    def close(self):
+        """
+        Export the metrics, the traced and the recorded API http requests at the end of a run,
+        whatever its outcome, then close the trace file
+        Parameters :
+        Returns    :
+        Throws     : Exception if the files can not be written
+        """
+
+        try :
+            self.export_metrics()
+        finally :
+            if self.__tracer is not None : self.__tracer.close()
+
+#pylint: disable=W0212
+    def resolve_calendars(self, registrations) :
+        """
+        Resolve the calendars of registrations sharing this one data in a single listing,
+        using this registration calendar cache if configured
+        Parameters :
+            registrations (list) : Configured registrations sharing this one data
+        Returns    :
+        Throws     :
+        """
+
+        try :
+            self.__get_calendar_ids(
+                [registration.__conf['calendar']['name'] for registration in registrations])
+        except Exception as e :
+            self.__logger.error('Failed to resolve calendars with error %s',str(e))
+
+    def share(self, registration) :
+        """
+        Reuse the API client, user, contacts and calendars of an initialized registration
+        instead of logging in and retrieving them again
+        Parameters :
+            registration (Registration) : Initialized registration to share data with
+        Returns    :
+        Throws     :
+        """
+
+        self.__logger.info('SHARING INITIALIZED REGISTRATION WORKFLOW')
+
+        self.__provider = registration.__provider
+        self.__api = registration.__api
+        self.__smtp = registration.__smtp
+        self.__imap = registration.__imap
+        self.__user = registration.__user
+        self.__contacts = registration.__contacts
+        self.__index = registration.__index
+        self.__calendars = registration.__calendars
+        self.__metrics = registration.__metrics
+        self.__tracer = registration.__tracer
+        self.__cassette = registration.__cassette
+
+        self.__logger.info('---> User %s', self.__user['mail'])
+#pylint: enable=W0212
+
+    @stage('initialize')
+    def initialize(self, contacts=True):
         """
         Initialize the registration workflow
         Parameters :
+            contacts (bool) : False to only login and retrieve the user, when resuming from the
+                              outbox whose emails already hold their recipients
         Returns    :
         Throws     :
         """
@@ -194,15 +365,28 @@ class Registration:
             self.__logger.error('Failed to retrieve authorized user with error %s',str(e))
 
         # Gather contacts list
-        try :
-            self.__contacts = self.__api.get_contacts()
-        except Exception as e :
-            self.__logger.error('Failed to retrieve contacts with error %s',str(e))
+        if contacts :
+            try :
+                self.__contacts = self.__api.get_contacts()
+            except Exception as e :
+                self.__logger.error('Failed to retrieve contacts with error %s',str(e))
+
+        # Calendars will be resolved again, in case they changed since the last login
+        with self.__calendars['lock'] :
+            self.__calendars['list'] = None
+            self.__calendars['ids'] = {}
+
+        # Index contacts by address to find attendees without scanning all contacts
+        self.__index = {}
+        for contact in self.__contacts :
+            for mail in contact.mails :
+                self.__index.setdefault(mail, []).append(contact)
 
         self.__logger.info('---> Workflow initialized')
         self.__logger.info('---> User %s', self.__user['mail'])
 
 #pylint: disable=R0914, R1702
+    @stage('search_events')
     def search_events(self):
         """
         Search and select events to be registered
@@ -212,6 +396,7 @@ class Registration:
         """
 
         self.__events = []
+        self.__mails.close()
         self.__logger.info('SEARCHING FOR UPCOMING EVENTS')
 
         try:
@@ -219,48 +404,57 @@ class Registration:
             self.__calendar = self.__get_calendar_id(self.__conf['calendar']['name'])
             events = self.__api.get_events(self.__calendar, self.__conf['calendar']['days'])
 
-            for event in events :
+            # Compute the timeslots for which the events shall be registered
+            timeslots = self.__timeslot.compute_all(events)
+
+            for i_event, (event, dates) in enumerate(zip(events, timeslots)) :
+
+                # Release the event record once evaluated, selected events keep their identifier
+                events[i_event] = None
 
                 # Retrieve the dates for which event has already been registered
-                last_reg = self.__get_registration_status(event['id'], self.__calendar)
-                self.__logger.debug('Previous registration data : %s',str(last_reg))
+                last_reg = self.__get_registration_status(event.identifier, self.__calendar)
+                if last_reg is None : continue
+                self.__logger.debug('Previous registration data : %s', last_reg)
 
-                # Compute the timeslot for which the event shall be registered
-                dates = self.__compute_registration_timeslot(
-                    event,
-                    self.__conf['calendar']['full_day'])
-                self.__logger.debug('Current dates : %s',str(dates))
+                self.__logger.debug('Current dates : %s', dates)
+
+                # Get names of students and adults mentors attending the event
+                attendees_list = self.__get_attendees(event, self.__index)
+
+                # Skip registered events whose timeslot and attendees did not change since their
+                # last registration, they have nothing new to register. Events without dates
+                # are left to the eligibility check below
+                if len(dates) > 0 and last_reg.registered and \
+                   last_reg.fingerprint == StatusCodec.fingerprint(dates, attendees_list) :
+                    self.__logger.debug('Event %s unchanged since last registration', event.identifier)
+                    continue
 
                 # Compute the difference between the current registration state, and the new ones
                 delta_start = timedelta(days=1)
                 delta_end = timedelta(days=1)
-                if 'start' in last_reg : delta_start = last_reg['start'] - dates['start']
-                if 'end' in last_reg : delta_end = dates['end'] - last_reg['end']
+                if last_reg.registered :
+                    delta_start = last_reg.start - dates['start']
+                    delta_end = dates['end'] - last_reg.end
 
-                self.__logger.debug('Delta start : %s / Delta end : %s',str(delta_start), str(delta_end))
+                self.__logger.debug('Delta start : %s / Delta end : %s', delta_start, delta_end)
 
-                # Get names of students and adults mentors attending the event
-                # Compare it with the last registration to get the new attendees
-                attendees_list = self.__get_attendees(event, self.__contacts)
+                # Compare attendees with the last registration to get the new attendees
                 attendees = { 'all' : attendees_list, 'new' : attendees_list}
 
-                if 'students' in last_reg and 'adults' in last_reg :
-                    attendees['new'] = {'students' : [], 'adults' : []}
-                    for role in attendees['all'] :
-                        for new in attendees['all'][role] :
-                            found = False
-                            if role in last_reg :
-                                for old in last_reg[role] :
-                                    if new['mail'] == old['mail'] :
-                                        found = True
-                            if not found : attendees['new'][role].append(new)
-                self.__logger.debug('Current attendees : %s',str(attendees))
+                if last_reg.registered :
+                    registered = {
+                        'students' : {old.mail for old in last_reg.students},
+                        'adults'   : {old.mail for old in last_reg.adults}
+                    }
+                    attendees['new'] = {role : [new for new in attendees['all'][role] \
+                        if new.mail not in registered[role]] for role in attendees['all']}
+                self.__logger.debug('Current attendees : %s', attendees)
 
                 # Check if event shall be registered, using its status and its subject
                 # And only if there are people attending
                 topic = self.__conf['calendar']['topic']
-                if  'isCancelled' in event and not event['isCancelled'] and \
-                    'subject' in event and topic in event['subject'] and \
+                if  not event.cancelled and topic in event.subject and \
                     len(attendees['all']['students']) + len(attendees['all']['adults']) != 0 :
 
                     # Check if the event was already registered but dates have changed or
@@ -268,11 +462,11 @@ class Registration:
                     # and adults shall be registered
                     if delta_start.total_seconds() > 0 or delta_end.total_seconds() > 0 :
                         attendees['new'] = attendees['all']
-                        self.__events.append({'raw' : event, 'dates' : dates, 'attendees' : attendees})
+                        self.__events.append(self.__select(event, dates, attendees))
                     # Check if the event was already registered at the correct time
                     # but attendees have changed, in this case only new attendees should be registered
                     elif len(attendees['new']['students']) != 0 or len(attendees['new']['adults']) != 0 :
-                        self.__events.append({'raw' : event, 'dates' : dates, 'attendees' : attendees})
+                        self.__events.append(self.__select(event, dates, attendees))
 
         except Exception as e:
             self.__logger.error("Error retrieving events: %s", str(e))
@@ -280,6 +474,27 @@ class Registration:
         self.__logger.info("---> Found %d events",len(self.__events))
 #pylint: enable=R0914, R1702
 
+    def __select(self, event, dates, attendees):
+        """
+        Select an event for registration, keeping only what the emails preparation and sending need
+        Parameters     :
+            event (Event)    : Event to register
+            dates (dict)     : Registration dates of the event
+            attendees (dict) : All the event attendees, and the new ones to register
+        Returns (dict) : The event identifier, calendar, dates, new attendees and status to write,
+                         the email being rendered later
+        """
+
+        return {
+            'event'     : Event(event.identifier),
+            'calendar'  : self.__calendar,
+            'dates'     : dates,
+            'attendees' : attendees['new'],
+            'status'    : StatusCodec.encode(dates, attendees['all']),
+            'mail'      : None
+        }
+
+    @stage('prepare_emails')
     def prepare_emails(self):
         """
         Build email content by replacing the pattern tags by the correct value
@@ -299,30 +514,114 @@ class Registration:
         for i_event, event in enumerate(self.__events):
 
             # Sent email with date corresponding to the configured timezone
-            tz = ZoneInfo(self.__conf['calendar']['time_zone'])
-            start = event['dates']['start'].astimezone(tz)
-            end = event['dates']['end'].astimezone(tz)
+            start = self.__timeslot.localize(event['dates']['start'])
+            end = self.__timeslot.localize(event['dates']['end'])
             data = {
                 'team': self.__conf['team'],
-                'event_id': event['raw']['id'],
+                'event_id': event['event'].identifier,
                 'start_time': start.strftime('%A, %d. %B %Y at %I:%M%p'),
                 'end_time': end.strftime('%A, %d. %B %Y at %I:%M%p'),
                 'date': start.strftime('%A, %d. %B %Y')
             }
 
             data['adults'] = \
-                '\n'.join(f"- {c['name']}" for c in event['attendees']['new']['adults'])
+                '\n'.join(f"- {c.name}" for c in event['attendees']['adults'])
             data['students'] = \
-                '\n'.join(f"- {s['name']}" for s in event['attendees']['new']['students'])
+                '\n'.join(f"- {s.name}" for s in event['attendees']['students'])
 
             # Replace placeholders in the template
             email = template
             for key, value in data.items():
                 email = email.replace(f"{{{{{key}}}}}", value)
-            self.__events[i_event]['mail'] = email
 
             self.__logger.info("---> Producing message of size %d", len(email))
 
+            # Journal the email so that an interrupted run can be resumed
+            if self.__outbox is not None : self.__outbox.add(dict(event, mail=email))
+
+            # Keep the email in memory, or in the spill file if memory is bounded
+            self.__events[i_event]['mail'] = self.__mails.add(email)
+
+    def resume(self):
+        """
+        Resume an interrupted run from the outbox, without looking at the calendar
+        Parameters :
+        Returns    :
+        Throws     : Exception if no outbox is configured
+        """
+
+        self.__logger.info('RESUMING INTERRUPTED REGISTRATION')
+
+        if self.__outbox is None : raise Exception('No outbox configured to resume from')
+
+        self.__mails.close()
+        self.__events = self.__outbox.unfinished()
+        for event in self.__events : event['mail'] = self.__mails.add(event['mail'])
+        self.__logger.info("---> Found %d unfinished events",len(self.__events))
+
+        self.send_emails()
+
+    def process(self):
+        """
+        Search events to register, then prepare and send their emails
+        Parameters :
+        Returns    :
+        Throws     :
+        """
+
+        self.search_events()
+        self.prepare_emails()
+        self.send_emails()
+
+    @staticmethod
+    def process_all(registrations, workers=4):
+        """
+        Process several configured registrations concurrently
+        Parameters :
+            registrations (list) : Configured registrations, usually sharing the same API client
+            workers (int)        : Maximum number of registrations processed simultaneously
+        Returns    :
+        Throws     : Exception if one of the registrations fails, once all are processed
+        """
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor :
+            futures = [executor.submit(registration.process) for registration in registrations]
+
+        for future in futures : future.result()
+
+#pylint: disable=R0913
+    @staticmethod
+    def daemon(registrations, schedule, jitter=0, host='127.0.0.1', port=0, workers=4, refresh=2700):
+        """
+        Keep configured registrations resident and process them on schedule or on demand
+        Parameters :
+            registrations (list) : Configured registrations, the first one being initialized
+            schedule (str)       : Cron like schedule of the periodic runs (UTC)
+            jitter (int)         : Maximum random delay in seconds added to the periodic runs
+            host (str)           : Address the trigger endpoint listens to
+            port (int)           : Port the trigger endpoint listens to
+            workers (int)        : Maximum number of registrations processed simultaneously
+            refresh (int)        : Age in seconds after which the API login is renewed
+        Returns (Daemon) : The daemon, to serve
+        Throws     : Exception if the schedule is invalid
+        """
+
+        login = {'time' : monotonic()}
+
+        def job() :
+            # Renew the API token and contacts before they get stale, and share them again
+            if monotonic() - login['time'] > refresh :
+                registrations[0].initialize()
+                for registration in registrations[1:] : registration.share(registrations[0])
+                registrations[0].resolve_calendars(registrations)
+                login['time'] = monotonic()
+            Registration.process_all(registrations, workers)
+            registrations[0].export_metrics()
+
+        return Daemon(job, Schedule(schedule), jitter, host, port)
+#pylint: enable=R0913
+
+    @stage('send_emails')
     def send_emails(self):
         """
         Send emails using either microsoft API or a specific smtp and imap servers
@@ -333,50 +632,146 @@ class Registration:
 
         self.__logger.info('SENDING EMAILS TO %s', self.__conf['mail']['to'].upper())
 
-        for event in self.__events:
+        # Registration status updates are buffered and posted in bulk, the buffer is
+        # flushed whatever happens so that no status of a sent email is lost
+        self.__statuses.reset()
+        with self.__statuses :
+
+            # Emails already sent by a previous run only need their status to be written
+            events = self.__events
+            if self.__outbox is not None :
+                events = []
+                for event in self.__events :
+                    if self.__outbox.state(event) == Outbox.s_Sent :
+                        self.__logger.info('--> Email already sent for event %s', event['event'].identifier)
+                        self.__update_registration_status(event)
+                    elif self.__outbox.state(event) != Outbox.s_Done :
+                        events.append(event)
+
+            if self.__conf['mail']['from']['address'] != self.__user['mail'] and \
+               self.__conf['mail']['from']['backend'] == 'async' :
+                self.__send_emails_using_mail_pool(events)
+            else :
+                self.__send_emails_sequentially(events)
+
+        # Sent emails are no longer needed
+        self.__mails.close()
+
+        # Emails whose status could not be written would be sent again by the next run
+        failed = self.__statuses.failed
+        if len(failed) > 0 :
+            raise Exception(f'Failed to write the registration status of {len(failed)} events ' + \
+                'whose email was sent : ' + ', '.join(failed))
+
+    def __send_emails_sequentially(self, events):
+        """
+        Send emails one after the other using either cloud API or a specific smtp server
+        Parameters :
+            events (list) : Events whose email shall be sent
+        Returns    :
+        Throws     :
+        """
+
+        # Share a single smtp session between all the emails sent through the smtp server
+        # and archive sent emails in a single imap session, outside of the sending path
+        session = None
+        archiver = None
+        if self.__conf['mail']['from']['address'] != self.__user['mail']:
+            session = SmtpSession(
+                self.__conf['mail']['from']['smtp_server'],
+                self.__conf['mail']['from']['address'],
+                self.__conf['mail']['from']['password'],
+                self.__smtp)
+            archiver = ImapArchiver(
+                self.__conf['mail']['from']['imap_server'],
+                self.__conf['mail']['from']['address'],
+                self.__conf['mail']['from']['password'],
+                self.__imap)
 
-            message = self.__format_email_object(event['mail'])
-            has_been_sent = False
+        try :
 
-            if self.__conf['mail']['from']['address'] == self.__user['mail']:
+            for event in events:
 
-                # Use Microsoft Graph API to send email
-                try:
+                message = self.__format_email_object(self.__mails.get(event['mail']))
+                has_been_sent = False
 
-                    self.__logger.info('Sending email using Cloud API')
-                    self.__api.post_mail(
-                        message['subject'], message['content'],
-                        self.__conf['mail']['to'])
-                    has_been_sent = True
-                except Exception as e:
-                    self.__logger.error("Failed to send email : %s", str(e))
+                if session is None :
 
-            else :
+                    # Use Microsoft Graph API to send email
+                    try:
+
+                        self.__logger.info('Sending email using Cloud API')
+                        self.__api.post_mail(
+                            message['subject'], message['content'],
+                            self.__conf['mail']['to'])
+                        has_been_sent = True
+                    except Exception as e:
+                        self.__logger.error("Failed to send email : %s", str(e))
+
+                else :
+
+                    # Use Dedicated SMTP server to send email
+                    try:
+
+                        self.__logger.info('---> Sending email using smtp server coordinates')
+                        self.__send_email_using_smtp_server(
+                            session,
+                            archiver,
+                            message,
+                            self.__conf['mail']['from']['address'],
+                            self.__conf['mail']['to'])
+                        has_been_sent = True
+                    except Exception as e:
+                        self.__logger.error("Failed to send email : %s", str(e))
+
+                if has_been_sent : self.__on_email_sent(event)
+
+        finally :
+            if session is not None : session.close()
+            if archiver is not None :
+                self.__logger.info('--> %d emails archived', archiver.close())
+
+    def __send_emails_using_mail_pool(self, events):
+        """
+        Send emails concurrently using a bounded pool of smtp sessions
+        Parameters :
+            events (list) : Events whose email shall be sent
+        Returns    :
+        Throws     :
+        """
+
+        self.__logger.info('---> Sending emails using %d smtp sessions',
+            self.__conf['mail']['from']['connections'])
+
+        pool = MailPool(
+            self.__conf['mail']['from']['smtp_server'],
+            self.__conf['mail']['from']['imap_server'],
+            self.__conf['mail']['from']['address'],
+            self.__conf['mail']['from']['password'],
+            self.__conf['mail']['from']['connections'])
+        pool.mock({'smtp' : self.__smtp, 'imap' : self.__imap})
+
+        messages = []
+        for event in events :
+            message = self.__format_email_object(self.__mails.get(event['mail']))
+            messages.append((self.__conf['mail']['to'], self.__build_mime_message(
+                message, self.__conf['mail']['from']['address'], self.__conf['mail']['to'])))
+
+        pool.deliver(messages, lambda index : self.__on_email_sent(events[index]))
+
+    def __on_email_sent(self, event):
+        """
+        Record an email as sent by updating the event registration status
+        Parameters :
+            event (dict) : The event whose email has been sent
+        Returns    :
+        Throws     : Exception if the update fails
+        """
 
-                # Use Dedicated SMTP server to send email
-                try:
-
-                    self.__logger.info('---> Sending email using smtp server coordinates')
-                    self.__send_email_using_smtp_server(
-                        message,
-                        self.__conf['mail']['from']['address'],
-                        self.__conf['mail']['to'],
-                        self.__conf['mail']['from']['smtp_server'],
-                        self.__conf['mail']['from']['imap_server'],
-                        self.__conf['mail']['from']['password'])
-                    has_been_sent = True
-                except Exception as e:
-                    self.__logger.error("Failed to send email : %s", str(e))
-
-            if has_been_sent :
-
-                self.__logger.info("--> Email sent successfully!")
-                self.__update_registration_status(
-                    event['raw']['id'],
-                    self.__calendar,
-                    event['dates'],
-                    event['attendees']['all'])
-                self.__logger.info("--> Event status updated!")
+        self.__logger.info("--> Email sent successfully!")
+        if self.__outbox is not None : self.__outbox.mark_sent(event)
+        self.__update_registration_status(event)
+        self.__logger.info("--> Event status queued for update!")
 
     def __get_calendar_id(self, name):
         """
@@ -387,60 +782,44 @@ class Registration:
         Throws        : Exception if the calendar list retrieval fails
         """
 
-        result = ''
-
-        # Get all calendars
-        calendars = self.__api.get_calendars()
-
-        # Look for calendar with correct id
-        for calendar in calendars :
-            if calendar['name'] == name : result = calendar['id']
+        result = self.__get_calendar_ids([name]).get(name, '')
         if result == '' : self.__logger.error('Calendar %s not found', name)
 
         return result
 
-    def __compute_registration_timeslot(self, event, is_full_day):
+    def __get_calendar_ids(self, names):
         """
-        Compute registration timeslot for current event
+        Retrieve the identifiers of several calendars from their names, listing the calendars
+        at most once for all of them, and not at all if their cached identifiers are still valid
         Parameters     :
-            extension (dict) : Identifier of the event to update
-        Returns (dict) : datetimes corresponding to the last registration dates (UTC)
-        Throws         : Exception if the update fails
+            names (list) : The names of the calendars
+        Returns (dict) : The calendars identifiers by name, the calendars not found being left out
+        Throws         : Exception if the calendar list retrieval fails
         """
 
-        result = {}
-        if 'start' in event:
-            if 'dateTime' in event['start']:
-
-                result['start'] = \
-                    datetime.strptime(event['start']['dateTime'][:26], '%Y-%m-%dT%H:%M:%S.%f')
-                utc = ZoneInfo(event['start']['timeZone'])
-                result['start'] = result['start'].replace(tzinfo=utc)
-
-                result['end'] = \
-                    datetime.strptime(event['end']['dateTime'][:26], '%Y-%m-%dT%H:%M:%S.%f')
-                utc = ZoneInfo(event['end']['timeZone'])
-                result['end'] = result['end'].replace(tzinfo=utc)
-
-                if event['isAllDay'] :
-                    # Full days event appear to start at 00:00 UTC, even if created in another timezone
-                    # Date data are not reliable, so we need to switch them to local timezone
-                    local = ZoneInfo(self.__conf['calendar']['time_zone'])
-                    result['start'] = result['start'].replace(tzinfo=local)
-                    result['start'] = result['start'].astimezone(utc)
-                    result['end'] = result['end'].replace(tzinfo=local)
-                    result['end'] = result['end'] + timedelta(seconds=-1)
-                    result['end'] = result['end'].astimezone(utc)
-
-                if is_full_day :
-                    local = ZoneInfo(self.__conf['calendar']['time_zone'])
-                    result['start'] = result['start'].astimezone(local)
-                    result['start'] = result['start'].replace(hour=0, minute=0, second=0, microsecond=0)
-                    result['start'] = result['start'].astimezone(utc)
-                    result['end'] = result['end'].astimezone(local)
-                    result['end'] = result['end'].replace(hour=23, minute=59, second=59, microsecond=0)
-                    result['end'] = result['end'].astimezone(utc)
-
+        # Get all calendars, only once for all the registrations sharing this list
+        def listing() :
+            if self.__calendars['list'] is None :
+                self.__calendars['list'] = self.__api.get_calendars()
+            return self.__calendars['list']
+
+        # A cached identifier is valid if it still exists with the same name
+        def validate(identifier, name) :
+            calendar = self.__api.get_calendar(identifier)
+            return calendar is not None and calendar['name'] == name
+
+        with self.__calendars['lock'] :
+            missing = [name for name in names if name not in self.__calendars['ids']]
+            if len(missing) > 0 :
+                if self.__cache is not None :
+                    account = f"{self.__provider}:{self.__user.get('mail', '')}"
+                    found = self.__cache.resolve(account, missing, listing, validate)
+                else :
+                    found = {calendar['name'] : calendar['id'] for calendar in listing() \
+                        if calendar['name'] in missing}
+                self.__calendars['ids'].update(found)
+            result = {name : self.__calendars['ids'][name] for name in names \
+                if name in self.__calendars['ids']}
 
         return result
 
@@ -450,38 +829,35 @@ class Registration:
         Parameters     :
             calendar (str)   : Identifier of the calendar containing the event
             identifier (str) : Identifier of the event to analyze
-        Returns (dict) : Registration status
+        Returns (RegistrationStatus) : Registration status, None if it can not be decoded
         Throws         : Exception if the update fails
         """
 
-        result = {}
-
-        extension = self.__api.get_custom_properties(identifier, Registration.s_ExtensionName, calendar)
+        result = None
 
-        if 'sent' in extension and extension['sent']:
-            result['start'] = datetime.strptime(extension['start'],'%Y-%m-%dT%H:%M:%S.%f%z')
-            result['end'] = datetime.strptime(extension['end'],'%Y-%m-%dT%H:%M:%S.%f%z')
-            result['start'].replace(tzinfo=timezone.utc)
-            result['end'].replace(tzinfo=timezone.utc)
-            result['students'] = []
-            result['adults'] = []
+        # Read status from the local store first, and from the calendar if it is unknown
+        # locally or has not been reconciled with the calendar for a while
+        extension = None
+        if self.__store is not None : extension = self.__store.get(calendar, identifier)
+        if extension is None :
+            extension = self.__api.get_custom_properties(
+                identifier, Registration.s_ExtensionName, calendar)
+            if self.__store is not None : self.__store.put(calendar, identifier, extension)
 
-            if len(extension['students']) != 0 :
-                for student in extension['students'].split(';') :
-                    result['students'].append(loads(student))
-            if len(extension['adults']) != 0 :
-                for adult in extension['adults'].split(';') :
-                    result['adults'].append(loads(adult))
+        # An unknown or altered status only skips its own event, not the rest of the calendar
+        try :
+            result = StatusCodec.decode(extension)
+        except Exception as e :
+            self.__logger.error('Skipping event %s : %s', identifier, str(e))
 
         return result
 
-#pylint: disable=R1702
-    def __get_attendees(self, event, contacts):
+    def __get_attendees(self, event, index):
         """
         Update event attendees information from contacts information
         Parameters     :
-            event (dict)    : Event to analyze for attendees
-            contacts (dict) : List of contacts to look for attendees
+            event (Event) : Event to analyze for attendees
+            index (dict)  : Contacts indexed by email address
         Returns (dict) : The list of students and adults to register
         Throws         :
         """
@@ -489,41 +865,24 @@ class Registration:
         result = {'students': [], 'adults': []}
         self.__logger.info('--> Getting attendees names from contacts list')
 
-        if 'attendees' in event:
-            for attendee in event['attendees']:
-                # Search for attendees in contacts by matching email address
-                for contact in contacts:
-                    if 'emailAddresses' in contact:
-                        for mail in contact['emailAddresses']:
-                            if mail['address'] == attendee['emailAddress']['address'] :
-
-                                data = {
-                                    'mail' : mail['address'],
-                                    'name' : contact['displayName']
-                                }
-
-                                # Append to list from categories
-                                has_been_added = False
-                                for category in contact['categories']:
-                                    if category.lower() == 'student' :
-                                        result['students'].append(data)
-                                        has_been_added = True
-                                    elif category.lower() == 'adult':
-                                        result['adults'].append(data)
-                                        has_been_added = True
-                                if not has_been_added :
-                                    self.__logger.warning('Contact %s not marked as student or adult', contact['displayName'])
-
-            self.__logger.info(
-                "---> Found %d adults and %d students for event %s",
-                len(result['adults']),
-                len(result['students']),
-                event.get('subject', 'No Subject')
-            )
+        for attendee in event.attendees:
+            # Search for attendees in contacts by matching email address
+            for contact in index.get(attendee.mail, []):
 
-        return result
+                # Append to list from the roles given by the contact categories
+                data = Attendee(attendee.mail, contact.name)
+                for role in contact.roles : result[role].append(data)
+                if len(contact.roles) == 0 :
+                    self.__logger.warning('Contact %s not marked as student or adult', contact.name)
 
-#pylint: enable=R1702
+        self.__logger.info(
+            "---> Found %d adults and %d students for event %s",
+            len(result['adults']),
+            len(result['students']),
+            event.subject or 'No Subject'
+        )
+
+        return result
 
     def __format_email_object(self, email):
         """
@@ -551,79 +910,96 @@ class Registration:
 
 
 #pylint: disable=R0913
-    def __send_email_using_smtp_server(self, message, sender, recipient, smtp, imap, password):
+    def __send_email_using_smtp_server(self, session, archiver, message, sender, recipient):
         """
         Send email from user using SMTP server
         Parameters     :
+            session (SmtpSession)   : SMTP session shared by the run emails
+            archiver (ImapArchiver) : IMAP archiver copying sent emails in the sent folder
             message (str)   : Email content
             sender (str)    : Sender address
-            password(str)   : Sender password
             recipient (str) : Recipient address
-            smtp (dict)     : SMTP server address and port
-            imap (dict)     : IMAP server address and port
         Returns (dict) :
         Throws         : Exception if the sending fails
         """
 
         # Create the email message
-        result = MIMEMultipart()
-        result['From'] = sender
-        result['To'] = recipient
-        result['Subject'] = message['subject']
-        result.attach(MIMEText(message['content'], 'plain'))
+        result = self.__build_mime_message(message, sender, recipient)
 
         # Send the email via SMTP server
-        if self.__smtp: server = self.__smtp
-        else : server = SMTP(smtp['host'], smtp['port'], timeout=10)
-
-        server.ehlo()  # Identify ourselves to the SMTP server
-        server.starttls()  # Secure the connection with TLS
-        server.ehlo()  # Re-identify ourselves as an encrypted connection
-        server.login(sender, password)
-        self.__logger.info('---> Logged in smtp server')
-        server.sendmail(sender, recipient, result.as_string())
-        server.quit()
+        session.send(recipient, result.as_string())
 
         # Copy the email in the sent folder
-        if self.__imap: server = self.__imap
-        else : server = IMAP4_SSL(imap['host'], imap['port'])
-        server.login(sender, password)
-        self.__logger.info('---> Logged in imap server')
-        server.append('Sent', '\\Seen', Time2Internaldate(time()), result.as_bytes())
-        server.logout()
+        archiver.archive(result.as_bytes())
 
 #pylint: enable=R0913
 
-    def __update_registration_status(self, identifier, calendar, dates, attendees):
+    def __build_mime_message(self, message, sender, recipient):
+        """
+        Build the MIME email to send through the smtp server
+        Parameters     :
+            message (dict)  : Email subject and content
+            sender (str)    : Sender address
+            recipient (str) : Recipient address
+        Returns (MIMEMultipart) : The MIME email
+        Throws         :
+        """
+
+        result = MIMEMultipart()
+        result['From'] = sender
+        result['To'] = recipient
+        result['Subject'] = message['subject']
+        result.attach(MIMEText(message['content'], 'plain'))
+
+        return result
+
+    def __update_registration_status(self, event):
         """
         Update event in calendar to mark it as sent, with the associated registration date
+        The update is buffered and posted in bulk when the buffer is flushed
         Parameters     :
-            calendar (str)   : Identifier of the calendar containing the event
-            identifier (str) : Identifier of the event to update
-            dates (dict)     : Start and end date of the registration
-            attendees (dict) : Lists of students and adults
+            event (dict) : Event with its calendar and the registration status to write
         Returns        : Nothing
         Throws         : Exception if the update fails
         """
 
-        tz = ZoneInfo('UTC')
+        self.__statuses.add(event['event'].identifier, event['status'], event['calendar'])
 
-        custom_properties = {
-            'sent'     : True,
-            'start'    : dates['start'].astimezone(tz).strftime('%Y-%m-%dT%H:%M:%S.%f%z'),
-            'end'      : dates['end'].astimezone(tz).strftime('%Y-%m-%dT%H:%M:%S.%f%z'),
-            'students' : ';'.join(f"{dumps(s)}" for s in attendees['students']),
-            'adults'   : ';'.join(f"{dumps(s)}" for s in attendees['adults'])
-        }
+    def __on_statuses_written(self, updates):
+        """
+        Record the registration status updates the calendar has accepted
+        Parameters     :
+            updates (list) : Posted updates, as dictionaries with identifier, data and calendar
+        Returns        : Nothing
+        Throws         :
+        """
 
-        self.__api.post_custom_properties(identifier, Registration.s_ExtensionName, custom_properties, calendar)
+        if self.__outbox is not None : self.__outbox.mark_done(updates)
+        if self.__store is not None :
+            for update in updates :
+                self.__store.put(update['calendar'], update['identifier'], update['data'])
+
+# pylint: disable=R0913
+def create_registrations(conf, token, mail, api, receiver, sender, trace=''):
+    """ Create registrations for several teams, sharing the first one login and data """
+    result = []
+    for filename in conf :
+        registration = Registration(api, token, mail, trace if len(result) == 0 else '')
+        if len(result) == 0 : registration.initialize()
+        else : registration.share(result[0])
+        registration.configure(filename, receiver, sender)
+        result.append(registration)
+    if len(result) > 0 : result[0].resolve_calendars(result)
+    return result
+# pylint: enable=R0913
 
 # pylint: disable=W0107
 # Main function using Click for command-line options
 @group()
-def main():
-    """ Main click group """
-    pass
+@option('--logs', default='text', type=Choice(Logs.s_Modes))
+def main(logs):
+    """ Main click group, configuring the logging mode """
+    Logs(logg_conf_path, logs)
 # pylint: enable=W0107, W0719
 
 # pylint: disable=R0913
@@ -634,16 +1010,100 @@ def main():
 @option('--api', default='microsoft')
 @option('--receiver', default='nadege.lemperiere@gmail.com')
 @option('--sender', default='mantabots.infra@outlook.com')
-def run(conf, token, mail, api, receiver, sender):
+@option('--trace', default='')
+@option('--record', default='')
+@option('--replay', default='')
+@option('--profile', default='')
+@option('--profiler', default='cprofile', type=Choice(Profiler.s_Modes))
+@option('--memprofile', default='')
+def run(conf, token, mail, api, receiver, sender, trace, record, replay, profile, profiler,
+        memprofile):
     """ Script run function """
-    registration = Registration(api, token, mail)
-    registration.initialize()
-    registration.configure(conf, receiver, sender)
-    registration.search_events()
-    registration.prepare_emails()
-    registration.send_emails()
+
+    # Profile the cpu usage and the memory allocations of the run if required
+    cpu, memory = None, None
+    if len(profile) > 0 :
+        cpu = Profiler(path.normpath(path.join(path.dirname(__file__), profile)), profiler)
+        cpu.start()
+    if len(memprofile) > 0 :
+        memory = MemoryProfiler(path.normpath(path.join(path.dirname(__file__), memprofile)))
+        memory.start()
+
+    registration = None
+    try :
+        registration = Registration(api, token, mail, trace, record, replay)
+        if memory is not None : registration.metrics.observe(memory.observe)
+        registration.initialize()
+        registration.configure(conf, receiver, sender)
+        registration.search_events()
+        registration.prepare_emails()
+        registration.send_emails()
+    finally :
+        # Failed runs are exported too, their failures being what the metrics shall show
+        try :
+            if registration is not None : registration.close()
+        finally :
+            if memory is not None : memory.stop()
+            if cpu is not None : cpu.stop()
+
+@main.command('run-many')
+@option('--conf', multiple=True, default=['conf/conf.json'])
+@option('--token', default='token.json')
+@option('--mail', default='')
+@option('--api', default='microsoft')
+@option('--receiver', default='nadege.lemperiere@gmail.com')
+@option('--sender', default='mantabots.infra@outlook.com')
+@option('--trace', default='')
+@option('--workers', default=4)
+def run_many(conf, token, mail, api, receiver, sender, trace, workers):
+    """ Script run function for several teams sharing the same account """
+    registrations = create_registrations(conf, token, mail, api, receiver, sender, trace)
+    try :
+        Registration.process_all(registrations, workers)
+    finally :
+        registrations[0].close()
+
+@main.command()
+@option('--conf', multiple=True, default=['conf/conf.json'])
+@option('--token', default='token.json')
+@option('--mail', default='')
+@option('--api', default='microsoft')
+@option('--receiver', default='nadege.lemperiere@gmail.com')
+@option('--sender', default='mantabots.infra@outlook.com')
+@option('--trace', default='')
+@option('--workers', default=4)
+@option('--schedule', default='0 4 * * *')
+@option('--jitter', default=300)
+@option('--host', default='127.0.0.1')
+@option('--port', default=8027)
+@option('--refresh', default=2700)
+def serve(conf, token, mail, api, receiver, sender, trace, workers, schedule, jitter, host, port,
+          refresh):
+    """ Script daemon function, registering on schedule and on POST /run requests """
+    registrations = create_registrations(conf, token, mail, api, receiver, sender, trace)
+    try :
+        Registration.daemon(registrations, schedule, jitter, host, port, workers, refresh).serve()
+    finally :
+        registrations[0].close()
+
+@main.command()
+@option('--conf', default='conf/conf.json')
+@option('--token', default='token.json')
+@option('--mail', default='')
+@option('--api', default='microsoft')
+@option('--receiver', default='nadege.lemperiere@gmail.com')
+@option('--sender', default='mantabots.infra@outlook.com')
+@option('--trace', default='')
+def resume(conf, token, mail, api, receiver, sender, trace):
+    """ Script resume function, completing an interrupted run from the outbox """
+    registration = Registration(api, token, mail, trace)
+    try :
+        registration.initialize(contacts=False)
+        registration.configure(conf, receiver, sender)
+        registration.resume()
+    finally :
+        registration.close()
 # pylint: enable=R0913
 
 if __name__ == "__main__":
-    config.fileConfig(logg_conf_path)
-    main()
+    main()    #pylint: disable=E1120
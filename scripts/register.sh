@@ -6,7 +6,7 @@
 # Script installing and executing registration
 # -------------------------------------------------------
 # Nadège LEMPERIERE, @6th september 2024
-# Latest revision: 6th september 2024
+# Latest revision: 19th October 2026
 # -------------------------------------------------------
 
 # Retrieve absolute path to this script
@@ -15,18 +15,24 @@ scriptpath=`dirname $script`
 
 # Parse arguments from flags
 args=""
-while getopts c:p:t:f:k:a: flag
+command="run"
+confs=0
+while getopts c:p:t:f:k:a:r flag
 do
     case "${flag}" in
           k) args+=" --token ${OPTARG}";;
-          c) args+=" --conf ${OPTARG}";;
+          c) args+=" --conf ${OPTARG}"; confs=$((confs+1));;
           p) args+=" --mail ${OPTARG}";;
           t) args+=" --receiver ${OPTARG}";;
           f) args+=" --sender ${OPTARG}";;
           a) args+=" --api ${OPTARG}";;
+          r) command="resume";;
     esac
 done
 
+# Several configuration files register several teams sharing the same account in one process
+if [ $confs -gt 1 ] && [ "$command" = "run" ]; then command="run-many"; fi
+
 echo ${OPTARG}
 
 
@@ -38,7 +44,7 @@ python3 -m venv /tmp/register
 pip install --quiet -r $scriptpath/../requirements.txt
 
 # Launch registration process
-python3 $scriptpath/../manager.py run $args
+python3 $scriptpath/../manager.py $command $args
 
 # Deactivate virtual environment
 deactivate
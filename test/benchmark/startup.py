@@ -0,0 +1,51 @@
+# -------------------------------------------------------
+# Copyright (c) [2024] FASNY
+# All rights reserved
+# -------------------------------------------------------
+""" Command line startup time benchmark """
+# -------------------------------------------------------
+# Nadège LEMPERIERE, @19th October 2026
+# Latest revision: 19th October 2026
+# -------------------------------------------------------
+
+# System includes
+from sys        import executable
+from os         import path
+from subprocess import run
+from statistics import median
+from time       import perf_counter
+
+s_Root = path.normpath(path.join(path.dirname(__file__), '../../'))
+s_Repeat = 10
+
+# Startup of manager.py for each provider, with the lazy provider registry and with
+# every provider imported upfront as the api package used to do
+s_Scenarios = {
+    'microsoft (lazy)'  : "import manager, api; api.create('microsoft')",
+    'microsoft (eager)' : "import manager, api, api.google; api.create('microsoft')",
+    'google (lazy)'     : "import manager, api; api.create('google')",
+    'google (eager)'    : "import manager, api, api.microsoft; api.create('google')"
+}
+
+def measure(code) :
+    """ Median wall time in milliseconds of a fresh interpreter running code """
+
+    result = []
+    for _ in range(s_Repeat) :
+        start = perf_counter()
+        run([executable, '-c', code], cwd=s_Root, check=True)
+        result.append((perf_counter() - start) * 1000)
+
+    return median(result)
+
+def main() :
+    """ Print the startup time of each scenario """
+
+    baseline = measure('pass')
+    print(f"{'scenario':>18} | {'startup (ms)':>12} | {'imports (ms)':>12}")
+    for name, code in s_Scenarios.items() :
+        duration = measure(code)
+        print(f'{name:>18} | {duration:>12.1f} | {duration - baseline:>12.1f}')
+
+if __name__ == "__main__":
+    main()
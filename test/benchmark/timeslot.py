@@ -0,0 +1,87 @@
+# -------------------------------------------------------
+# Copyright (c) [2024] FASNY
+# All rights reserved
+# -------------------------------------------------------
+""" Timeslot computation micro-benchmark """
+# -------------------------------------------------------
+# Nadège LEMPERIERE, @19th October 2026
+# Latest revision: 19th October 2026
+# -------------------------------------------------------
+
+# System includes
+from sys       import path as relpath
+from os        import path
+from datetime  import datetime, timedelta, timezone
+from zoneinfo  import ZoneInfo
+from timeit    import timeit
+relpath.append(path.normpath(path.join(path.dirname(__file__), '../../')))
+
+# Project includes
+from engine    import Timeslot, Event
+
+s_Sizes = [10, 100, 1000, 10000]
+s_TimeZone = 'America/New_York'
+
+def generate_events(number) :
+    """ Generate events records, alternating full day and timed events """
+
+    result = []
+    now = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+    for i_event in range(number) :
+        start = now + timedelta(hours=i_event)
+        end = start + timedelta(hours=3)
+        result.append(Event(
+            f'event{i_event}',
+            all_day=(i_event % 2 == 0),
+            start=start.strftime('%Y-%m-%dT%H:%M:%S.%f') + '0',
+            end=end.strftime('%Y-%m-%dT%H:%M:%S.%f') + '0'))
+
+    return result
+
+def legacy(events, time_zone, is_full_day) :
+    """ Reference implementation building time zones and using strptime for each event """
+
+    result = []
+    for event in events :
+        dates = {}
+        dates['start'] = datetime.strptime(event.start[:26], '%Y-%m-%dT%H:%M:%S.%f')
+        dates['start'] = dates['start'].replace(tzinfo=ZoneInfo(event.start_zone))
+        utc = ZoneInfo(event.end_zone)
+        dates['end'] = datetime.strptime(event.end[:26], '%Y-%m-%dT%H:%M:%S.%f')
+        dates['end'] = dates['end'].replace(tzinfo=utc)
+        if event.all_day :
+            local = ZoneInfo(time_zone)
+            dates['start'] = dates['start'].replace(tzinfo=local).astimezone(utc)
+            dates['end'] = (dates['end'].replace(tzinfo=local) + timedelta(seconds=-1)).astimezone(utc)
+        if is_full_day :
+            local = ZoneInfo(time_zone)
+            dates['start'] = dates['start'].astimezone(local)
+            dates['start'] = dates['start'].replace(hour=0, minute=0, second=0, microsecond=0)
+            dates['start'] = dates['start'].astimezone(utc)
+            dates['end'] = dates['end'].astimezone(local)
+            dates['end'] = dates['end'].replace(hour=23, minute=59, second=59, microsecond=0)
+            dates['end'] = dates['end'].astimezone(utc)
+        result.append(dates)
+
+    return result
+
+def main() :
+    """ Print per event computation cost for an increasing number of events """
+
+    timeslot = Timeslot(s_TimeZone, True)
+
+    print(f"{'events':>8} | {'legacy (us/event)':>18} | {'timeslot (us/event)':>20}")
+    for size in s_Sizes :
+        events = generate_events(size)
+        if legacy(events, s_TimeZone, True) != timeslot.compute_all(events) :
+            raise Exception('Timeslot engine results differ from reference implementation')
+
+        repeat = max(1, 10000 // size)
+        reference = timeit(lambda: legacy(events, s_TimeZone, True), number=repeat)
+        current = timeit(lambda: timeslot.compute_all(events), number=repeat)
+        print(f'{size:>8} | {reference * 1e6 / (size * repeat):>18.2f} | '
+              f'{current * 1e6 / (size * repeat):>20.2f}')
+
+if __name__ == "__main__":
+    main()
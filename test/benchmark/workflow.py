@@ -0,0 +1,223 @@
+# -------------------------------------------------------
+# Copyright (c) [2024] FASNY
+# All rights reserved
+# -------------------------------------------------------
+""" End to end registration benchmark on synthetic calendars """
+# -------------------------------------------------------
+# Nadège LEMPERIERE, @19th October 2026
+# Latest revision: 19th October 2026
+# -------------------------------------------------------
+
+# System includes
+from sys        import path as relpath, version
+from os         import path, makedirs
+from json       import dump, dumps, load
+from datetime   import datetime, timedelta, timezone
+from random     import Random
+from subprocess import run, PIPE
+from tempfile   import TemporaryDirectory
+from time       import perf_counter
+relpath.append(path.normpath(path.join(path.dirname(__file__), '../../')))
+relpath.append(path.normpath(path.join(path.dirname(__file__), '../keywords')))
+
+# Click includes
+from click      import command, option
+
+# Project includes
+from manager    import Registration
+
+# Test includes
+from microsoft  import MicrosoftMockAPI
+from graph      import MockGraphServer
+from gcp        import GoogleMockLibrary
+from smtp       import MockSMTPServer
+from imap       import MockImapServer
+from mailserver import LocalSMTPServer, LocalImapServer
+
+s_Root = path.normpath(path.join(path.dirname(__file__), '../../'))
+s_TimeZone = 'America/New_York'
+s_Days = 30
+s_Attendees = 8
+
+def generate_scenario(events, contacts, seed) :
+    """ Generate a calendar with events spread over the registration window, and contacts """
+
+    result = {
+        'calendars' : [
+            { 'id' : 'calendar1', 'name' : 'Other Calendar' },
+            { 'id' : 'calendar2', 'name' : MicrosoftMockAPI.s_TestCalendar }
+        ],
+        'events' : [],
+        'contacts' : [],
+        'smtp' : {},
+        'imap' : {}
+    }
+
+    random = Random(seed)
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+
+    for i_contact in range(contacts) :
+        tag = 'Student' if i_contact % 4 != 0 else 'Adult'
+        result['contacts'].append({
+            'role' : tag, 'mail' : f'contact{i_contact}@example.com',
+            'name' : f'Contact {i_contact}', 'tags' : [tag]
+        })
+
+    for i_event in range(events) :
+        delta = 1 + (i_event * (s_Days - 2) * 24) // max(1, events)
+        attendees = random.sample(range(contacts), min(s_Attendees, contacts))
+        result['events'].append({
+            'id' : f'event{i_event}',
+            'summary' : 'Next Team Session',
+            'full_day' : 'false',
+            'status' : 'confirmed',
+            'delta_start_hours' : delta,
+            'delta_end_hours' : delta + 3,
+            'start' : { 'date' : now + timedelta(hours=delta) },
+            'end' : { 'date' : now + timedelta(hours=delta + 3) },
+            'attendees' : \
+                [{'mail' : f'contact{i_attendee}@example.com'} for i_attendee in attendees]
+        })
+
+    return result
+
+def write_configuration(folder, smtp=None, imap=None) :
+    """
+    Write a configuration registering the test calendar through mocked smtp and imap servers,
+    or through the given local servers
+    """
+
+    result = path.join(folder, 'conf.json')
+    servers = {
+        'smtp_server' : { 'host' : 'smtp.test.org', 'port' : 587 },
+        'imap_server' : { 'host' : 'imap.test.org', 'port' : 993 },
+    }
+    if smtp is not None : servers['smtp_server'] = { 'host' : '127.0.0.1', 'port' : smtp.port }
+    if imap is not None : servers['imap_server'] = { 'host' : '127.0.0.1', 'port' : imap.port }
+
+    with open(result, 'w', encoding='utf-8') as file :
+        dump({
+            'team' : 'BenchBots',
+            'mail' : {
+                'from' : dict(servers, address='test@test.org'),
+                'to' : 'moi@moi.com',
+                'pattern' : 'test/data/mail-pattern.txt'
+            },
+            'calendar' : {
+                'name' : MicrosoftMockAPI.s_TestCalendar, 'topic' : 'Team Session',
+                'days' : s_Days, 'full_day' : 'False', 'time_zone' : s_TimeZone
+            }
+        }, file)
+
+    return result
+
+def measure(api, folder, scenario, network=None, mail=None) :
+    """
+    Run a full registration on the scenario, returning its duration and stages metrics
+    Microsoft requests go through a local http server when network settings are given,
+    and emails through local smtp and imap servers when mail settings are given
+    """
+
+    microsoft = MicrosoftMockAPI(scenario)
+    if network is not None : microsoft = MockGraphServer(scenario, network).start()
+    google = GoogleMockLibrary(scenario)
+    smtp = MockSMTPServer(scenario['smtp'])
+    imap = MockImapServer(scenario['imap'])
+    servers = {}
+    if mail is not None :
+        smtp = LocalSMTPServer(scenario['smtp'], 'password', mail).start()
+        imap = LocalImapServer(scenario['imap'], 'password', mail).start()
+        servers = {'smtp' : smtp, 'imap' : imap}
+    conf = write_configuration(folder, **servers)
+
+    start = perf_counter()
+
+    registration = Registration(api, path.join(s_Root, 'test/data/microsoft.json'), 'password')
+    registration.mock({
+        'get' : microsoft.get, 'post' : microsoft.post,
+        'build' : google.build, 'authent' : google.authent,
+        'smtp' : None if mail is not None else smtp, 'imap' : None if mail is not None else imap
+    })
+    registration.initialize()
+    registration.configure(conf, 'moi@moi.com', 'test@test.org')
+    registration.search_events()
+    registration.prepare_emails()
+    registration.send_emails()
+    if network is not None : microsoft.stop()
+    if mail is not None :
+        smtp.stop()
+        imap.stop()
+
+    result = {'duration' : perf_counter() - start, 'mails' : len(smtp.get_mails()), 'stages' : {}}
+    for item in registration.metrics.snapshot().get('stage', []) :
+        result['stages'][item['stage']] = item['duration']
+
+    return result
+
+def commit() :
+    """ Identifier of the measured commit """
+
+    result = 'unknown'
+
+    process = run(['git', 'rev-parse', '--short', 'HEAD'],
+        cwd=s_Root, stdout=PIPE, stderr=PIPE, check=False, text=True)
+    if process.returncode == 0 : result = process.stdout.strip()
+
+    return result
+
+# pylint: disable=R0913, R0914
+@command()
+@option('--api', default='microsoft')
+@option('--events', default='100,1000,5000')
+@option('--contacts', default=1000)
+@option('--seed', default=27)
+@option('--output', default='')
+@option('--baseline', default='')
+@option('--latency', default=-1, help='Serve Microsoft requests over http with this latency (ms)')
+@option('--jitter', default=0, help='Maximum random delay added to the http latency (ms)')
+@option('--mail-delay', default=-1, help='Deliver emails to local servers answering with this delay (ms)')
+@option('--mail-connections', default=0, help='Maximum simultaneous connections to the local mail servers')
+def main(api, events, contacts, seed, output, baseline, latency, jitter, mail_delay, mail_connections) :
+    """ Measure registrations of increasing size and store the results """
+
+    results = {
+        'commit' : commit(), 'python' : version.split()[0], 'api' : api.lower(),
+        'contacts' : contacts, 'latency' : latency, 'mail_delay' : mail_delay, 'date' : datetime.now(timezone.utc).isoformat(), 'runs' : []
+    }
+
+    network = None
+    if latency >= 0 : network = {'latency' : {'default' : latency}, 'jitter' : {'default' : jitter}}
+
+    mail = None
+    if mail_delay >= 0 : mail = {'delays' : {'default' : mail_delay}, 'connections' : mail_connections}
+
+    reference = {}
+    if len(baseline) > 0 :
+        with open(baseline, encoding='utf-8') as file :
+            reference = {item['events'] : item for item in load(file)['runs']}
+
+    print(f"{'events':>7} | {'mails':>6} | {'total (s)':>9} | {'events/s':>9} | "
+          f"{'vs base':>7} | stages (s)")
+    with TemporaryDirectory() as folder :
+        for size in [int(value) for value in events.split(',')] :
+            measured = measure(api, folder, generate_scenario(size, contacts, seed), network, mail)
+            measured['events'] = size
+            measured['throughput'] = size / measured['duration']
+            results['runs'].append(measured)
+
+            ratio = '-'
+            if size in reference :
+                ratio = f"{reference[size]['duration'] / measured['duration']:.2f}x"
+            stages = ' '.join(f'{name}={value:.3f}' for name, value in measured['stages'].items())
+            print(f"{size:>7} | {measured['mails']:>6} | {measured['duration']:>9.3f} | "
+                  f"{measured['throughput']:>9.1f} | {ratio:>7} | {stages}")
+
+    if len(output) == 0 :
+        output = path.join(path.dirname(__file__), 'results', f"workflow-{results['commit']}.json")
+    makedirs(path.dirname(path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as file : file.write(dumps(results, indent=4))
+    print(f'Results stored in {output}')
+# pylint: enable=R0913, R0914
+
+if __name__ == "__main__":
+    main()
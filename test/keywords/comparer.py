@@ -5,7 +5,7 @@
 """ Registration workflow keywords io functions """
 # -------------------------------------------------------
 # Nadège LEMPERIERE, @11th September 2024
-# Latest revision: 11th September 2024
+# Latest revision: 19th October 2026
 # -------------------------------------------------------
 
 # System includes
@@ -24,6 +24,18 @@ ROBOT = False
 class Comparer :
     """ Namespace for comparison functions """
 
+    def event_id(subject) :
+        """ Extract the identifier of the event a mail was sent for from its subject """
+        return subject[subject.find('[') + 1:subject.find(']')]
+
+    def index(items, key) :
+        """ Group items by the value key returns for them """
+
+        result = {}
+        for item in items : result.setdefault(key(item), []).append(item)
+
+        return result
+
     def compare_emails_number(expected, actual) :
         """ Compare the number of emails sent """
 
@@ -42,14 +54,16 @@ class Comparer :
         if not 'end' in actual['event']['registration'] : raise Exception('Event not updated after email sent')
         if not 'students' in actual['event']['registration'] : raise Exception('Event not updated after email sent')
         if not 'adults' in actual['event']['registration'] : raise Exception('Event not updated after email sent')
+        if not 'fingerprint' in actual['event']['registration'] : raise Exception('Event not updated after email sent')
 
-        start_date_utc   = dates['start']['utc'].strftime('%Y-%m-%dT%H:%M:%S.%f%z')
-        end_date_utc     = dates['end']['utc'].strftime('%Y-%m-%dT%H:%M:%S.%f%z')
+        start_date_utc   = str(int(dates['start']['utc'].timestamp()))
+        end_date_utc     = str(int(dates['end']['utc'].timestamp()))
 
         logger.debug(actual['event']['registration'])
         logger.debug(start_date_utc)
         logger.debug(end_date_utc)
 
+        if actual['event']['registration'].get('version') != '2' : raise Exception('Event status encoding is not current')
         if not actual['event']['registration']['sent'] : raise Exception('Event sent status is not true')
         if actual['event']['registration']['start'] != start_date_utc : raise Exception('Start date does not match email')
         if actual['event']['registration']['end'] != end_date_utc : raise Exception('End date does not match email')
@@ -0,0 +1,237 @@
+# -------------------------------------------------------
+# Copyright (c) [2024] FASNY
+# All rights reserved
+# -------------------------------------------------------
+""" Fault and latency injection in the provider mocks """
+# -------------------------------------------------------
+# Nadège LEMPERIERE, @19th October 2026
+# Latest revision: 19th October 2026
+# -------------------------------------------------------
+
+# System includes
+from threading      import Lock
+from random         import Random
+from time           import sleep
+
+# Requests includes
+from requests.exceptions    import Timeout
+
+# Google includes
+from googleapiclient.errors import HttpError
+from httplib2               import Response
+
+# Local includes
+from microsoft      import MockMicrosoftResponse
+
+class FaultInjector:
+    """ Delay requests and replace their responses by errors, following declarative rules """
+
+    def __init__(self, settings):
+        """
+        Initialize the injector from the scenario faults settings
+        Settings :
+            seed (int)   : Random generator seed, so that runs are reproducible
+            rules (list) : Faults applying to the requests matching their method and endpoint
+        Rule :
+            method (str)        : Http method to match, any if missing
+            endpoint (str)      : Endpoint url fragment to match, any if missing
+            latency (dict)      : Delay of every matching request in milliseconds, as a distribution
+                                  (constant value, uniform min/max, normal mean/deviation,
+                                  lognormal median/sigma or exponential mean)
+            status (int)        : Error status answered instead of the response, such as 429 or 503
+            retry_after (float) : Retry-After header of the error responses in seconds
+            timeout (bool)      : Raise a timeout instead of answering
+            partial (float)     : Ratio of the batch sub requests answered with the error status
+            every (int)         : Inject the fault every how many matching requests, 1 by default
+            rate (float)        : Probability to inject the fault, instead of every
+            count (int)         : Maximum number of injected faults, no limit if missing
+        """
+
+        self.__rules = settings.get('rules', [])
+        self.__random = Random(settings.get('seed', 27))
+        self.__lock = Lock()
+        self.__matches = [0] * len(self.__rules)
+        self.__injected = [0] * len(self.__rules)
+        self.__counts = {}
+
+    def wrap(self, method, function):
+        """
+        Inject faults in a requests like function, such as MicrosoftMockAPI.get or post
+        Parameters :
+            method (str)        : Http method the function sends
+            function (function) : Function taking the url first and returning a response
+        Returns (function) : The function suffering the faults
+        """
+
+        def injected(endpoint, *args, **kwargs) :
+
+            fault = self.select(method, endpoint)
+
+            if fault is None : result = function(endpoint, *args, **kwargs)
+            elif fault.get('timeout', False) : raise Timeout(f'Injected timeout on {endpoint}')
+            elif 'partial' in fault :
+                result = self.__partial(function(endpoint, *args, **kwargs), fault)
+            else :
+                result = MockMicrosoftResponse()
+                result.status_code = fault['status']
+                result.set_content({'error' : {'code' : str(fault['status']), 'message' : 'Injected fault'}})
+                if 'retry_after' in fault : result.headers['Retry-After'] = str(fault['retry_after'])
+
+            return result
+
+        return injected
+
+    def google(self, library):
+        """
+        Inject faults in the requests built by a google library mock
+        Parameters :
+            library (GoogleMockLibrary) : Library mock
+        Returns (GoogleFaults) : The library mock, whose requests suffer the faults
+        """
+        return GoogleFaults(library, self)
+
+    def select(self, method, endpoint):
+        """
+        Apply the latency of the rules matching a request, and select the fault to inject
+        Parameters :
+            method (str)   : Request http method
+            endpoint (str) : Request endpoint
+        Returns (dict) : The rule of the fault to inject, None if the request shall succeed
+        """
+
+        result = None
+        delay = 0
+
+        with self.__lock :
+            for i_rule, rule in enumerate(self.__rules) :
+                if rule.get('method', method).upper() != method.upper() : continue
+                if rule.get('endpoint', '') not in endpoint : continue
+
+                self.__matches[i_rule] = self.__matches[i_rule] + 1
+                if 'latency' in rule : delay = delay + self.__delay(rule['latency'])
+
+                if result is None and self.__triggered(i_rule, rule) :
+                    self.__injected[i_rule] = self.__injected[i_rule] + 1
+                    kind = 'timeout' if rule.get('timeout', False) else \
+                        'partial' if 'partial' in rule else 'status'
+                    self.__counts[kind] = self.__counts.get(kind, 0) + 1
+                    result = rule
+
+        if delay > 0 : sleep(delay / 1000)
+
+        return result
+
+    def injected(self, kind):
+        """ Number of injected faults of a kind : status, timeout or partial """
+        return self.__counts.get(kind, 0)
+
+    def __triggered(self, index, rule):
+        """ Check if a matching rule injects its fault on this request """
+
+        result = 'status' in rule or rule.get('timeout', False) or 'partial' in rule
+        if result and self.__injected[index] >= rule.get('count', float('inf')) : result = False
+        elif result and 'rate' in rule : result = self.__random.random() < rule['rate']
+        elif result : result = self.__matches[index] % rule.get('every', 1) == 0
+
+        return result
+
+    def __delay(self, latency):
+        """ Draw a delay in milliseconds from a latency distribution """
+
+        distribution = latency.get('distribution', 'constant')
+        if distribution == 'uniform' :
+            result = self.__random.uniform(latency.get('min', 0), latency.get('max', 0))
+        elif distribution == 'normal' :
+            result = self.__random.gauss(latency.get('mean', 0), latency.get('deviation', 0))
+        elif distribution == 'lognormal' :
+            result = latency.get('median', 0) * self.__random.lognormvariate(0, latency.get('sigma', 0))
+        elif distribution == 'exponential' :
+            result = self.__random.expovariate(1 / latency['mean']) if latency.get('mean', 0) > 0 else 0
+        else : result = latency.get('value', 0)
+
+        return max(0, result)
+
+    def __partial(self, response, fault):
+        """ Answer some of the sub requests of a successful batch response with the fault status """
+
+        result = response
+        if response.status_code == 200 :
+            content = response.json()
+            responses = content.get('responses', [])
+            with self.__lock :
+                failed = self.__random.sample(
+                    range(len(responses)), min(len(responses), max(1, round(len(responses) * fault['partial']))))
+            for i_response in failed :
+                responses[i_response]['status'] = fault.get('status', 503)
+
+            result = MockMicrosoftResponse()
+            result.status_code = 200
+            result.set_content(content)
+
+        return result
+
+class GoogleFaults:
+    """ Google library mock whose requests execution suffers injected faults """
+
+    def __init__(self, library, injector):
+        self.__library = library
+        self.__injector = injector
+
+    def build(self, *args, **kwargs):
+        """ Mock service building function """
+        return GoogleFaultyService(self.__library.build(*args, **kwargs), self.__injector, [])
+
+    def authent(self, *args, **kwargs) :
+        """ Mock credentials acquisition function """
+        return self.__library.authent(*args, **kwargs)
+
+    def scenario(self) :
+        return self.__library.scenario()
+
+class GoogleFaultyService:
+    """ Google service mock proxy, naming requests after their resource and method (events.list) """
+
+    s_Reads = ['get', 'list']
+
+    def __init__(self, service, injector, resources):
+        self.__service = service
+        self.__injector = injector
+        self.__resources = resources
+
+    def __getattr__(self, name):
+
+        function = getattr(self.__service, name)
+
+        def call(*args, **kwargs) :
+            result = function(*args, **kwargs)
+            if result is self.__service :
+                result = GoogleFaultyService(self.__service, self.__injector, self.__resources + [name])
+            elif hasattr(result, 'execute') and not hasattr(result, 'add') :
+                method = 'GET' if name in GoogleFaultyService.s_Reads else 'POST'
+                result = GoogleFaultyRequest(
+                    result, self.__injector, method, '.'.join(self.__resources + [name]))
+            return result
+
+        return call
+
+class GoogleFaultyRequest:
+    """ Google request mock proxy, raising the injected faults on execution """
+
+    def __init__(self, request, injector, method, endpoint):
+        self.__request = request
+        self.__injector = injector
+        self.__method = method
+        self.__endpoint = endpoint
+
+    def execute(self, *args, **kwargs):
+
+        fault = self.__injector.select(self.__method, self.__endpoint)
+
+        if fault is not None and fault.get('timeout', False) :
+            raise TimeoutError(f'Injected timeout on {self.__endpoint}')
+        if fault is not None :
+            headers = {'status' : str(fault.get('status', 503))}
+            if 'retry_after' in fault : headers['retry-after'] = str(fault['retry_after'])
+            raise HttpError(Response(headers), b'{"error" : "Injected fault"}', uri=self.__endpoint)
+
+        return self.__request.execute(*args, **kwargs)
@@ -5,7 +5,7 @@
 """ Google API mock for testing """
 # -------------------------------------------------------
 # Nadège LEMPERIERE, @11th September 2024
-# Latest revision: 11th September 2024
+# Latest revision: 19th October 2026
 # -------------------------------------------------------
 
 # System includes
@@ -19,11 +19,17 @@ class GoogleMockLibrary:
         """ Initialize API from scenario data"""
         self.__scenario = deepcopy(scenario)
         self.__service = GoogleMockService(self.__scenario)
+        self.__builds = 0
 
-    def build(self, api, version, credentials, cache_discovery=False):
+    def build(self, api, version, credentials=None, cache_discovery=False, http=None):
         """ Mock service building function """
+        self.__builds = self.__builds + 1
         return self.__service
 
+    def builds(self) :
+        """ Number of services built """
+        return self.__builds
+
     def authent(self, filename, scopes) :
         """ Mock credentials acquisition function """
         return ''
@@ -37,6 +43,10 @@ class GoogleMockService:
     def __init__(self, scenario):
         self.__scenario = scenario
 
+        # Events by identifier, so that large scenarios are not scanned for each request
+        self.__events = {}
+        for event in self.__scenario['events'] : self.__events.setdefault(event['id'], []).append(event)
+
     def calendars(self):
         return self
 
@@ -162,10 +172,9 @@ class GoogleMockService:
                 cid = calendar['id']
 
         if calendarId == cid :
-            for item in self.__scenario['events'] :
-                if item['id'] == eventId :
-                    if 'registration' in item :
-                        registration = item['registration']
+            for item in self.__events.get(eventId, []) :
+                if 'registration' in item :
+                    registration = item['registration']
 
         return MockGoogleResponse(
             {'extendedProperties': { 'private' : registration }}
@@ -173,13 +182,14 @@ class GoogleMockService:
 
     def update(self, calendarId, eventId, body):
 
-        found = False
-        for item in self.__scenario['events'] :
-            if item['id'] == eventId :
-                item['registration'] = body['extendedProperties']['private']
+        for item in self.__events.get(eventId, []) :
+            item['registration'] = body['extendedProperties']['private']
 
         return MockGoogleResponse({'status': 'success'})
 
+    def new_batch_http_request(self, callback=None):
+        return MockGoogleBatch(callback)
+
     def users(self):
         return self
 
@@ -193,6 +203,24 @@ class GoogleMockService:
         return self.__scenario
 
 
+class MockGoogleBatch:
+    """ A mock batch to simulate Google API batch requests """
+
+    def __init__(self, callback):
+        self.__callback = callback
+        self.__requests = []
+
+    def add(self, request, request_id=None):
+        self.__requests.append((request_id, request))
+
+    def execute(self):
+        for request_id, request in self.__requests :
+            try :
+                response = request.execute()
+                self.__callback(request_id, response, None)
+            except Exception as e :
+                self.__callback(request_id, None, e)
+
 class MockGoogleResponse:
     """ A mock response to simulate Google API responses """
 
@@ -0,0 +1,171 @@
+# -------------------------------------------------------
+# Copyright (c) [2024] FASNY
+# All rights reserved
+# -------------------------------------------------------
+""" Local http server standing in for Microsoft Graph """
+# -------------------------------------------------------
+# Nadège LEMPERIERE, @19th October 2026
+# Latest revision: 19th October 2026
+# -------------------------------------------------------
+
+# System includes
+from http.server    import ThreadingHTTPServer, BaseHTTPRequestHandler
+from threading      import Lock, Thread
+from urllib.parse   import urlsplit, parse_qsl
+from json           import loads, dumps
+from random         import Random
+from time           import sleep
+
+# Requests includes
+from requests       import Session
+
+# Local includes
+from microsoft      import MicrosoftMockAPI
+
+class MockGraphServer:
+    """ Serve the microsoft mock scenario data over http, with latency and throttling """
+
+    s_Hosts = {
+        'https://graph.microsoft.com' : '/graph',
+        'https://login.microsoftonline.com' : '/login'
+    }
+
+    def __init__(self, scenario, network=None):
+        """
+        Initialize the server from scenario data
+        Network behavior is configured by endpoint path fragment, 'default' applying to all :
+            latency (dict)  : Response delay in milliseconds
+            jitter (dict)   : Maximum random delay in milliseconds added to the latency
+            throttle (dict) : Every how many requests a 429 response is sent instead
+            retry_after (int) : Retry-After header value of the 429 responses, in seconds
+        """
+
+        self.__api = MicrosoftMockAPI(scenario)
+        self.__network = network if network is not None else {}
+        self.__random = Random(self.__network.get('seed', 27))
+        self.__lock = Lock()
+        self.__counts = {}
+        self.__requests = 0
+        self.__throttled = 0
+
+        server = self
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                server.handle(self, 'GET')
+
+            def do_POST(self):
+                server.handle(self, 'POST')
+
+            def log_message(self, format, *args):
+                pass
+
+        self.__server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.__server.daemon_threads = True
+        self.__thread = None
+        self.__session = Session()
+
+    @property
+    def url(self):
+        """ Base url of the server """
+        return f'http://127.0.0.1:{self.__server.server_address[1]}'
+
+    def start(self):
+        """ Start serving in a background thread """
+        self.__thread = Thread(target=self.__server.serve_forever, daemon=True)
+        self.__thread.start()
+        return self
+
+    def stop(self):
+        """ Stop serving """
+        self.__server.shutdown()
+        self.__server.server_close()
+
+    def scenario(self):
+        """ Scenario data, as modified by the requests received """
+        return self.__api.scenario()
+
+    def calls(self, endpoint):
+        """ Number of requests received on an endpoint """
+        return self.__api.calls(endpoint)
+
+    def requests(self):
+        """ Number of http requests received """
+        return self.__requests
+
+    def throttled(self):
+        """ Number of http requests answered with a 429 response """
+        return self.__throttled
+
+    def get(self, url, **kwargs):
+        """ requests.get sending Graph requests to this server """
+        return self.__session.get(self.__rewrite(url), **kwargs)
+
+    def post(self, url, **kwargs):
+        """ requests.post sending Graph requests to this server """
+        return self.__session.post(self.__rewrite(url), **kwargs)
+
+    def handle(self, request, method):
+        """ Answer a request from the mock data, after the configured delay """
+
+        parts = urlsplit(request.path)
+        host, path = '', parts.path
+        for name, prefix in MockGraphServer.s_Hosts.items():
+            if path.startswith(prefix): host, path = name, path[len(prefix):]
+        endpoint = host + path
+
+        length = int(request.headers.get('Content-Length', 0))
+        body = request.rfile.read(length) if length > 0 else b''
+
+        with self.__lock:
+            self.__requests = self.__requests + 1
+            count = self.__counts.get(path, 0) + 1
+            self.__counts[path] = count
+            delay = self.__value('latency', path) + \
+                self.__random.uniform(0, self.__value('jitter', path))
+        sleep(delay / 1000)
+
+        throttle = self.__value('throttle', path)
+        if throttle > 0 and count % throttle == 0:
+            status, content = 429, dumps({'error' : {'code' : 'TooManyRequests'}}).encode('utf-8')
+            headers = {'Retry-After' : str(self.__network.get('retry_after', 0))}
+            with self.__lock: self.__throttled = self.__throttled + 1
+        else:
+            with self.__lock:
+                if method == 'GET':
+                    response = self.__api.get(
+                        endpoint, headers=dict(request.headers), params=dict(parse_qsl(parts.query)))
+                elif request.headers.get('Content-Type', '').startswith('application/json'):
+                    response = self.__api.post(
+                        endpoint, headers=dict(request.headers), json=loads(body))
+                else:
+                    response = self.__api.post(
+                        endpoint, headers=dict(request.headers), data=dict(parse_qsl(body.decode())))
+            status, content, headers = response.status_code or 404, response.content or b'', {}
+
+        request.send_response(status)
+        request.send_header('Content-Type', 'application/json')
+        request.send_header('Content-Length', str(len(content)))
+        for name, value in headers.items(): request.send_header(name, value)
+        request.end_headers()
+        request.wfile.write(content)
+
+    def __rewrite(self, url):
+        """ Replace the Graph and login hosts by this server """
+
+        for host, prefix in MockGraphServer.s_Hosts.items():
+            if url.startswith(host): url = self.url + prefix + url[len(host):]
+
+        return url
+
+    def __value(self, kind, path):
+        """ Network setting of an endpoint, the most specific path fragment winning """
+
+        result = 0
+        settings = self.__network.get(kind, {})
+        matches = [fragment for fragment in settings if fragment != 'default' and fragment in path]
+        if len(matches) > 0: result = settings[max(matches, key=len)]
+        elif 'default' in settings: result = settings['default']
+
+        return result
@@ -5,7 +5,7 @@
 """ IMAP server mock for testing """
 # -------------------------------------------------------
 # Nadège LEMPERIERE, @15th September 2024
-# Latest revision: 15th September 2024
+# Latest revision: 19th October 2026
 # -------------------------------------------------------
 
 # System includes
@@ -16,14 +16,21 @@ class MockImapServer:
     """ A mock class to simulate an IMAP server """
 
     def __init__(self, scenario):
-        self.__scenario = {}
+        self.__scenario = scenario
+        self.__messages = []
         self.__emails = []
+        self.__logins = 0
 
     def login(self, address, password):
-        pass
+        self.__logins = self.__logins + 1
 
     def append(self, box, flags, date_time, message):
 
+        # Messages are only parsed when checked, so that parsing does not weigh on the run timings
+        self.__messages.append((box, flags, date_time, message))
+
+    def __parse(self, box, flags, date_time, message):
+
         msg = message_from_bytes(message, policy=default)
 
         subject = msg['Subject']
@@ -55,5 +62,9 @@ class MockImapServer:
         pass
 
     def get_mails(self) :
+        for message in self.__messages[len(self.__emails):] : self.__parse(*message)
         return self.__emails
 
+    def get_logins(self) :
+        return self.__logins
+
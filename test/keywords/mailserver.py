@@ -0,0 +1,388 @@
+# -------------------------------------------------------
+# Copyright (c) [2024] FASNY
+# All rights reserved
+# -------------------------------------------------------
+""" Local SMTP and IMAP servers standing in for the mail provider """
+# -------------------------------------------------------
+# Nadège LEMPERIERE, @19th October 2026
+# Latest revision: 19th October 2026
+# -------------------------------------------------------
+
+# System includes
+from socketserver   import ThreadingTCPServer, StreamRequestHandler
+from ssl            import SSLContext, PROTOCOL_TLS_SERVER
+from smtplib        import SMTPServerDisconnected
+from threading      import Lock, Thread
+from base64         import b64decode
+from os             import path
+from time           import sleep
+from re             import match
+
+# Local includes
+from smtp           import MockSMTPServer
+from imap           import MockImapServer
+
+class LocalMailServer(ThreadingTCPServer):
+    """ Threaded tcp server with tls, authentication, delays and a connections limit """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    s_Certificate = path.normpath(path.join(path.dirname(__file__), '../data/localhost.pem'))
+
+    def __init__(self, handler, recorder, password, settings=None):
+        """
+        Initialize the server, listening on any free local port
+        Settings :
+            delays (dict)     : Delay in milliseconds before answering a command, 'default' for all
+            connections (int) : Maximum number of simultaneous connections, 0 for no limit
+        """
+
+        super().__init__(('127.0.0.1', 0), handler)
+
+        self.recorder = recorder
+        self.password = password
+        self.settings = settings if settings is not None else {}
+
+        self.context = SSLContext(PROTOCOL_TLS_SERVER)
+        self.context.load_cert_chain(LocalMailServer.s_Certificate)
+
+        self.__lock = Lock()
+        self.__active = 0
+        self.__refused = 0
+        self.__thread = None
+
+    @property
+    def port(self):
+        """ Port the server listens to """
+        return self.server_address[1]
+
+    def start(self):
+        """ Start serving in a background thread """
+        self.__thread = Thread(target=self.serve_forever, daemon=True)
+        self.__thread.start()
+        return self
+
+    def stop(self):
+        """ Stop serving """
+        self.shutdown()
+        self.server_close()
+
+    def acquire(self):
+        """ Register a new connection, returning False if the connections limit is reached """
+
+        result = True
+
+        with self.__lock :
+            limit = self.settings.get('connections', 0)
+            if limit > 0 and self.__active >= limit :
+                self.__refused = self.__refused + 1
+                result = False
+            else : self.__active = self.__active + 1
+
+        return result
+
+    def release(self):
+        """ Unregister a closed connection """
+        with self.__lock : self.__active = self.__active - 1
+
+    def wait(self, command):
+        """ Apply the delay configured for a command """
+
+        delays = self.settings.get('delays', {})
+        delay = delays.get(command.lower(), delays.get('default', 0))
+        if delay > 0 : sleep(delay / 1000)
+
+    def refused(self):
+        """ Number of connections refused because of the connections limit """
+        return self.__refused
+
+    def get_mails(self) :
+        """ Messages recorded by the server """
+        return self.recorder.get_mails()
+
+    def get_logins(self) :
+        """ Number of successful authentications """
+        return self.recorder.get_logins()
+
+class LocalMailHandler(StreamRequestHandler):
+    """ Line based mail protocol connection, able to switch to tls """
+
+    def handle(self):
+        """ Serve a connection within the server connections limit """
+
+        if not self.server.acquire() :
+            self.reply(self.refusal())
+            return
+
+        try :
+            self.serve()
+        except (OSError, ValueError) :
+            pass
+        finally :
+            self.server.release()
+
+    def reply(self, line):
+        """ Send a response line """
+        self.connection.sendall((line + '\r\n').encode('utf-8'))
+
+    def readline(self):
+        """ Read a request line, None when the client closed the connection """
+
+        result = self.rfile.readline(65537)
+        if len(result) == 0 : return None
+        return result.decode('utf-8').rstrip('\r\n')
+
+    def secure(self):
+        """ Switch the connection to tls """
+
+        self.connection = self.server.context.wrap_socket(self.connection, server_side=True)
+        self.rfile = self.connection.makefile('rb')
+
+    def refusal(self):
+        """ Response sent when the connections limit is reached """
+        raise NotImplementedError
+
+    def serve(self):
+        """ Serve the protocol commands """
+        raise NotImplementedError
+
+class SmtpHandler(LocalMailHandler):
+    """ SMTP protocol subset used by smtplib : EHLO, STARTTLS, AUTH, MAIL, RCPT and DATA """
+
+    def refusal(self):
+        return '421 Too many connections'
+
+    def serve(self):
+
+        tls, user, sender, recipients = False, None, None, []
+
+        self.reply('220 localhost ESMTP ready')
+        line = self.readline()
+        while line is not None :
+
+            command, _, argument = line.partition(' ')
+            command = command.upper()
+            self.server.wait(command)
+
+            if command == 'EHLO' :
+                extensions = ['AUTH PLAIN LOGIN'] if tls else ['STARTTLS']
+                self.reply('250-localhost')
+                for extension in extensions[:-1] : self.reply('250-' + extension)
+                self.reply('250 ' + extensions[-1])
+            elif command == 'HELO' : self.reply('250 localhost')
+            elif command == 'STARTTLS' and not tls :
+                self.reply('220 Ready to start TLS')
+                self.secure()
+                tls = True
+            elif command == 'AUTH' and not tls : self.reply('530 Must issue a STARTTLS command first')
+            elif command == 'AUTH' : user = self.__authenticate(argument)
+            elif command in ['MAIL', 'RCPT', 'DATA'] and user is None :
+                self.reply('530 Authentication required')
+            elif command == 'MAIL' :
+                sender, recipients = self.__address(argument), []
+                self.reply('250 OK')
+            elif command == 'RCPT' :
+                recipients.append(self.__address(argument))
+                self.reply('250 OK')
+            elif command == 'DATA' and len(recipients) == 0 : self.reply('503 No recipients')
+            elif command == 'DATA' :
+                if not self.__receive(sender, recipients) : return
+                sender, recipients = None, []
+            elif command == 'RSET' :
+                sender, recipients = None, []
+                self.reply('250 OK')
+            elif command == 'NOOP' : self.reply('250 OK')
+            elif command == 'QUIT' :
+                self.reply('221 Bye')
+                return
+            else : self.reply('502 Command not implemented')
+
+            line = self.readline()
+
+    def __authenticate(self, argument):
+        """ Check PLAIN or LOGIN credentials, returning the authenticated user or None """
+
+        result = None
+
+        mechanism, _, initial = argument.partition(' ')
+        if mechanism.upper() == 'PLAIN' :
+            if len(initial) == 0 :
+                self.reply('334 ')
+                initial = self.readline() or ''
+            _, user, password = b64decode(initial).decode('utf-8').split('\0')
+        elif mechanism.upper() == 'LOGIN' :
+            self.reply('334 VXNlcm5hbWU6')
+            user = b64decode(self.readline() or '').decode('utf-8')
+            self.reply('334 UGFzc3dvcmQ6')
+            password = b64decode(self.readline() or '').decode('utf-8')
+        else :
+            self.reply('504 Unrecognized authentication type')
+            return result
+
+        if password == self.server.password :
+            self.server.recorder.login(user, password)
+            self.reply('235 Authentication successful')
+            result = user
+        else : self.reply('535 Authentication credentials invalid')
+
+        return result
+
+    @staticmethod
+    def __address(argument):
+        """ Extract the address of a MAIL FROM or RCPT TO argument """
+
+        found = match(r'^\w+:\s*<([^>]*)>', argument)
+        return found.group(1) if found else argument.partition(':')[2].strip()
+
+    def __receive(self, sender, recipients):
+        """ Receive and record a message, returning False if the connection was dropped """
+
+        self.reply('354 End data with <CR><LF>.<CR><LF>')
+
+        lines = []
+        line = self.readline()
+        while line is not None and line != '.' :
+            lines.append(line[1:] if line.startswith('..') else line)
+            line = self.readline()
+        if line is None : return False
+
+        try :
+            self.server.recorder.sendmail(
+                sender, recipients[0] if len(recipients) == 1 else recipients, '\n'.join(lines))
+        except SMTPServerDisconnected :
+            return False
+
+        self.reply('250 OK queued')
+        return True
+
+class ImapHandler(LocalMailHandler):
+    """ IMAP protocol subset used by imaplib : CAPABILITY, STARTTLS, LOGIN, AUTHENTICATE and APPEND """
+
+    def refusal(self):
+        return '* BYE Too many connections'
+
+    def serve(self):
+
+        tls = self.server.settings.get('implicit_tls', True)
+        if tls : self.secure()
+        authenticated = False
+
+        self.reply('* OK localhost IMAP4rev1 ready')
+        line = self.readline()
+        while line is not None :
+
+            tag, command, arguments = ImapHandler.__parse(line)
+            self.server.wait(command)
+
+            if command == 'CAPABILITY' :
+                extensions = ' AUTH=PLAIN' if tls else ' STARTTLS LOGINDISABLED'
+                self.reply('* CAPABILITY IMAP4rev1' + extensions)
+                self.reply(f'{tag} OK CAPABILITY completed')
+            elif command == 'STARTTLS' and not tls :
+                self.reply(f'{tag} OK Begin TLS negotiation now')
+                self.secure()
+                tls = True
+            elif command in ['LOGIN', 'AUTHENTICATE'] and not tls :
+                self.reply(f'{tag} NO Must issue a STARTTLS command first')
+            elif command in ['LOGIN', 'AUTHENTICATE'] :
+                authenticated = self.__authenticate(tag, command, arguments)
+            elif command == 'APPEND' and not authenticated :
+                self.reply(f'{tag} NO Authentication required')
+            elif command == 'APPEND' :
+                if not self.__append(tag, arguments) : return
+            elif command == 'NOOP' : self.reply(f'{tag} OK NOOP completed')
+            elif command == 'LOGOUT' :
+                self.reply('* BYE Logging out')
+                self.reply(f'{tag} OK LOGOUT completed')
+                return
+            else : self.reply(f'{tag} BAD Command not implemented')
+
+            line = self.readline()
+
+    def __authenticate(self, tag, command, arguments):
+        """ Check LOGIN or AUTHENTICATE PLAIN credentials """
+
+        result = False
+
+        if command == 'LOGIN' and len(arguments) == 2 : user, password = arguments
+        elif command == 'AUTHENTICATE' and len(arguments) > 0 and arguments[0].upper() == 'PLAIN' :
+            self.reply('+ ')
+            _, user, password = b64decode(self.readline() or '').decode('utf-8').split('\0')
+        else :
+            self.reply(f'{tag} BAD Invalid arguments')
+            return result
+
+        if password == self.server.password :
+            self.server.recorder.login(user, password)
+            self.reply(f'{tag} OK {command} completed')
+            result = True
+        else : self.reply(f'{tag} NO [AUTHENTICATIONFAILED] Invalid credentials')
+
+        return result
+
+    def __append(self, tag, arguments):
+        """ Receive and record an appended message, returning False if the connection was dropped """
+
+        found = match(r'^\{(\d+)\+?\}$', arguments[-1]) if len(arguments) > 1 else None
+        if found is None :
+            self.reply(f'{tag} BAD Invalid arguments')
+            return True
+
+        box = arguments[0]
+        flags = next((item for item in arguments[1:-1] if item.startswith('(')), '()')
+        date_time = next((item for item in arguments[1:-1] if item.startswith('"')), None)
+
+        if not arguments[-1].endswith('+}') : self.reply('+ Ready for literal data')
+        message = self.rfile.read(int(found.group(1)))
+        if self.readline() is None : return False
+
+        self.server.recorder.append(box, flags[1:-1], date_time, message.replace(b'\r\n', b'\n'))
+        self.reply(f'{tag} OK APPEND completed')
+
+        return True
+
+    @staticmethod
+    def __parse(line):
+        """ Split a command line into tag, command and arguments, keeping lists and quoted strings """
+
+        tokens = []
+        for token in line.split(' ') :
+            if len(tokens) > 0 and \
+               ((tokens[-1].startswith('"') and not ImapHandler.__closed(tokens[-1])) or \
+                (tokens[-1].startswith('(') and not tokens[-1].endswith(')'))) :
+                tokens[-1] = tokens[-1] + ' ' + token
+            else : tokens.append(token)
+
+        tag = tokens[0] if len(tokens) > 0 else '*'
+        command = tokens[1].upper() if len(tokens) > 1 else ''
+        arguments = [item[1:-1].replace('\\"', '"').replace('\\\\', '\\') \
+            if item.startswith('"') and command == 'LOGIN' else item for item in tokens[2:]]
+
+        return tag, command, arguments
+
+    @staticmethod
+    def __closed(token):
+        """ Check if a quoted string token is complete """
+        return len(token) > 1 and token.endswith('"') and not token.endswith('\\"')
+
+class LocalSMTPServer(LocalMailServer):
+    """ SMTP server recording the received messages like MockSMTPServer """
+
+    def __init__(self, scenario, password, settings=None):
+        """
+        Initialize the server from the scenario smtp data, accepting the given password
+        Settings are the LocalMailServer ones
+        """
+        super().__init__(SmtpHandler, MockSMTPServer(scenario), password, settings)
+
+class LocalImapServer(LocalMailServer):
+    """ IMAP server recording the appended messages like MockImapServer """
+
+    def __init__(self, scenario, password, settings=None):
+        """
+        Initialize the server from the scenario imap data, accepting the given password
+        Settings are the LocalMailServer ones, and :
+            implicit_tls (bool) : Negotiate tls on connection as IMAP4_SSL does, or wait for STARTTLS
+        """
+        super().__init__(ImapHandler, MockImapServer(scenario), password, settings)
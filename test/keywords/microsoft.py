@@ -5,7 +5,7 @@
 """ Google API mock for testing """
 # -------------------------------------------------------
 # Nadège LEMPERIERE, @11th September 2024
-# Latest revision: 11th September 2024
+# Latest revision: 19th October 2026
 # -------------------------------------------------------
 
 # System includes
@@ -23,10 +23,17 @@ class MicrosoftMockAPI:
     def __init__(self, scenario):
         """ Initialize API from scenario data"""
         self.__scenario = deepcopy(scenario)
+        self.__calls = {}
 
-    def get(self, endpoint, headers={}, params={}) :
+        # Events by identifier, so that large scenarios are not scanned for each request
+        self.__events = {}
+        for event in self.__scenario['events'] : self.__events.setdefault(event['id'], []).append(event)
+
+    def get(self, endpoint, headers={}, params={}, timeout=None) :
         """ requests.get mocking """
 
+        self.__calls[endpoint] = self.__calls.get(endpoint, 0) + 1
+
         response = MockMicrosoftResponse()
         if endpoint == 'https://graph.microsoft.com/v1.0/me' :
             response.status_code  = 200
@@ -44,6 +51,17 @@ class MicrosoftMockAPI:
             response.status_code  = 200
             response.set_content({'value' : self.__scenario['calendars'] })
 
+        elif endpoint.startswith('https://graph.microsoft.com/v1.0/me/calendars/') and \
+             endpoint.count('/') == 6 :
+            found = [calendar for calendar in self.__scenario['calendars'] \
+                if calendar['id'] == endpoint.split('/')[-1]]
+            if len(found) > 0 :
+                response.status_code  = 200
+                response.set_content(found[0])
+            else :
+                response.status_code  = 404
+                response.set_content({'error' : 'Calendar not found'})
+
         elif endpoint.startswith('https://graph.microsoft.com/v1.0/me/calendars/') :
             try :
                 id = endpoint.split('/')[-2]
@@ -68,7 +86,7 @@ class MicrosoftMockAPI:
 
         return response
 
-    def post(self, endpoint, headers={}, params={}, data={}, json={}) :
+    def post(self, endpoint, headers={}, params={}, data={}, json={}, timeout=None) :
 
         response = MockMicrosoftResponse()
         if endpoint.startswith('https://graph.microsoft.com/v1.0/me/events/') and \
@@ -80,6 +98,21 @@ class MicrosoftMockAPI:
                 response.status_code  = 404
                 response.set_content({'error' : str(e)})
 
+        elif endpoint == 'https://graph.microsoft.com/v1.0/$batch' and \
+             self.__scenario.get('batch_failure', 'false') == 'true' :
+            response.status_code  = 503
+            response.set_content({'error' : 'Service unavailable'})
+
+        elif endpoint == 'https://graph.microsoft.com/v1.0/$batch' :
+            responses = []
+            for request in json['requests'] :
+                local = self.post(
+                    'https://graph.microsoft.com/v1.0' + request['url'],
+                    headers=request.get('headers', {}), json=request.get('body', {}))
+                responses.append({'id' : request['id'], 'status' : local.status_code})
+            response.status_code  = 200
+            response.set_content({'responses' : responses})
+
         elif endpoint.startswith('https://login.microsoftonline.com/common/oauth2/v2.0/token') :
             response.status_code  = 200
             response.set_content({'access_token' : ''})
@@ -91,12 +124,12 @@ class MicrosoftMockAPI:
         result = []
 
         # Check that the required calendar exists
-        found = False
+        found = None
         for calendar in self.__scenario['calendars'] :
             if calendar['id'] == identifier :
-                found = True
-                calendar = calendar
-        if not found : raise Exception('Calendar %s not found', id)
+                found = calendar
+        if found is None : raise Exception('Calendar %s not found', id)
+        calendar = found
 
         # If the calendar is the Test Calendar, list its events from the scenario data
 
@@ -118,6 +151,11 @@ class MicrosoftMockAPI:
                         'emailAddress' :  {'address':  attendee['mail']}
                     })
 
+                # Graph may return events without dates, which are listed whatever the window
+                if event.get('undated', 'false') == 'true' :
+                    result.append(item)
+                    continue
+
                 utc = ZoneInfo('UTC')
                 item['start'] = {}
                 item['end'] = {}
@@ -160,11 +198,10 @@ class MicrosoftMockAPI:
         found = False
 
         if extension == 'org.mantabots' :
-            for event in self.__scenario['events'] :
-                if event['id'] == identifier :
-                    found = True
-                    if 'registration' in event :
-                        result = event['registration']
+            for event in self.__events.get(identifier, []) :
+                found = True
+                if 'registration' in event :
+                    result = event['registration']
 
         if not found :
             raise Exception('Event %s not found', id)
@@ -175,10 +212,9 @@ class MicrosoftMockAPI:
 
         if 'extensionName' in data and data['extensionName'] == 'org.mantabots' :
             found = False
-            for event in self.__scenario['events'] :
-                if event['id'] == identifier :
-                    found = True
-                    event['registration'] = data
+            for event in self.__events.get(identifier, []) :
+                found = True
+                event['registration'] = data
 
             if not found :
                 raise Exception('Event %s not found', id)
@@ -188,12 +224,17 @@ class MicrosoftMockAPI:
     def scenario(self) :
         return self.__scenario
 
+    def calls(self, endpoint) :
+        """ Number of get requests received on an endpoint """
+        return self.__calls.get(endpoint, 0)
+
 class MockMicrosoftResponse:
 
     def __init__(self):
         self.content = ''
         self.text = ''
         self.status_code = 0
+        self.headers = {}
 
     def json(self):
         return loads(self.content.decode('utf-8'))
@@ -5,13 +5,14 @@
 """ Registration workflow keywords io functions """
 # -------------------------------------------------------
 # Nadège LEMPERIERE, @11th September 2024
-# Latest revision: 11th September 2024
+# Latest revision: 19th October 2026
 # -------------------------------------------------------
 
 # System includes
 from zoneinfo  import ZoneInfo
 from json      import load
 from os        import path
+from copy      import deepcopy
 
 
 class Parser :
@@ -23,6 +24,18 @@ class Parser :
     # Input data
     s_DataFilename = path.normpath(path.join(path.dirname(__file__), '../data/data.json'))
 
+    # Parsed files, by path, with their modification time
+    s_Cache = {}
+
+    def load(filename) :
+        """ Parse a json file, once as long as it is not modified """
+
+        modified = path.getmtime(filename)
+        if filename not in Parser.s_Cache or Parser.s_Cache[filename][0] != modified :
+            with open(filename, encoding="utf-8") as file: Parser.s_Cache[filename] = (modified, load(file))
+
+        return Parser.s_Cache[filename][1]
+
     def get_token_file(api) :
         """ Choose token file depending on API"""
 
@@ -42,11 +55,12 @@ class Parser :
         result = {}
 
         # Load input data
-        with open(Parser.s_DataFilename, encoding="utf-8") as file: data = load(file)
+        data = Parser.load(Parser.s_DataFilename)
 
         if not identifier in data : raise Exception('Data not found')
 
-        result['data'] = data[identifier]
+        # Keywords modify the scenario data, so the cached data is copied
+        result['data'] = deepcopy(data[identifier])
         result['conf'] = conf
         result['api'] = api
 
@@ -62,11 +76,11 @@ class Parser :
         result = {}
 
         # Load scenario results
-        with open(Parser.s_ResultsFilename, encoding="utf-8") as file: results = load(file)
+        results = Parser.load(Parser.s_ResultsFilename)
 
         if not identifier in results : raise Exception('Result not found')
 
-        result['data'] = results[identifier]
+        result['data'] = deepcopy(results[identifier])
         result['data']['full'] = result['data']['full'].lower() == 'true'
 
         app_conf_path = path.normpath(path.join(path.dirname(__file__), '../../', conf))
@@ -78,10 +92,9 @@ class Parser :
         """ Read the timezone from the configuration file """
         result = None
 
-        with open(filename, encoding="utf-8") as file:
-            conf = load(file)
-            if 'calendar' in conf and \
-                'time_zone' in conf['calendar'] :
-                result = ZoneInfo(conf['calendar']['time_zone'])
+        conf = Parser.load(filename)
+        if 'calendar' in conf and \
+            'time_zone' in conf['calendar'] :
+            result = ZoneInfo(conf['calendar']['time_zone'])
 
         return result
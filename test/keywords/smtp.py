@@ -5,19 +5,23 @@
 """ SMTP server mock for testing """
 # -------------------------------------------------------
 # Nadège LEMPERIERE, @11th September 2024
-# Latest revision: 11th September 2024
+# Latest revision: 19th October 2026
 # -------------------------------------------------------
 
 # System includes
 from email          import message_from_string
 from email.policy   import default
+from smtplib        import SMTPServerDisconnected
 
 class MockSMTPServer:
     """ A mock class to simulate an SMTP server """
 
     def __init__(self, scenario):
-        self.__scenario = {}
+        self.__scenario = scenario
+        self.__messages = []
         self.__emails = []
+        self.__logins = 0
+        self.__disconnected = False
 
     def ehlo(self):
         pass
@@ -26,10 +30,21 @@ class MockSMTPServer:
         pass
 
     def login(self, address, password):
-        pass
+        self.__logins = self.__logins + 1
 
     def sendmail(self, from_addr, to_addr, message):
 
+        # Drop the connection once after the configured number of emails
+        if not self.__disconnected and \
+           len(self.__messages) == self.__scenario.get('disconnect_after', -1) :
+            self.__disconnected = True
+            raise SMTPServerDisconnected('Connection unexpectedly closed')
+
+        # Messages are only parsed when checked, so that parsing does not weigh on the run timings
+        self.__messages.append((from_addr, to_addr, message))
+
+    def __parse(self, from_addr, to_addr, message):
+
         msg = message_from_string(message, policy=default)
 
         subject = msg['Subject']
@@ -60,5 +75,9 @@ class MockSMTPServer:
         pass
 
     def get_mails(self) :
+        for message in self.__messages[len(self.__emails):] : self.__parse(*message)
         return self.__emails
 
+    def get_logins(self) :
+        return self.__logins
+
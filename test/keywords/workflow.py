@@ -5,17 +5,24 @@
 """ Registration workflow keywords """
 # -------------------------------------------------------
 # Nadège LEMPERIERE, @11th September 2024
-# Latest revision: 11th September 2024
+# Latest revision: 19th October 2026
 # -------------------------------------------------------
 
 # System includes
 from sys       import path as relpath
-from os        import path
-from json      import load
+from os        import path, remove
+from json      import load, loads, dump
+from gzip      import open as gzopen
 from datetime  import datetime, timedelta, timezone
 from zoneinfo  import ZoneInfo
-from logging   import config, getLogger
+from logging   import config, getLogger, StreamHandler
 from copy      import deepcopy
+from threading import Thread
+from urllib    import request, error
+from tempfile  import TemporaryDirectory
+from pstats    import Stats
+from io        import StringIO
+from tracemalloc import start as trace_start, stop as trace_stop, get_traced_memory, reset_peak
 relpath.append(path.relpath("../../"))
 
 # Robotframework includes
@@ -26,12 +33,16 @@ ROBOT = False
 
 # Project includes
 from manager                 import Registration
+from engine                  import Logs, Profiler, MemoryProfiler
 
 # Local includes
 from microsoft               import MicrosoftMockAPI
+from graph                   import MockGraphServer
 from gcp                     import GoogleMockLibrary
 from smtp                    import MockSMTPServer
 from imap                    import MockImapServer
+from mailserver              import LocalSMTPServer, LocalImapServer
+from faults                  import FaultInjector
 from parser                  import Parser
 from comparer                import Comparer
 
@@ -83,10 +94,39 @@ def load_results(identifier, conf) :
 
     return result
 
-@keyword('Run Registration Workflow with Mocks')
-def run_registration_workflow_with_mocks(scenario, receiver, sender) :
+def _create_registration(scenario, receiver, sender, results, trace='', record='', replay='', contacts=True) :
+    """ Create and configure a registration process using the scenario mocks """
+
+    config.fileConfig(logg_conf_path)
+
+    get, post, google = results['microsoft'].get, results['microsoft'].post, results['google']
+    if 'faults' in scenario['data'] :
+        results['faults'] = FaultInjector(scenario['data']['faults'])
+        get = results['faults'].wrap('GET', get)
+        post = results['faults'].wrap('POST', post)
+        google = results['faults'].google(google)
+
+    registration = Registration(
+        scenario['api'], scenario['token'], 'smtp_password', trace, record, replay)
+    registration.mock(
+        {
+            'get'     : get,
+            'post'    : post,
+            'build'   : google.build,
+            'authent' : google.authent,
+            'smtp'    : results['smtp'],
+            'imap'    : results['imap']
+        })
+
+    registration.initialize(contacts)
+    registration.configure(scenario['conf'], receiver, sender)
+
+    return registration
+
+def _create_mocks(scenario) :
+    """ Create the api, smtp and imap mocks from the scenario data """
 
-    result = {
+    return {
         'api'       : scenario['api'],
         'microsoft' : MicrosoftMockAPI(scenario['data']),
         'google'    : GoogleMockLibrary(scenario['data']),
@@ -94,27 +134,242 @@ def run_registration_workflow_with_mocks(scenario, receiver, sender) :
         'imap'      : MockImapServer(scenario['data']['imap'])
     }
 
-    config.fileConfig(logg_conf_path)
+@keyword('Run Registration Workflow with Mocks')
+def run_registration_workflow_with_mocks(scenario, receiver, sender, trace='') :
 
-    registration = Registration(scenario['api'], scenario['token'], mail='smtp_password')
-    registration.mock(
-        {
-            'get'     : result['microsoft'].get,
-            'post'    : result['microsoft'].post,
-            'build'   : result['google'].build,
-            'authent' : result['google'].authent,
-            'smtp'    : result['smtp'],
-            'imap'    : result['imap']
-        })
+    result = _create_mocks(scenario)
 
-    registration.initialize()
-    registration.configure(scenario['conf'], receiver, sender)
+    registration = _create_registration(scenario, receiver, sender, result, trace)
     registration.search_events()
     registration.prepare_emails()
     registration.send_emails()
+    registration.export_metrics()
+
+    return result
+
+@keyword('Run Registration Workflow Through Graph Server with Mocks')
+def run_registration_workflow_through_graph_server_with_mocks(scenario, receiver, sender, latency=0, jitter=0, throttle=0) :
+    """ Run the registration workflow with microsoft data served over http by a local server """
+
+    result = _create_mocks(scenario)
+    result['microsoft'] = MockGraphServer(scenario['data'], {
+        'latency' : {'default' : float(latency)}, 'jitter' : {'default' : float(jitter)},
+        'throttle' : {'default' : int(throttle)}, 'retry_after' : 0
+    }).start()
+
+    try :
+        registration = _create_registration(scenario, receiver, sender, result)
+        registration.search_events()
+        registration.prepare_emails()
+        registration.send_emails()
+    finally :
+        result['microsoft'].stop()
+
+    logger.info(f"Graph server received {result['microsoft'].requests()} requests, " + \
+        f"{result['microsoft'].throttled()} of them throttled")
+
+    return result
+
+@keyword('Run Registration Workflow For Teams with Mocks')
+def run_registration_workflow_for_teams_with_mocks(scenario, confs, receiver, sender) :
+    """ Run the registration workflow for several teams sharing the same account and mocks """
+
+    result = _create_mocks(scenario)
+
+    registrations = []
+    for conf in confs :
+        if len(registrations) == 0 :
+            registration = _create_registration(
+                dict(scenario, conf=conf), receiver, sender, result)
+        else :
+            registration = Registration(scenario['api'], scenario['token'], mail='smtp_password')
+            registration.share(registrations[0])
+            registration.configure(conf, receiver, sender)
+        registrations.append(registration)
+
+    Registration.process_all(registrations)
 
     return result
 
+@keyword('Check Api Requests')
+def check_api_requests(results, endpoint, expected) :
+    """ Check the number of requests the microsoft mock received on an endpoint """
+
+    calls = results['microsoft'].calls('https://graph.microsoft.com/v1.0/' + endpoint)
+    logger.info(f'Received {calls} requests on {endpoint} [reference {expected}]')
+
+    if calls != int(expected) : raise Exception('Unexpected number of requests on ' + endpoint)
+
+@keyword('Check Throttled Requests')
+def check_throttled_requests(results, requests, throttled) :
+    """ Check the number of requests the graph server received, and answered with a 429 """
+
+    logger.info(f"Received {results['microsoft'].requests()} requests [reference {requests}], " + \
+        f"throttled {results['microsoft'].throttled()} [reference {throttled}]")
+
+    if results['microsoft'].requests() != int(requests) :
+        raise Exception('Unexpected number of requests received')
+    if results['microsoft'].throttled() != int(throttled) :
+        raise Exception('Unexpected number of requests throttled')
+
+@keyword('Serve Registration Workflow with Mocks')
+def serve_registration_workflow_with_mocks(scenario, receiver, sender) :
+    """ Start a registration daemon whose schedule does not fire during the test """
+
+    result = _create_mocks(scenario)
+
+    registration = _create_registration(scenario, receiver, sender, result)
+    result['daemon'] = Registration.daemon([registration], '0 0 1 1 *')
+    result['thread'] = Thread(target=result['daemon'].serve, daemon=True)
+    result['thread'].start()
+
+    return result
+
+@keyword('Trigger Registration Run')
+def trigger_registration_run(results, expected='200') :
+    """ Request a registration run from the daemon trigger endpoint """
+
+    host, port = results['daemon'].address[:2]
+    try :
+        with request.urlopen(request.Request(f'http://{host}:{port}/run', method='POST')) as response :
+            code = response.status
+    except error.HTTPError as e :
+        code = e.code
+    logger.info(f'Trigger endpoint answered {code} [reference {expected}]')
+
+    if code != int(expected) : raise Exception('Unexpected trigger endpoint answer')
+
+    return results
+
+@keyword('Stop Registration Daemon')
+def stop_registration_daemon(results) :
+    """ Stop the registration daemon and wait for it to end """
+
+    results['daemon'].stop()
+    results['thread'].join(10)
+    if results['thread'].is_alive() : raise Exception('Registration daemon did not stop')
+
+@keyword('Run Registration Workflow Until Emails Prepared with Mocks')
+def run_registration_workflow_until_emails_prepared_with_mocks(scenario, receiver, sender) :
+    """ Run the registration workflow, simulating an interruption before emails are sent """
+
+    result = _create_mocks(scenario)
+
+    registration = _create_registration(scenario, receiver, sender, result)
+    registration.search_events()
+    registration.prepare_emails()
+
+    return result
+
+@keyword('Resume Registration Workflow with Mocks')
+def resume_registration_workflow_with_mocks(scenario, receiver, sender, results) :
+    """ Resume an interrupted registration workflow from its outbox, keeping the same mocks """
+
+    registration = _create_registration(scenario, receiver, sender, results, contacts=False)
+    registration.resume()
+
+    return results
+
+@keyword('Run Registration Workflow Through Mail Servers with Mocks')
+def run_registration_workflow_through_mail_servers_with_mocks(scenario, receiver, sender, delay=0, connections=0) :
+    """ Run the registration workflow delivering emails to local smtp and imap servers """
+
+    result = _create_mocks(scenario)
+    settings = {'delays' : {'default' : float(delay)}, 'connections' : int(connections)}
+    result['smtp'] = LocalSMTPServer(scenario['data']['smtp'], 'smtp_password', settings).start()
+    result['imap'] = LocalImapServer(scenario['data']['imap'], 'smtp_password', settings).start()
+
+    try :
+        with TemporaryDirectory() as folder :
+
+            # Point the configuration to the local servers
+            app_conf_path = path.normpath(path.join(path.dirname(__file__), '../../', scenario['conf']))
+            with open(app_conf_path, encoding="utf-8") as file: data = load(file)
+            data['mail']['from']['smtp_server'] = {'host' : '127.0.0.1', 'port' : result['smtp'].port}
+            data['mail']['from']['imap_server'] = {'host' : '127.0.0.1', 'port' : result['imap'].port}
+            conf = path.join(folder, path.basename(app_conf_path))
+            with open(conf, 'w', encoding="utf-8") as file: dump(data, file)
+
+            registration = _create_registration(
+                dict(scenario, conf=conf), receiver, sender, dict(result, smtp=None, imap=None))
+            registration.search_events()
+            registration.prepare_emails()
+            registration.send_emails()
+    finally :
+        result['smtp'].stop()
+        result['imap'].stop()
+
+    return result
+
+@keyword('Run Registration Workflow Recording Cassette with Mocks')
+def run_registration_workflow_recording_cassette_with_mocks(scenario, receiver, sender, cassette) :
+    """ Run the registration workflow, recording the api traffic in a cassette """
+
+    result = _create_mocks(scenario)
+
+    registration = _create_registration(scenario, receiver, sender, result, record=cassette)
+    registration.search_events()
+    registration.prepare_emails()
+    registration.send_emails()
+    registration.export_metrics()
+
+    return result
+
+@keyword('Replay Registration Workflow From Cassette')
+def replay_registration_workflow_from_cassette(scenario, receiver, sender, cassette, recorded) :
+    """ Replay a recorded registration workflow, checking that the api mocks are never called """
+
+    result = dict(recorded,
+        smtp=MockSMTPServer(scenario['data']['smtp']), imap=MockImapServer(scenario['data']['imap']))
+    before = deepcopy(recorded['microsoft'].scenario())
+
+    registration = _create_registration(scenario, receiver, sender, result, replay=cassette)
+    registration.search_events()
+    registration.prepare_emails()
+    registration.send_emails()
+    registration.export_metrics()
+
+    if recorded['microsoft'].scenario() != before : raise Exception('Replayed run reached the api')
+
+    return result
+
+@keyword('Check Cassette Redacted')
+def check_cassette_redacted(cassette) :
+    """ Check that the login secrets and tokens have not been recorded """
+
+    app_cassette_path = path.normpath(path.join(path.dirname(__file__), '../../', cassette))
+    with gzopen(app_cassette_path, 'rt', encoding='utf-8') as file : content = loads(file.read())
+
+    logins = [interaction for interaction in content['interactions'] \
+        if interaction['url'].startswith('https://login.microsoftonline.com')]
+    if len(logins) == 0 : raise Exception('Login not recorded')
+
+    for interaction in logins :
+        for key in ['client_id', 'client_secret', 'refresh_token'] :
+            if interaction['body'].get(key) != 'REDACTED' : raise Exception(f'{key} recorded')
+        if loads(interaction['content']).get('access_token') != 'REDACTED' :
+            raise Exception('access_token recorded')
+
+@keyword('Check Cassette Error Codes')
+def check_cassette_error_codes(cassette, expected) :
+    """ Check that the error responses have been recorded with their error code """
+
+    app_cassette_path = path.normpath(path.join(path.dirname(__file__), '../../', cassette))
+    with gzopen(app_cassette_path, 'rt', encoding='utf-8') as file : content = loads(file.read())
+
+    codes = [loads(interaction['content'])['error']['code'] \
+        for interaction in content['interactions'] if interaction['status'] >= 400]
+    logger.info(f'Recorded error codes {codes} [reference {expected}]')
+    if expected not in codes : raise Exception(f'Error code {expected} not recorded')
+    if 'REDACTED' in codes : raise Exception('Error code redacted')
+
+@keyword('Reset Cassette')
+def reset_cassette(cassette) :
+    """ Remove a recorded cassette """
+
+    app_cassette_path = path.normpath(path.join(path.dirname(__file__), '../../', cassette))
+    if path.exists(app_cassette_path) : remove(app_cassette_path)
+
 @keyword('Check Final State')
 def check_final_state(reference, results) :
 
@@ -128,43 +383,66 @@ def check_final_state(reference, results) :
 
     Comparer.compare_emails_number(reference,results)
 
+    # Index events and reference mails by event id, the last event with an id winning
+    events = {event['id'] : event for event in events}
+    tests = Comparer.index(reference['data']['mails'], lambda test : Comparer.event_id(test['subject']))
+
     for mail in mails :
 
         logger.debug(mail['subject'])
 
-        # Get associated event id
-        event_id = mail['subject'][\
-            mail['subject'].find('[') + 1:\
-            mail['subject'].find(']')]
-
         # Get associated event
-        associated_event = {}
-        found = False
-        for event in events :
-            if event['id'] == event_id :
-                found = True
-                associated_event = event
-
-        if not found : raise Exception('Event id ' + event_id + ' not found')
+        event_id = Comparer.event_id(mail['subject'])
+        if event_id not in events : raise Exception('Event id ' + event_id + ' not found')
+        associated_event = events[event_id]
         logger.debug(f'Event {event_id} found')
 
-        found = False
-        for test in reference['data']['mails'] :
+        if event_id not in tests : raise Exception('Event id ' + event_id + ' not found')
+        for test in tests[event_id] :
+            actual = {'mail' : mail, 'event' : associated_event}
+
+            Comparer.compare_email(
+                test, actual, reference['timezone'], reference['data']['full'])
+            Comparer.compare_registration(
+                test, actual, reference['timezone'], reference['data']['full'])
+
+@keyword('Check Smtp Sessions')
+def check_smtp_sessions(results, expected) :
+    """ Check the number of smtp logins performed during the run """
+
+    logins = results['smtp'].get_logins()
+    logger.info(f'Logged {logins} times in smtp server [reference {expected}]')
+
+    if logins != int(expected) : raise Exception('Unexpected number of smtp sessions')
+
+@keyword('Check Google Services Built')
+def check_google_services_built(results, expected) :
+    """ Check the number of google services built during the run """
 
-            reference_id = test['subject'][\
-                test['subject'].find('[') + 1:\
-                test['subject'].find(']')]
+    builds = results['google'].builds()
+    logger.info(f'Built {builds} google services [reference {expected}]')
 
-            if reference_id == event_id :
-                found = True
-                actual = {'mail' : mail, 'event' : associated_event}
+    if builds != int(expected) : raise Exception('Unexpected number of google services built')
 
-                Comparer.compare_email(
-                    test, actual, reference['timezone'], reference['data']['full'])
-                Comparer.compare_registration(
-                    test, actual, reference['timezone'], reference['data']['full'])
+@keyword('Check Imap Sessions')
+def check_imap_sessions(results, expected) :
+    """ Check the number of imap logins and that every sent email has been archived """
 
-        if not found : raise Exception('Event id ' + event_id + ' not found')
+    logins = results['imap'].get_logins()
+    logger.info(f'Logged {logins} times in imap server [reference {expected}]')
+
+    if logins != int(expected) : raise Exception('Unexpected number of imap sessions')
+    if len(results['imap'].get_mails()) != len(results['smtp'].get_mails()) :
+        raise Exception('Sent emails not all archived')
+
+@keyword('Check Injected Faults')
+def check_injected_faults(results, kind, expected) :
+    """ Check the number of faults of a kind injected during the run """
+
+    injected = results['faults'].injected(kind)
+    logger.info(f'Injected {injected} {kind} faults [reference {expected}]')
+
+    if injected != int(expected) : raise Exception(f'Unexpected number of {kind} faults')
 
 @keyword('Update Scenario Data From Results')
 def update_scenario_data_from_results(scenario, results) :
@@ -177,32 +455,341 @@ def update_scenario_data_from_results(scenario, results) :
 
     return scenario
 
+@keyword('Reset Registration Store')
+def reset_registration_store(conf) :
+    """ Remove the local registration store configured for the scenario """
+
+    app_conf_path = path.normpath(path.join(path.dirname(__file__), '../../', conf))
+    with open(app_conf_path, encoding="utf-8") as file: data = load(file)
+
+    store_path = path.normpath(path.join(path.dirname(__file__), '../../', data['calendar']['store']))
+    for suffix in ['', '-wal', '-shm'] :
+        if path.exists(store_path + suffix) : remove(store_path + suffix)
+
+@keyword('Reset Calendar Cache')
+def reset_calendar_cache(conf) :
+    """ Remove the calendar cache configured for the scenario """
+
+    cache_path = _calendar_cache_path(conf)
+    if path.exists(cache_path) : remove(cache_path)
+
+@keyword('Write Calendar Cache')
+def write_calendar_cache(conf, account, name, identifier) :
+    """ Cache a calendar identifier, as a previous run would have """
+
+    with open(_calendar_cache_path(conf), 'w', encoding='utf-8') as file :
+        dump({'version' : 1, 'accounts' : {account : {name : identifier}}}, file)
+
+@keyword('Check Calendar Cache')
+def check_calendar_cache(conf, account, name, expected) :
+    """ Check the calendar identifier cached for a calendar name """
+
+    with open(_calendar_cache_path(conf), encoding='utf-8') as file : data = load(file)
+    identifier = data['accounts'].get(account, {}).get(name)
+    logger.info(f'Cached identifier {identifier} for {name} [reference {expected}]')
+
+    if identifier != expected : raise Exception('Unexpected cached identifier for ' + name)
+
+def _calendar_cache_path(conf) :
+    """ Path to the calendar cache configured for the scenario """
+
+    app_conf_path = path.normpath(path.join(path.dirname(__file__), '../../', conf))
+    with open(app_conf_path, encoding="utf-8") as file: data = load(file)
+
+    return path.normpath(path.join(path.dirname(__file__), '../../', data['calendar']['cache']))
+
+@keyword('Reset Outbox')
+def reset_outbox(conf) :
+    """ Remove the outbox configured for the scenario """
+
+    app_conf_path = path.normpath(path.join(path.dirname(__file__), '../../', conf))
+    with open(app_conf_path, encoding="utf-8") as file: data = load(file)
+
+    outbox_path = path.normpath(path.join(path.dirname(__file__), '../../', data['outbox']))
+    for suffix in ['', '-wal', '-shm'] :
+        if path.exists(outbox_path + suffix) : remove(outbox_path + suffix)
+
+@keyword('Reset Metrics')
+def reset_metrics(conf) :
+    """ Remove the metrics files configured for the scenario """
+
+    for filename in _read_metrics_files(conf).values() :
+        if path.exists(filename) : remove(filename)
+
+@keyword('Check Metrics')
+def check_metrics(conf, stages, methods) :
+    """ Check that each stage ran once, and that api methods were timed, in both export formats """
+
+    files = _read_metrics_files(conf)
+    with open(files['json'], encoding="utf-8") as file: metrics = load(file)
+    with open(files['prometheus'], encoding="utf-8") as file: prometheus = file.read()
+    logger.debug(metrics)
+
+    for name in stages :
+        series = [item for item in metrics['stage'] if item['stage'] == name]
+        if len(series) != 1 or series[0]['count'] != 1 or series[0]['failures'] != 0 :
+            raise Exception('Stage ' + name + ' not timed once')
+        if f'registration_stage_calls_total{{stage="{name}"}} 1' not in prometheus :
+            raise Exception('Stage ' + name + ' not exported in prometheus format')
+
+    for name in methods :
+        series = [item for item in metrics['api'] if item['method'] == name]
+        if len(series) != 1 or series[0]['count'] < 1 :
+            raise Exception('Api method ' + name + ' not timed')
+        if f'method="{name}",provider="microsoft"}}' not in prometheus :
+            raise Exception('Api method ' + name + ' not exported in prometheus format')
+
+def _read_metrics_files(conf) :
+    """ Read the metrics files paths from the scenario configuration """
+
+    app_conf_path = path.normpath(path.join(path.dirname(__file__), '../../', conf))
+    with open(app_conf_path, encoding="utf-8") as file: data = load(file)
+
+    result = {}
+    for kind, filename in data['metrics'].items() :
+        result[kind] = path.normpath(path.join(path.dirname(__file__), '../../', filename))
+
+    return result
+
+@keyword('Run Registration Workflow With Logs with Mocks')
+def run_registration_workflow_with_logs_with_mocks(scenario, receiver, sender, mode, level='DEBUG') :
+    """ Run the registration workflow with the logging mode, capturing the written records """
+
+    result = _create_mocks(scenario)
+
+    registration = _create_registration(scenario, receiver, sender, result)
+    logs = Logs(logg_conf_path, mode)
+    getLogger('registration').setLevel(level)
+    stream = StringIO()
+    for handler in logs.handlers :
+        if isinstance(handler, StreamHandler) : handler.setStream(stream)
+
+    try :
+        registration.search_events()
+        registration.prepare_emails()
+        registration.send_emails()
+    finally :
+        logs.stop()
+
+    result['logs'] = [line for line in stream.getvalue().split('\n') if len(line) > 0]
+    logger.info(f"{len(result['logs'])} log records written")
+
+    return result
+
+@keyword('Log Exception With Logs')
+def log_exception_with_logs(mode) :
+    """ Log a caught exception with the logging mode, capturing the written records """
+
+    result = {}
+
+    logs = Logs(logg_conf_path, mode)
+    stream = StringIO()
+    for handler in logs.handlers :
+        if isinstance(handler, StreamHandler) : handler.setStream(stream)
+
+    try :
+        try :
+            raise ValueError('Injected failure')
+        except ValueError :
+            getLogger('registration').exception('Failed to process event %s', 'event1')
+    finally :
+        logs.stop()
+
+    result['logs'] = [line for line in stream.getvalue().split('\n') if len(line) > 0]
+    logger.info(f"{len(result['logs'])} log lines written")
+
+    return result
+
+@keyword('Check Logged Exception')
+def check_logged_exception(results) :
+    """ Check that the json record keeps its message and its traceback in separate fields """
+
+    records = [loads(line) for line in results['logs']]
+    records = [record for record in records if 'Failed to process event' in record['message']]
+    if len(records) != 1 : raise Exception(f'{len(records)} exception records written [reference 1]')
+
+    if records[0]['message'] != 'Failed to process event event1' :
+        raise Exception('Exception record message altered : ' + records[0]['message'])
+    if 'ValueError: Injected failure' not in records[0].get('exception', '') :
+        raise Exception('Exception record traceback missing : ' + str(records[0]))
+
+@keyword('Check Logs')
+def check_logs(results, mode, message, level='') :
+    """ Check the written records format, and that a message was logged """
+
+    records = results['logs']
+    if mode == 'json' :
+        records = [loads(line) for line in records]
+        for record in records :
+            if not all(key in record for key in ['time', 'level', 'logger', 'line', 'message']) :
+                raise Exception('Invalid json log record ' + str(record))
+        messages = [record['message'] for record in records]
+        levels = [record['level'] for record in records]
+    else :
+        messages = records
+        levels = [level for level in ['DEBUG', 'INFO', 'WARNING', 'ERROR'] \
+            if any(f' - {level} - ' in line for line in records)]
+
+    if not any(message in line for line in messages) : raise Exception('Message not logged : ' + message)
+    if len(level) > 0 and level in levels : raise Exception('Unexpected records at level ' + level)
+
+@keyword('Multiply Scenario Events')
+def multiply_scenario_events(scenario, count) :
+    """ Replace the scenario events by copies of the first one, with distinct identifiers """
+
+    event = scenario['data']['events'][0]
+    scenario['data']['events'] = []
+    for i_event in range(int(count)) :
+        copy = deepcopy(event)
+        copy['id'] = f"{event['id']}-{i_event}"
+        scenario['data']['events'].append(copy)
+
+    return scenario
+
+@keyword('Run Registration Workflow Measuring Memory with Mocks')
+def run_registration_workflow_measuring_memory_with_mocks(scenario, receiver, sender) :
+    """ Run the registration workflow, measuring the memory peak of the emails preparation """
+
+    result = _create_mocks(scenario)
+
+    registration = _create_registration(scenario, receiver, sender, result)
+
+    # Logs are captured in memory by robot, they would be measured with the registration
+    getLogger('registration').setLevel('WARNING')
+    trace_start()
+    try :
+        registration.search_events()
+        base = get_traced_memory()[0]
+        reset_peak()
+        registration.prepare_emails()
+        result['peak'] = get_traced_memory()[1] - base
+    finally :
+        trace_stop()
+    registration.send_emails()
+
+    logger.info(f"Memory peak of {result['peak']} bytes while preparing emails")
+
+    return result
+
+@keyword('Check Memory Peak')
+def check_memory_peak(results, reference, ratio) :
+    """ Check that the memory peak is below a ratio of the reference run peak """
+
+    logger.info(f"Memory peak of {results['peak']} bytes [reference {reference['peak']} bytes]")
+    if results['peak'] > reference['peak'] * float(ratio) : raise Exception('Memory peak too high')
+
+@keyword('Check Same Emails')
+def check_same_emails(results, reference) :
+    """ Check that two runs sent the same emails """
+
+    mails = sorted(mail['content'] for mail in results['smtp'].get_mails())
+    expected = sorted(mail['content'] for mail in reference['smtp'].get_mails())
+    logger.info(f'Sent {len(mails)} emails [reference {len(expected)}]')
+
+    if len(mails) == 0 or mails != expected : raise Exception('Emails differ from the reference run')
+
+@keyword('Run Registration Workflow With Profilers with Mocks')
+def run_registration_workflow_with_profilers_with_mocks(scenario, receiver, sender, profile, memprofile, mode='cprofile') :
+    """ Run the registration workflow, profiling its cpu usage and its memory allocations """
+
+    result = _create_mocks(scenario)
+
+    with Profiler(_test_path(profile), mode, 0.001), MemoryProfiler(_test_path(memprofile)) as memory :
+        registration = _create_registration(scenario, receiver, sender, result)
+        registration.metrics.observe(memory.observe)
+        registration.search_events()
+        registration.prepare_emails()
+        registration.send_emails()
+
+    return result
+
+@keyword('Check Profiles')
+def check_profiles(profile, memprofile, mode='cprofile') :
+    """ Check the pstats file, the collapsed stacks and the memory report of a profiled run """
+
+    if mode == 'cprofile' :
+        functions = [function for _, _, function in Stats(_test_path(profile)).stats]
+        logger.info(f'Profiled {len(functions)} functions')
+        if 'search_events' not in functions : raise Exception('search_events not profiled')
+
+    collapsed = path.splitext(_test_path(profile))[0] + '.collapsed'
+    with open(collapsed, encoding='utf-8') as file : stacks = file.read().splitlines()
+    logger.info(f'Sampled {len(stacks)} distinct stacks')
+    if len(stacks) == 0 : raise Exception('No stack sampled')
+    for stack in stacks :
+        if not stack.rsplit(' ', 1)[1].isdigit() : raise Exception('Invalid collapsed stack ' + stack)
+
+    with open(_test_path(memprofile), encoding='utf-8') as file : report = file.read()
+    logger.info(report)
+    for name in ['search_events', 'prepare_emails', 'send_emails'] :
+        if f'== {name} :' not in report : raise Exception('Stage not memory profiled : ' + name)
+    if 'manager.py:' not in report : raise Exception('No registration allocation reported')
+
+@keyword('Reset Profiles')
+def reset_profiles(profile, memprofile) :
+    """ Remove the profiles files """
+
+    for filename in [profile, path.splitext(profile)[0] + '.collapsed', memprofile] :
+        if path.exists(_test_path(filename)) : remove(_test_path(filename))
+
+def _test_path(filename) :
+    """ Path of a test file from the repository root """
+    return path.normpath(path.join(path.dirname(__file__), '../../', filename))
+
+@keyword('Reset Trace')
+def reset_trace(trace) :
+    """ Remove the http requests trace file """
+
+    trace_path = path.normpath(path.join(path.dirname(__file__), '../../', trace))
+    if path.exists(trace_path) : remove(trace_path)
+
+@keyword('Check Trace')
+def check_trace(trace, endpoint, expected) :
+    """ Check the number of requests traced on an endpoint """
+
+    trace_path = path.normpath(path.join(path.dirname(__file__), '../../', trace))
+    with open(trace_path, encoding="utf-8") as file:
+        calls = [loads(line) for line in file if loads(line)['e'] == endpoint]
+    logger.info(f'Traced {len(calls)} requests on {endpoint} [reference {expected}]')
+
+    if len(calls) != int(expected) : raise Exception('Unexpected number of requests on ' + endpoint)
+    for call in calls :
+        if call['s'] < 200 or call['s'] >= 300 or call['l'] < 0 :
+            raise Exception('Invalid trace of request on ' + endpoint)
+
+@keyword('Clear Scenario Registrations')
+def clear_scenario_registrations(scenario) :
+    """ Remove the registration status stored in the scenario calendar events """
+
+    result = deepcopy(scenario)
+    for event in result['data']['events'] :
+        if 'registration' in event : del event['registration']
+
+    return result
+
 @keyword('Merge Scenario Data')
 def merge_scenario_data(scenario, scenario2) :
 
     result = deepcopy(scenario)
 
+    events = Comparer.index(result['data']['events'], lambda data : data['id'])
     for data2 in scenario2['data']['events'] :
-        found = False
-        for data in result['data']['events'] :
-            if data['id'] == data2['id'] :
-                found = True
-                data['start'] = data2['start']
-                data['end'] = data2['end']
-                data['full_day'] = data2['full_day']
-                data['delta_start_hours'] = data2['delta_start_hours']
-                data['delta_end_hours'] = data2['delta_end_hours']
-                data['attendees'] = data2['attendees']
-
-        if not found : result['data']['events'].append(data2)
-
+        for data in events.get(data2['id'], []) :
+            data['start'] = data2['start']
+            data['end'] = data2['end']
+            data['full_day'] = data2['full_day']
+            data['delta_start_hours'] = data2['delta_start_hours']
+            data['delta_end_hours'] = data2['delta_end_hours']
+            data['attendees'] = data2['attendees']
+
+        if data2['id'] not in events :
+            result['data']['events'].append(data2)
+            events[data2['id']] = [data2]
+
+    contacts = {data['mail'] for data in result['data']['contacts']}
     for data2 in scenario2['data']['contacts'] :
-        found = False
-        for data in result['data']['contacts'] :
-            if data['mail'] == data2['mail'] :
-                found = True
-                data = deepcopy(data2)
-
-        if not found : result['data']['contacts'].append(data2)
+        if data2['mail'] not in contacts :
+            result['data']['contacts'].append(data2)
+            contacts.add(data2['mail'])
 
     return result
\ No newline at end of file